@@ -1,10 +1,34 @@
 import streamlit as st
-import numpy as np
-import pandas as pd
-from scipy import stats
-import plotly.graph_objects as go
-import plotly.express as px
-import math
+
+# Número de trayectorias Monte Carlo de la visualización del sistema de cantidad fija
+N_TRAYECTORIAS_SIMULACION = 10_000
+
+# Trayectorias que se guardan para dibujar las bandas de percentiles del gráfico
+N_TRAYECTORIAS_BANDAS = 1_000
+
+# Semilla inicial de las simulaciones: la misma semilla da siempre las mismas trayectorias
+SEMILLA_POR_DEFECTO = 2024
+
+# Modelos de demanda del sistema de cantidad fija: etiqueta -> modelo de inventario.cuantiles
+MODELOS_DEMANDA = {
+    "Normal (z-score)": "normal",
+    "Automático según el consumo": "auto",
+    "Poisson": "poisson",
+    "Binomial negativa": "binomial_negativa",
+    "Gamma": "gamma",
+    "Empírico (remuestreo del consumo)": "empirico",
+}
+
+# Entradas máximas por función memorizada; la caché es compartida por todas las sesiones
+# y descarta las combinaciones de parámetros menos recientes al llenarse
+MAX_ENTRADAS_CACHE = 256
+
+# Entradas de la caché de índices de resultados guardados: cada una puede ocupar 8 bytes
+# por SKU de la ejecución, así que se limita mucho más que el resto
+MAX_ENTRADAS_CACHE_INDICES = 16
+
+# Filas por página que se pueden elegir en los resultados guardados
+FILAS_POR_PAGINA = (50, 100, 500)
 
 # Secretsからパスワードを取得
 PASSWORD = st.secrets["PASSWORD"]
@@ -36,71 +60,233 @@ def verificar_contraseña():
 if st.session_state.authenticated:
     # 認証成功後に表示されるメインコンテンツ
     
-    # Configuración de la página
-    st.set_page_config(
-        page_title="Sistema de Gestión de Inventario",
-        page_icon="📦",
-        layout="wide",
-        initial_sidebar_state="expanded"
+    # Los módulos de cálculo y gráficos (numpy, scipy, plotly) se importan solo tras la
+    # autenticación: la pantalla de acceso no los necesita y Python los conserva en
+    # sys.modules, por lo que los reruns siguientes no vuelven a cargarlos
+    import json
+    import tempfile
+    from dataclasses import replace
+    import numpy as np
+    from inventario.calculos import (
+        calcular_z_score,
+        calcular_inventario_seguridad,
+        calcular_inventario_seguridad_plazo_variable,
+        calcular_desviacion_demanda_real,
+        validar_inputs,
+    )
+    from inventario.simulacion import simular_cantidad_fija
+    from inventario.cuantiles import calcular_cantidad_fija_modelos_lote
+    from inventario.plazo_variable import calcular_cantidad_fija_plazo_variable_lote, muestras_plazo_normal
+    from inventario.ingesta import agregar_historial
+    from inventario.backtesting import VENTANA_POR_DEFECTO, backtest_cantidad_fija, matriz_consumos
+    from inventario.pronostico import dias_minimos, pronosticar_demanda_lote
+    from inventario.escenarios import barrido_periodo_fijo
+    from inventario.proyeccion import proyectar_periodo_fijo
+    from inventario.almacen import DIRECTORIO_ALMACEN, Ejecucion, abrir_ejecucion, listar_ejecuciones
+    from inventario.optimizacion import (
+        PROBABILIDADES_FALTA,
+        costos_nivel_servicio,
+        costos_nivel_servicio_monte_carlo,
     )
+    from inventario.graficos import (
+        figura_consumo_diario,
+        figura_simulacion_cantidad_fija,
+        figura_proyeccion_periodo_fijo,
+        figura_comparacion_niveles,
+        figura_costos_nivel_servicio,
+        figura_backtest_cantidad_fija,
+        figura_mapa_calor_escenarios,
+        percentiles_bandas,
+    )
+    from inventario import instrumentacion
+    from inventario.instrumentacion import instrumentar
     
-    # Título principal
-    st.title("📦 Planificación de Compras e Inventario")
-    st.markdown("**Cálculo de inventario para sistemas de cantidad fija y período fijo**")
+    # Etapas críticas medidas (tiempo de pared, llamadas y, si se activa, memoria) para
+    # el panel de tiempos del sidebar; la medición se hace fuera de las cachés, así
+    # que refleja lo que paga cada rerun
+    calcular_z_score = instrumentar("calcular_z_score")(calcular_z_score)
+    calcular_desviacion_demanda_real = instrumentar("calcular_desviacion_demanda_real")(calcular_desviacion_demanda_real)
+    calcular_inventario_seguridad = instrumentar("calcular_inventario_seguridad")(calcular_inventario_seguridad)
+    calcular_inventario_seguridad_plazo_variable = instrumentar("calcular_inventario_seguridad_plazo_variable")(calcular_inventario_seguridad_plazo_variable)
+    calcular_cantidad_fija_modelos_lote = instrumentar("calcular_cantidad_fija_modelos_lote")(calcular_cantidad_fija_modelos_lote)
+    calcular_cantidad_fija_plazo_variable_lote = instrumentar("calcular_cantidad_fija_plazo_variable_lote")(calcular_cantidad_fija_plazo_variable_lote)
+    proyectar_periodo_fijo = instrumentar("proyectar_periodo_fijo")(proyectar_periodo_fijo)
+    mostrar_grafico = instrumentar("st.plotly_chart")(st.plotly_chart)
     
-    # Sidebar para selección del método
-    st.sidebar.header("Seleccionar Método de Gestión")
-    metodo = st.sidebar.selectbox(
-        "Sistema de compras:",
-        ["Sistema de Cantidad Fija", "Sistema de Período Fijo"]
+    # Simulación y gráficos memorizados por sus argumentos, para que los reruns de
+    # Streamlit no los recalculen cuando solo cambia un widget ajeno a ellos
+    figura_consumo_diario_cache = st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner=False)(figura_consumo_diario)
+    figura_simulacion_cantidad_fija_cache = st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner=False)(figura_simulacion_cantidad_fija)
+    figura_proyeccion_periodo_fijo_cache = st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner=False)(figura_proyeccion_periodo_fijo)
+    figura_comparacion_niveles_cache = st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner=False)(figura_comparacion_niveles)
+    figura_costos_nivel_servicio_cache = st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner=False)(figura_costos_nivel_servicio)
+    figura_backtest_cantidad_fija_cache = st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner=False)(figura_backtest_cantidad_fija)
+    figura_mapa_calor_escenarios_cache = st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner=False)(figura_mapa_calor_escenarios)
+    costos_nivel_servicio_monte_carlo_cache = instrumentar("costos_nivel_servicio_monte_carlo")(
+        st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner=False)(costos_nivel_servicio_monte_carlo)
+    )
+    barrido_periodo_fijo_cache = instrumentar("barrido_periodo_fijo")(
+        st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner=False)(barrido_periodo_fijo)
     )
     
-    # Función para calcular el valor z de la distribución normal
-    def calcular_z_score(probabilidad_falta_stock):
+    @instrumentar("simular_cantidad_fija")
+    @st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner=False)
+    def simulacion_resumida_cache(punto_reorden, cantidad_pedido, inventario_inicial, demanda_promedio_diaria,
+                                  desviacion_demanda, tiempo_reposicion, dias, semilla):
         """
-        Calcula el z-score para una probabilidad de falta de stock dada
+        Simulación de la visualización; se memorizan solo los indicadores, la trayectoria de ejemplo
+        y las bandas de percentiles, no las N_TRAYECTORIAS_BANDAS trayectorias (hasta ~9 MB por entrada)
         """
-        nivel_servicio = (100 - probabilidad_falta_stock) / 100
-        z_score = stats.norm.ppf(nivel_servicio)
-        return z_score
+        simulacion = simular_cantidad_fija(
+            punto_reorden=punto_reorden,
+            cantidad_pedido=cantidad_pedido,
+            inventario_inicial=inventario_inicial,
+            demanda_promedio_diaria=demanda_promedio_diaria,
+            desviacion_demanda=desviacion_demanda,
+            tiempo_reposicion=tiempo_reposicion,
+            dias=dias,
+            n_trayectorias=N_TRAYECTORIAS_SIMULACION,
+            semilla=semilla,
+            trayectorias_guardadas=N_TRAYECTORIAS_BANDAS
+        )
+        bandas = percentiles_bandas(simulacion.trayectorias)
+        return replace(simulacion, trayectorias=simulacion.trayectorias[:1].copy()), bandas
     
-    # Función para calcular inventario de seguridad
-    def calcular_inventario_seguridad(z_score, desviacion_estandar_demanda, tiempo_reposicion):
+    @st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner="Procesando historial de consumo...")
+    def agregar_historial_cache(id_archivo, rellenar_dias_sin_consumo, _archivo):
         """
-        Calcula el inventario de seguridad
+        Agrega el historial subido por bloques; se memoriza por el identificador del archivo
         """
-        return z_score * desviacion_estandar_demanda * math.sqrt(tiempo_reposicion)
+        _archivo.seek(0)
+        return agregar_historial(_archivo, rellenar_dias_sin_consumo=rellenar_dias_sin_consumo)
     
-    # Función para calcular la desviación estándar real de la demanda
-    def calcular_desviacion_demanda_real(consumos_diarios):
+    @st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner="Preparando el consumo diario...")
+    def matriz_consumos_cache(id_archivo, _archivo):
         """
-        Calcula la desviación estándar real basada en los datos históricos diarios
+        Matriz de consumo diario SKUs × días del historial subido; se memoriza por el identificador del archivo
         """
-        if len(consumos_diarios) < 2:
-            return 0
-        return np.std(consumos_diarios, ddof=1)
+        _archivo.seek(0)
+        return matriz_consumos(_archivo)
     
-    # Función para estimar la desviación estándar de la demanda (método anterior como respaldo)
-    def estimar_desviacion_demanda(consumo_7_dias):
+    @instrumentar("pronosticar_demanda_lote")
+    @st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner="Ajustando el pronóstico de demanda...")
+    def pronostico_historial_cache(id_archivo, metodo, _archivo):
         """
-        Estima la desviación estándar diaria de la demanda
-        Asume que la desviación estándar es aproximadamente 20% de la demanda promedio
+        Demanda pronosticada y desviación del error de pronóstico de todos los SKUs del historial subido
         """
-        demanda_promedio_diaria = consumo_7_dias / 7
-        return demanda_promedio_diaria * 0.2
+        skus, _, consumos = matriz_consumos_cache(id_archivo, _archivo)
+        return pronosticar_demanda_lote(consumos, metodo, skus=skus).resumen
     
-    # Función para validar inputs
-    def validar_inputs(**kwargs):
+    @instrumentar("backtest_cantidad_fija")
+    @st.cache_data(max_entries=MAX_ENTRADAS_CACHE, show_spinner="Reproduciendo el historial...")
+    def backtest_sku_cache(id_archivo, sku, prob_falta_stock, tiempo_reposicion, ventana, recalcular_cada, _archivo):
         """
-        Valida que todos los inputs sean válidos
+        Backtesting de un SKU del historial subido con las series diarias para el gráfico
         """
-        errores = []
-        
-        for nombre, valor in kwargs.items():
-            if valor is None or valor <= 0:
-                errores.append(f"El campo '{nombre}' debe ser un número positivo")
-        
-        return errores
+        skus, fechas, consumos = matriz_consumos_cache(id_archivo, _archivo)
+        fila = skus.get_loc(sku)
+        resultado = backtest_cantidad_fija(
+            consumos[fila:fila + 1], prob_falta_stock, tiempo_reposicion,
+            ventana=ventana, recalcular_cada=recalcular_cada, skus=skus[fila:fila + 1], detalle=True
+        )
+        return resultado, fechas[resultado.primer_dia:].to_numpy()
+    
+    @st.cache_data(max_entries=MAX_ENTRADAS_CACHE_INDICES, show_spinner="Filtrando resultados...")
+    def indices_ejecucion_cache(ruta, creada, texto_sku, columna_filtro, minimo, maximo,
+                                columna_orden, descendente):
+        """
+        Índices de las filas de una ejecución guardada tras buscar, filtrar y ordenar en el servidor
+
+        Devuelve None si se ven todas las filas en su orden original. creada
+        invalida la caché si la ejecución se reemplaza.
+        """
+        ejecucion = Ejecucion(ruta)
+        indices = None
+        if texto_sku:
+            indices = ejecucion.buscar("sku", texto_sku)
+        if columna_filtro is not None and (minimo is not None or maximo is not None):
+            indices = ejecucion.filtrar(columna_filtro, minimo, maximo, indices)
+        if columna_orden is not None:
+            indices = ejecucion.ordenar(columna_orden, descendente, indices)
+        return indices
+    
+    # Configuración de la página
+    st.set_page_config(
+        page_title="Sistema de Gestión de Inventario",
+        page_icon="📦",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+    
+    # La medición de memoria es del proceso (INVENTARIO_MEDIR_MEMORIA), no de la sesión
+    instrumentacion.iniciar_recoleccion()
+    
+    # Título principal
+    st.title("📦 Planificación de Compras e Inventario")
+    st.markdown("**Cálculo de inventario para sistemas de cantidad fija y período fijo**")
+    
+    # Sidebar para selección del método
+    st.sidebar.header("Seleccionar Método de Gestión")
+    metodo = st.sidebar.selectbox(
+        "Sistema de compras:",
+        ["Sistema de Cantidad Fija", "Sistema de Período Fijo", "Resultados Guardados"]
+    )
+    
+    # Historial de consumo opcional (formato largo: sku, fecha, cantidad)
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("📂 Historial de Consumo")
+    archivo_historial = st.sidebar.file_uploader(
+        "Archivo CSV o Parquet con columnas sku, fecha, cantidad",
+        type=["csv", "parquet"],
+        help="Se procesa por bloques; sustituye a los consumos de los últimos 7 días"
+    )
+    estadisticas_sku = None
+    sku_historial = None
+    if archivo_historial is not None:
+        rellenar_dias = st.sidebar.checkbox(
+            "Contar días sin registro como consumo cero",
+            value=True,
+            help="Las exportaciones del ERP suelen omitir los días sin consumo"
+        )
+        estadisticas_historial = agregar_historial_cache(
+            archivo_historial.file_id, rellenar_dias, archivo_historial
+        )
+        if estadisticas_historial.empty:
+            st.sidebar.warning("El historial no contiene filas de consumo.")
+        else:
+            sku_historial = st.sidebar.selectbox("SKU:", estadisticas_historial.index)
+            estadisticas_sku = estadisticas_historial.loc[sku_historial]
+            metodo_pronostico = st.sidebar.selectbox(
+                "Demanda diaria:",
+                [None, "holt_winters", "holt", "simple"],
+                format_func=lambda metodo: {
+                    None: "Media del historial",
+                    "holt_winters": "Pronóstico Holt-Winters (semanal)",
+                    "holt": "Pronóstico con tendencia (Holt)",
+                    "simple": "Suavizado exponencial simple",
+                }[metodo],
+                help="Con un pronóstico, la demanda es la media pronosticada de la próxima semana "
+                     "y la desviación es la del error de pronóstico a un día, que no incluye la "
+                     "variación que el pronóstico ya explica (día de la semana, tendencia)",
+                key="metodo_pronostico"
+            )
+            if metodo_pronostico is not None:
+                minimo_dias = dias_minimos(metodo_pronostico)
+                if len(matriz_consumos_cache(archivo_historial.file_id, archivo_historial)[1]) < minimo_dias:
+                    st.sidebar.warning(f"Este pronóstico necesita al menos {minimo_dias} días de historial.")
+                else:
+                    pronostico_sku = pronostico_historial_cache(
+                        archivo_historial.file_id, metodo_pronostico, archivo_historial
+                    ).loc[sku_historial]
+                    estadisticas_sku = estadisticas_sku.copy()
+                    estadisticas_sku["demanda_promedio_diaria"] = pronostico_sku["demanda_promedio_diaria"]
+                    estadisticas_sku["desviacion_demanda"] = pronostico_sku["desviacion_demanda"]
+                    st.sidebar.caption(
+                        f"Pronóstico: {pronostico_sku['demanda_promedio_diaria']:.1f} unidades/día, "
+                        f"error σ {pronostico_sku['desviacion_demanda']:.1f} "
+                        f"(media {estadisticas_historial.loc[sku_historial, 'demanda_promedio_diaria']:.1f}, "
+                        f"σ {estadisticas_historial.loc[sku_historial, 'desviacion_demanda']:.1f})"
+                    )
     
     # Sistema de Cantidad Fija
     if metodo == "Sistema de Cantidad Fija":
@@ -130,6 +316,49 @@ if st.session_state.authenticated:
                 help="Días que transcurren desde que se hace el pedido hasta que se recibe"
             )
             
+            desviacion_tiempo_reposicion = st.number_input(
+                "Desviación estándar del plazo de entrega (días)",
+                min_value=0.0,
+                max_value=365.0,
+                value=0.0,
+                step=0.5,
+                key="desviacion_plazo_fijo",
+                help="Variabilidad del plazo del proveedor; con 0 se supone un plazo fijo"
+            )
+            
+            # El modelo empírico remuestrea los consumos diarios, que no se conservan del historial
+            opciones_modelo = [
+                etiqueta for etiqueta, modelo in MODELOS_DEMANDA.items()
+                if not (modelo == "empirico" and estadisticas_sku is not None)
+            ]
+            modelo_demanda = MODELOS_DEMANDA[st.selectbox(
+                "Modelo de demanda",
+                opciones_modelo,
+                key="modelo_demanda_fijo",
+                help="La normal es la fórmula clásica; los demás modelos calculan el punto de reorden "
+                     "como cuantil de la demanda durante el plazo, útil para artículos intermitentes "
+                     "o con coeficiente de variación alto",
+                disabled=desviacion_tiempo_reposicion > 0
+            )]
+            if desviacion_tiempo_reposicion > 0:
+                modelo_demanda = "normal"
+            
+            # La convolución necesita los consumos diarios, que (como en el modelo empírico) no se
+            # conservan del historial
+            metodo_plazo = "analitico"
+            if desviacion_tiempo_reposicion > 0 and estadisticas_sku is None:
+                metodo_plazo = st.selectbox(
+                    "Demanda durante el plazo",
+                    ["analitico", "convolucion"],
+                    format_func=lambda metodo: {
+                        "analitico": "Fórmula normal",
+                        "convolucion": "Distribución completa (convolución)",
+                    }[metodo],
+                    key="metodo_plazo_fijo",
+                    help="La convolución combina la distribución de los consumos diarios con la de un "
+                         "plazo normal; conviene cuando la demanda durante el plazo es asimétrica"
+                )
+            
             st.subheader("Consumo Diario de los Últimos 7 Días")
             st.markdown("Ingrese el volumen consumido para cada día:")
             
@@ -204,42 +433,71 @@ if st.session_state.authenticated:
             st.info(f"**Total consumido en 7 días:** {consumo_7_dias} unidades")
             st.info(f"**Promedio diario:** {consumo_7_dias/7:.1f} unidades")
             
+            if estadisticas_sku is not None:
+                st.warning(
+                    f"**Historial cargado (SKU {sku_historial}):** {int(estadisticas_sku['n_dias'])} días, "
+                    f"promedio diario {estadisticas_sku['demanda_promedio_diaria']:.1f} unidades. "
+                    "Los cálculos usan el historial en lugar de los consumos de 7 días."
+                )
+            
             # Gráfico de consumo diario para sistema fijo
             if st.checkbox("Mostrar gráfico de consumo diario", key="grafico_fijo"):
-                dias_labels = ['Hace 7 días', 'Hace 6 días', 'Hace 5 días', 'Hace 4 días', 'Hace 3 días', 'Hace 2 días', 'Ayer']
-                fig_consumo = go.Figure(data=[
-                    go.Bar(x=dias_labels, y=consumos_diarios, marker_color='lightblue')
-                ])
-                fig_consumo.add_hline(y=consumo_7_dias/7, line_dash="dash", line_color="red", annotation_text="Promedio")
-                fig_consumo.update_layout(
-                    title="Patrón de Consumo Diario - Últimos 7 Días",
-                    xaxis_title="Días",
-                    yaxis_title="Unidades Consumidas",
-                    showlegend=False
-                )
-                st.plotly_chart(fig_consumo, use_container_width=True)
+                fig_consumo = figura_consumo_diario_cache(tuple(consumos_diarios), 'lightblue')
+                mostrar_grafico(fig_consumo, use_container_width=True)
         
         with col2:
             st.subheader("Resultados del Cálculo")
             
+            # Demanda promedio y desviación estándar real: historial cargado o últimos 7 días
+            if estadisticas_sku is None:
+                demanda_promedio_diaria = consumo_7_dias / 7
+                desviacion_demanda = calcular_desviacion_demanda_real(consumos_diarios)
+            else:
+                demanda_promedio_diaria = estadisticas_sku["demanda_promedio_diaria"]
+                desviacion_demanda = estadisticas_sku["desviacion_demanda"]
+            
             # Validación
             errores = validar_inputs(
                 prob_falta_stock=prob_falta_stock,
                 tiempo_reposicion=tiempo_reposicion,
-                consumo_7_dias=consumo_7_dias
+                demanda_promedio_diaria=demanda_promedio_diaria
             )
             
             if not errores:
                 # Cálculos
-                demanda_promedio_diaria = consumo_7_dias / 7
-                # Usar desviación estándar real basada en datos históricos
-                desviacion_demanda = calcular_desviacion_demanda_real(consumos_diarios)
                 z_score = calcular_z_score(prob_falta_stock)
                 
                 # Inventario de seguridad
-                inventario_seguridad = calcular_inventario_seguridad(
-                    z_score, desviacion_demanda, tiempo_reposicion
-                )
+                if modelo_demanda != "normal":
+                    if estadisticas_sku is None:
+                        demanda_modelo = {"consumos_diarios": [consumos_diarios]}
+                    else:
+                        demanda_modelo = {
+                            "demanda_promedio_diaria": [demanda_promedio_diaria],
+                            "desviacion_demanda": [desviacion_demanda],
+                        }
+                    resultado_modelo = calcular_cantidad_fija_modelos_lote(
+                        [prob_falta_stock], [tiempo_reposicion], modelo=modelo_demanda, **demanda_modelo
+                    ).iloc[0]
+                    modelo_demanda = resultado_modelo["modelo"]
+                    inventario_seguridad = resultado_modelo["inventario_seguridad"]
+                elif metodo_plazo == "convolucion":
+                    resultado_plazo = calcular_cantidad_fija_plazo_variable_lote(
+                        [prob_falta_stock],
+                        consumos_diarios=[consumos_diarios],
+                        muestras_plazo=muestras_plazo_normal([tiempo_reposicion], [desviacion_tiempo_reposicion]),
+                        metodo="convolucion"
+                    ).iloc[0]
+                    inventario_seguridad = resultado_plazo["punto_reorden"] - demanda_promedio_diaria * tiempo_reposicion
+                elif desviacion_tiempo_reposicion > 0:
+                    inventario_seguridad = calcular_inventario_seguridad_plazo_variable(
+                        z_score, desviacion_demanda, tiempo_reposicion,
+                        demanda_promedio_diaria, desviacion_tiempo_reposicion
+                    )
+                else:
+                    inventario_seguridad = calcular_inventario_seguridad(
+                        z_score, desviacion_demanda, tiempo_reposicion
+                    )
                 
                 # Punto de reorden
                 punto_reorden = (demanda_promedio_diaria * tiempo_reposicion) + inventario_seguridad
@@ -255,7 +513,17 @@ if st.session_state.authenticated:
                 st.write(f"**Coeficiente de variación:** {(desviacion_demanda/demanda_promedio_diaria)*100:.1f}%")
                 st.write(f"**Z-score (nivel de servicio):** {z_score:.2f}")
                 st.write(f"**Nivel de servicio:** {100 - prob_falta_stock:.1f}%")
-                st.write(f"**Fórmula aplicada:** z × σ × √(tiempo de reposición)")
+                if modelo_demanda != "normal":
+                    st.write(f"**Modelo de demanda:** {modelo_demanda.replace('_', ' ')}")
+                    st.write(f"**Z-score equivalente:** {resultado_modelo['z_equivalente']:.2f}")
+                    st.write(f"**Fórmula aplicada:** cuantil {100 - prob_falta_stock}% de la demanda durante el plazo")
+                elif metodo_plazo == "convolucion":
+                    st.write(f"**Asimetría de la demanda durante el plazo:** {resultado_plazo['asimetria_demanda_plazo']:.2f}")
+                    st.write(f"**Fórmula aplicada:** cuantil {100 - prob_falta_stock}% de la demanda durante el plazo variable")
+                elif desviacion_tiempo_reposicion > 0:
+                    st.write(f"**Fórmula aplicada:** z × √(tiempo de reposición × σ² + demanda² × σ plazo²)")
+                else:
+                    st.write(f"**Fórmula aplicada:** z × σ × √(tiempo de reposición)")
                 
             else:
                 for error in errores:
@@ -266,68 +534,190 @@ if st.session_state.authenticated:
             st.subheader("📈 Visualización del Sistema")
             
             # Gráfico de evolución del inventario
-            dias = np.arange(0, 30)
-            inventario_inicial = punto_reorden * 3  # Iniciar con el triple del punto de reorden
-            cantidad_pedido_fija = punto_reorden * 2  # Cantidad de pedido que restaura al triple
-            
-            # Simulación con manejo de lead time
-            inventario_simulado = []
-            inventario_actual_sim = inventario_inicial
-            pedido_en_transito = 0
-            dia_llegada_pedido = -1
-            
-            for dia in dias:
-                # Verificar si llega un pedido hoy
-                if dia == dia_llegada_pedido and pedido_en_transito > 0:
-                    inventario_actual_sim += pedido_en_transito
-                    pedido_en_transito = 0
-                    dia_llegada_pedido = -1
-                
-                # Consumo diario con variación aleatoria
-                consumo_diario = np.random.normal(demanda_promedio_diaria, desviacion_demanda)
-                inventario_actual_sim -= consumo_diario
-                
-                # Hacer pedido cuando se alcanza el punto de reorden (solo si no hay pedido en tránsito)
-                if inventario_actual_sim <= punto_reorden and pedido_en_transito == 0:
-                    pedido_en_transito = cantidad_pedido_fija
-                    dia_llegada_pedido = dia + tiempo_reposicion  # El pedido llega después del lead time
-                
-                inventario_simulado.append(max(0, inventario_actual_sim))
-            
-            # Crear gráfico
-            fig = go.Figure()
-            
-            fig.add_trace(go.Scatter(
-                x=dias,
-                y=inventario_simulado,
-                mode='lines+markers',
-                name='Nivel de Inventario',
-                line=dict(color='blue', width=2)
+            col_horizonte, col_semilla = st.columns([3, 1])
+            horizonte_simulacion = col_horizonte.slider(
+                "Horizonte de la simulación (días)",
+                min_value=30,
+                max_value=1095,
+                value=30,
+                step=5,
+                key="horizonte_simulacion"
+            )
+            semilla_simulacion = int(col_semilla.number_input(
+                "Semilla",
+                min_value=0,
+                value=SEMILLA_POR_DEFECTO,
+                step=1,
+                help="Con la misma semilla la simulación da siempre el mismo resultado; "
+                     "cámbiela para ver otra muestra de trayectorias",
+                key="semilla_simulacion"
             ))
+            dias = np.arange(0, horizonte_simulacion)
+            # Cantidad de pedido que restaura al triple del punto de reorden; al menos una unidad,
+            # porque con demanda casi nula los modelos discretos pueden dar un punto de reorden 0
+            cantidad_pedido_fija = max(punto_reorden * 2, 1)
+            inventario_inicial = punto_reorden + cantidad_pedido_fija  # Iniciar con el triple del punto de reorden
             
-            fig.add_hline(
-                y=punto_reorden,
-                line_dash="dash",
-                line_color="red",
-                annotation_text="Punto de Reorden"
+            # Simulación Monte Carlo con manejo de lead time
+            simulacion, bandas_simulacion = simulacion_resumida_cache(
+                punto_reorden=punto_reorden,
+                cantidad_pedido=cantidad_pedido_fija,
+                inventario_inicial=inventario_inicial,
+                demanda_promedio_diaria=demanda_promedio_diaria,
+                desviacion_demanda=desviacion_demanda,
+                tiempo_reposicion=tiempo_reposicion,
+                dias=len(dias),
+                semilla=semilla_simulacion
             )
+            inventario_simulado = simulacion.trayectorias[0]
             
-            fig.add_hline(
-                y=inventario_seguridad,
-                line_dash="dash",
-                line_color="orange",
-                annotation_text="Inventario de Seguridad"
+            col_sim1, col_sim2, col_sim3 = st.columns(3)
+            col_sim1.metric(
+                "Nivel de llenado simulado",
+                f"{simulacion.nivel_llenado * 100:.1f}%"
+            )
+            if np.isnan(simulacion.prob_falta_ciclo):
+                col_sim2.metric("Probabilidad de falta por ciclo", "Sin ciclos completos")
+            else:
+                col_sim2.metric(
+                    "Probabilidad de falta por ciclo",
+                    f"{simulacion.prob_falta_ciclo * 100:.1f}%",
+                    delta=f"{simulacion.prob_falta_ciclo * 100 - prob_falta_stock:+.1f} pp vs objetivo",
+                    delta_color="inverse"
+                )
+            col_sim3.metric(
+                "Inventario promedio simulado",
+                f"{round(simulacion.inventario_promedio)} unidades"
+            )
+            st.caption(
+                f"Resultados de {N_TRAYECTORIAS_SIMULACION:,} trayectorias de {len(dias)} días; "
+                f"el gráfico muestra una de ellas y las bandas de percentiles de {N_TRAYECTORIAS_BANDAS:,}."
             )
             
-            fig.update_layout(
-                title="Simulación del Sistema de Cantidad Fija",
-                xaxis_title="Días",
-                yaxis_title="Unidades en Inventario",
-                hovermode='x unified',
-                yaxis=dict(range=[0, max(inventario_simulado) * 1.1])
+            # Crear gráfico
+            fig = figura_simulacion_cantidad_fija_cache(
+                dias, inventario_simulado, punto_reorden, inventario_seguridad,
+                bandas=bandas_simulacion
             )
             
-            st.plotly_chart(fig, use_container_width=True)
+            mostrar_grafico(fig, use_container_width=True)
+            
+            # Optimización del nivel de servicio
+            with st.expander("🎯 Optimizar nivel de servicio"):
+                st.markdown(
+                    "Evalúa todas las probabilidades de escasez de 1% a 50% y elige la de menor "
+                    "costo diario, con la cantidad de pedido de la simulación."
+                )
+                col_opt1, col_opt2 = st.columns(2)
+                costo_mantener = col_opt1.number_input(
+                    "Costo de mantener una unidad por día",
+                    min_value=0.0,
+                    value=0.05,
+                    step=0.01,
+                    format="%.3f"
+                )
+                costo_faltante = col_opt2.number_input(
+                    "Costo por unidad faltante",
+                    min_value=0.0,
+                    value=2.0,
+                    step=0.1
+                )
+                usar_monte_carlo = st.checkbox(
+                    "Verificar con simulación Monte Carlo",
+                    help="Simula 500 trayectorias de 90 días por cada probabilidad de la rejilla"
+                )
+                
+                argumentos_costos = (
+                    demanda_promedio_diaria, desviacion_demanda, tiempo_reposicion,
+                    cantidad_pedido_fija, costo_mantener, costo_faltante
+                )
+                costos = costos_nivel_servicio(*argumentos_costos)[0]
+                costos_mc = None
+                if usar_monte_carlo:
+                    costos_mc = costos_nivel_servicio_monte_carlo_cache(
+                        *argumentos_costos, semilla=semilla_simulacion
+                    )[0]
+                costos_decision = costos_mc if costos_mc is not None else costos
+                prob_optima = int(PROBABILIDADES_FALTA[np.argmin(costos_decision)])
+                
+                col_opt3, col_opt4 = st.columns(2)
+                col_opt3.metric(
+                    "Probabilidad de escasez óptima",
+                    f"{prob_optima}%",
+                    delta=f"{prob_optima - prob_falta_stock:+d} pp vs actual",
+                    delta_color="off"
+                )
+                col_opt4.metric(
+                    "Costo diario esperado",
+                    f"{costos_decision.min():.2f}",
+                    delta=f"{costos_decision.min() - costos_decision[prob_falta_stock - 1]:+.2f} vs actual",
+                    delta_color="inverse"
+                )
+                
+                fig_costos = figura_costos_nivel_servicio_cache(
+                    PROBABILIDADES_FALTA, costos, costos_mc, prob_optima
+                )
+                mostrar_grafico(fig_costos, use_container_width=True)
+            
+            # Backtesting con el consumo real del historial
+            if sku_historial is not None:
+                with st.expander("🔁 Backtesting del punto de reorden"):
+                    st.markdown(
+                        f"Reproduce día a día el consumo real del SKU {sku_historial} con el punto de "
+                        "reorden recalculado sobre una ventana móvil de los días anteriores y la "
+                        "cantidad de pedido de la simulación (dos veces el punto de reorden)."
+                    )
+                    # La matriz cubre todos los días del archivo, con cero los días sin registro
+                    fechas_historial = matriz_consumos_cache(archivo_historial.file_id, archivo_historial)[1]
+                    n_dias_historial = len(fechas_historial)
+                    col_bt1, col_bt2 = st.columns(2)
+                    ventana_backtest = col_bt1.slider(
+                        "Ventana móvil (días)",
+                        min_value=7,
+                        max_value=max(7, min(180, n_dias_historial - 1)),
+                        value=min(VENTANA_POR_DEFECTO, max(7, n_dias_historial - 1)),
+                        key="ventana_backtest"
+                    )
+                    recalcular_cada = col_bt2.selectbox(
+                        "Recalcular el punto de reorden cada",
+                        [1, 7, 14, 28],
+                        format_func=lambda dias: "día" if dias == 1 else f"{dias} días",
+                        key="recalcular_backtest"
+                    )
+                    
+                    if n_dias_historial <= ventana_backtest:
+                        st.warning(
+                            f"El historial tiene {n_dias_historial} días; "
+                            "se necesitan más días que la ventana móvil."
+                        )
+                    else:
+                        backtest, fechas_backtest = backtest_sku_cache(
+                            archivo_historial.file_id, sku_historial, prob_falta_stock,
+                            tiempo_reposicion, ventana_backtest, recalcular_cada, archivo_historial
+                        )
+                        fila_backtest = backtest.resumen.iloc[0]
+                        
+                        col_bt3, col_bt4, col_bt5, col_bt6 = st.columns(4)
+                        col_bt3.metric("Nivel de llenado real", f"{fila_backtest['nivel_llenado'] * 100:.1f}%")
+                        col_bt4.metric(
+                            "Días sin stock",
+                            f"{int(fila_backtest['dias_sin_stock'])} de {int(fila_backtest['dias_evaluados'])}"
+                        )
+                        col_bt5.metric("Inventario promedio", f"{round(fila_backtest['inventario_promedio'])} unidades")
+                        if np.isnan(fila_backtest["prob_falta_ciclo"]):
+                            col_bt6.metric("Probabilidad de falta por ciclo", "Sin ciclos completos")
+                        else:
+                            col_bt6.metric(
+                                "Probabilidad de falta por ciclo",
+                                f"{fila_backtest['prob_falta_ciclo'] * 100:.1f}%",
+                                delta=f"{fila_backtest['prob_falta_ciclo'] * 100 - prob_falta_stock:+.1f} pp vs objetivo",
+                                delta_color="inverse"
+                            )
+                        
+                        fig_backtest = figura_backtest_cantidad_fija_cache(
+                            fechas_backtest, backtest.inventario[0], backtest.punto_reorden[0]
+                        )
+                        mostrar_grafico(fig_backtest, use_container_width=True)
     
     # Sistema de Período Fijo
     elif metodo == "Sistema de Período Fijo":
@@ -357,6 +747,16 @@ if st.session_state.authenticated:
                 help="Días que transcurren desde que se hace el pedido hasta que se recibe"
             )
             
+            desviacion_tiempo_reposicion = st.number_input(
+                "Desviación estándar del plazo de entrega (días)",
+                min_value=0.0,
+                max_value=365.0,
+                value=0.0,
+                step=0.5,
+                key="desviacion_plazo_periodo",
+                help="Variabilidad del plazo del proveedor; con 0 se supone un plazo fijo"
+            )
+            
             ciclo_pedido = st.number_input(
                 "Período de ciclo para el sistema de pedidos periódicos (días)",
                 min_value=1,
@@ -448,38 +848,40 @@ if st.session_state.authenticated:
             st.info(f"**Total consumido en 7 días:** {consumo_7_dias} unidades")
             st.info(f"**Promedio diario:** {consumo_7_dias/7:.1f} unidades")
             
+            if estadisticas_sku is not None:
+                st.warning(
+                    f"**Historial cargado (SKU {sku_historial}):** {int(estadisticas_sku['n_dias'])} días, "
+                    f"promedio diario {estadisticas_sku['demanda_promedio_diaria']:.1f} unidades. "
+                    "Los cálculos usan el historial en lugar de los consumos de 7 días."
+                )
+            
             # Gráfico de consumo diario para sistema periódico
             if st.checkbox("Mostrar gráfico de consumo diario", key="grafico_periodo"):
-                dias_labels = ['Hace 7 días', 'Hace 6 días', 'Hace 5 días', 'Hace 4 días', 'Hace 3 días', 'Hace 2 días', 'Ayer']
-                fig_consumo_p = go.Figure(data=[
-                    go.Bar(x=dias_labels, y=consumos_diarios_p, marker_color='lightgreen')
-                ])
-                fig_consumo_p.add_hline(y=consumo_7_dias/7, line_dash="dash", line_color="red", annotation_text="Promedio")
-                fig_consumo_p.update_layout(
-                    title="Patrón de Consumo Diario - Últimos 7 Días",
-                    xaxis_title="Días",
-                    yaxis_title="Unidades Consumidas",
-                    showlegend=False
-                )
-                st.plotly_chart(fig_consumo_p, use_container_width=True)
+                fig_consumo_p = figura_consumo_diario_cache(tuple(consumos_diarios_p), 'lightgreen')
+                mostrar_grafico(fig_consumo_p, use_container_width=True)
         
         with col2:
             st.subheader("Resultados del Cálculo")
             
+            # Demanda promedio y desviación estándar real: historial cargado o últimos 7 días
+            if estadisticas_sku is None:
+                demanda_promedio_diaria = consumo_7_dias / 7
+                desviacion_demanda = calcular_desviacion_demanda_real(consumos_diarios_p)
+            else:
+                demanda_promedio_diaria = estadisticas_sku["demanda_promedio_diaria"]
+                desviacion_demanda = estadisticas_sku["desviacion_demanda"]
+            
             # Validación
             errores = validar_inputs(
                 prob_falta_stock=prob_falta_stock,
                 tiempo_reposicion=tiempo_reposicion,
                 ciclo_pedido=ciclo_pedido,
                 inventario_actual=inventario_actual,
-                consumo_7_dias=consumo_7_dias
+                demanda_promedio_diaria=demanda_promedio_diaria
             )
             
             if not errores:
                 # Cálculos
-                demanda_promedio_diaria = consumo_7_dias / 7
-                # Usar desviación estándar real basada en datos históricos
-                desviacion_demanda = calcular_desviacion_demanda_real(consumos_diarios_p)
                 z_score = calcular_z_score(prob_falta_stock)
                 
                 # Período de riesgo (ciclo de pedido + tiempo de reposición)
@@ -487,9 +889,15 @@ if st.session_state.authenticated:
                 
                 # Inventario de seguridad para sistema periódico
                 # Usar período de riesgo completo: z * σ * √(ciclo + tiempo_reposicion)
-                inventario_seguridad = calcular_inventario_seguridad(
-                    z_score, desviacion_demanda, periodo_riesgo
-                )
+                if desviacion_tiempo_reposicion > 0:
+                    inventario_seguridad = calcular_inventario_seguridad_plazo_variable(
+                        z_score, desviacion_demanda, periodo_riesgo,
+                        demanda_promedio_diaria, desviacion_tiempo_reposicion
+                    )
+                else:
+                    inventario_seguridad = calcular_inventario_seguridad(
+                        z_score, desviacion_demanda, periodo_riesgo
+                    )
                 
                 # Demanda esperada durante el período de riesgo
                 demanda_esperada = demanda_promedio_diaria * periodo_riesgo
@@ -512,7 +920,10 @@ if st.session_state.authenticated:
                 st.write(f"**Período de riesgo:** {periodo_riesgo} días")
                 st.write(f"**Demanda esperada (período de riesgo):** {round(demanda_esperada)} unidades")
                 st.write(f"**Nivel de servicio:** {100 - prob_falta_stock:.1f}%")
-                st.write(f"**Fórmula aplicada:** z × σ × √(ciclo + tiempo de reposición)")
+                if desviacion_tiempo_reposicion > 0:
+                    st.write(f"**Fórmula aplicada:** z × √((ciclo + tiempo de reposición) × σ² + demanda² × σ plazo²)")
+                else:
+                    st.write(f"**Fórmula aplicada:** z × σ × √(ciclo + tiempo de reposición)")
                 
                 # Recomendación
                 if cantidad_pedir > 0:
@@ -529,87 +940,173 @@ if st.session_state.authenticated:
             st.subheader("📈 Visualización del Sistema")
             
             # Gráfico de proyección (primero)
-            dias_proyeccion = np.arange(0, ciclo_pedido + tiempo_reposicion + 5)
-            inventario_proyectado = []
-            inventario_temp = inventario_actual
-            
-            for dia in dias_proyeccion:
-                # En el día 0, comenzamos con el inventario actual
-                if dia == 0:
-                    inventario_proyectado.append(inventario_temp)
-                    continue
-                    
-                # Consumo diario primero
-                inventario_temp -= demanda_promedio_diaria
+            dias_proyeccion, inventario_proyectado = proyectar_periodo_fijo(
+                inventario_actual, demanda_promedio_diaria, cantidad_pedir,
+                tiempo_reposicion, ciclo_pedido
+            )
+            
+            fig2 = figura_proyeccion_periodo_fijo_cache(
+                dias_proyeccion, inventario_proyectado, inventario_seguridad,
+                tiempo_reposicion, ciclo_pedido, nivel_objetivo
+            )
+            
+            mostrar_grafico(fig2, use_container_width=True)
+            
+            # Gráfico de barras comparativo (segundo)
+            fig = figura_comparacion_niveles_cache(
+                inventario_actual, inventario_seguridad, demanda_esperada, nivel_objetivo
+            )
+            
+            mostrar_grafico(fig, use_container_width=True)
+            
+            # Barrido de escenarios: todo el cubo en una sola llamada, sin un rerun por valor
+            with st.expander("🗺️ Barrido de escenarios"):
+                st.markdown(
+                    "Calcula el inventario de seguridad y la cantidad a pedir para todas las "
+                    "combinaciones de tiempo de reposición, ciclo de pedido y probabilidad de "
+                    "escasez de los rangos elegidos, con la demanda y el inventario actuales."
+                )
+                col_esc1, col_esc2, col_esc3 = st.columns(3)
+                rango_tiempos = col_esc1.slider(
+                    "Tiempo de reposición (días)",
+                    min_value=1,
+                    max_value=365,
+                    value=(1, min(365, max(30, 2 * tiempo_reposicion))),
+                    key="rango_tiempos_escenarios"
+                )
+                rango_ciclos = col_esc2.slider(
+                    "Ciclo de pedido (días)",
+                    min_value=1,
+                    max_value=365,
+                    value=(1, min(365, max(30, 2 * ciclo_pedido))),
+                    key="rango_ciclos_escenarios"
+                )
+                rango_probabilidades = col_esc3.slider(
+                    "Probabilidad de escasez (%)",
+                    min_value=1,
+                    max_value=50,
+                    value=(1, 50),
+                    key="rango_probabilidades_escenarios"
+                )
                 
-                # Llegada del primer pedido en el día (tiempo_reposicion + 1)
-                if dia == tiempo_reposicion + 1 and cantidad_pedir > 0:
-                    inventario_temp += cantidad_pedir
+                cubo = barrido_periodo_fijo_cache(
+                    demanda_promedio_diaria, desviacion_demanda, inventario_actual,
+                    np.arange(rango_tiempos[0], rango_tiempos[1] + 1),
+                    np.arange(rango_ciclos[0], rango_ciclos[1] + 1),
+                    np.arange(rango_probabilidades[0], rango_probabilidades[1] + 1),
+                    desviacion_tiempo_reposicion=desviacion_tiempo_reposicion
+                )
+                prob_mostrada = rango_probabilidades[0]
+                if rango_probabilidades[1] > rango_probabilidades[0]:
+                    prob_mostrada = st.slider(
+                        "Probabilidad de escasez mostrada (%)",
+                        min_value=rango_probabilidades[0],
+                        max_value=rango_probabilidades[1],
+                        value=min(max(prob_falta_stock, rango_probabilidades[0]), rango_probabilidades[1]),
+                        key="prob_mostrada_escenarios"
+                    )
+                corte = cubo.corte(prob_mostrada)
+                st.caption(f"{cubo.inventario_seguridad.size:,} escenarios calculados en una sola llamada.")
                 
-                # Llegada del segundo pedido en el día (ciclo + tiempo_reposicion + 1)
-                elif dia == ciclo_pedido + tiempo_reposicion + 1 and cantidad_pedir > 0:
-                    inventario_temp += cantidad_pedir
+                marca = dict(tiempo_actual=tiempo_reposicion, ciclo_actual=ciclo_pedido)
+                fig_seguridad = figura_mapa_calor_escenarios_cache(
+                    cubo.tiempos_reposicion, cubo.ciclos_pedido, cubo.inventario_seguridad[corte],
+                    f"Inventario de Seguridad ({prob_mostrada}% de escasez)", "Unidades", **marca
+                )
+                mostrar_grafico(fig_seguridad, use_container_width=True)
                 
-                inventario_proyectado.append(max(0, inventario_temp))
-            
-            fig2 = go.Figure()
+                fig_pedir = figura_mapa_calor_escenarios_cache(
+                    cubo.tiempos_reposicion, cubo.ciclos_pedido, np.maximum(cubo.nivel_objetivo[corte] - inventario_actual, 0),
+                    f"Cantidad a Pedir ({prob_mostrada}% de escasez)", "Unidades", escala="Blues", **marca
+                )
+                mostrar_grafico(fig_pedir, use_container_width=True)
+    
+    # Resultados de las ejecuciones por lotes guardadas en el almacén
+    elif metodo == "Resultados Guardados":
+        st.header("🗂️ Resultados Guardados")
+        st.markdown(
+            "Resultados por SKU de las ejecuciones por lotes (`python -m inventario.ejecutor "
+            "catalogo --almacen ...`). Se leen del disco por páginas, sin recalcular."
+        )
+        
+        ejecuciones = listar_ejecuciones(DIRECTORIO_ALMACEN)
+        if not ejecuciones:
+            st.info(f"No hay ejecuciones guardadas en `{DIRECTORIO_ALMACEN}`.")
+        else:
+            nombre_ejecucion = st.selectbox("Ejecución:", ejecuciones[::-1], key="ejecucion_guardada")
+            ejecucion = abrir_ejecucion(DIRECTORIO_ALMACEN, nombre_ejecucion)
             
-            fig2.add_trace(go.Scatter(
-                x=dias_proyeccion,
-                y=inventario_proyectado,
-                mode='lines+markers',
-                name='Inventario Proyectado',
-                line=dict(color='blue', width=2)
-            ))
+            col_e1, col_e2, col_e3 = st.columns(3)
+            col_e1.metric("SKUs", f"{ejecucion.n_filas:,}")
+            col_e2.metric("Columnas", len(ejecucion.columnas))
+            col_e3.metric("Creada", ejecucion.meta["creada"].replace("T", " "))
             
-            fig2.add_hline(
-                y=inventario_seguridad,
-                line_dash="dash",
-                line_color="orange",
-                annotation_text="Inventario de Seguridad"
+            # Búsqueda, filtro y orden se resuelven en el servidor sobre las columnas mapeadas
+            # en memoria; al navegador solo se envía la página visible
+            columnas_numericas = [
+                c for c in ejecucion.columnas if ejecucion.columna(c).dtype.kind in "biuf"
+            ]
+            col_b1, col_b2, col_b3 = st.columns(3)
+            texto_sku = None
+            if "sku" in ejecucion.columnas:
+                texto_sku = col_b1.text_input("Buscar SKU:", key="buscar_sku_guardado")
+            columna_orden = col_b2.selectbox(
+                "Ordenar por:", [None] + ejecucion.columnas,
+                format_func=lambda c: "Orden original" if c is None else c,
+                key="orden_guardado"
+            )
+            descendente = col_b3.checkbox(
+                "Descendente", key="orden_descendente_guardado", disabled=columna_orden is None
             )
             
-            fig2.add_vline(
-                x=tiempo_reposicion + 1,
-                line_dash="dash",
-                line_color="green",
-                annotation_text="Primera Llegada"
+            col_f1, col_f2, col_f3 = st.columns(3)
+            columna_filtro = col_f1.selectbox(
+                "Filtrar por:", [None] + columnas_numericas,
+                format_func=lambda c: "Sin filtro" if c is None else c,
+                key="filtro_guardado"
             )
+            minimo = maximo = None
+            if columna_filtro is not None:
+                minimo = col_f2.number_input("Mínimo:", value=None, key="filtro_minimo_guardado")
+                maximo = col_f3.number_input("Máximo:", value=None, key="filtro_maximo_guardado")
             
-            fig2.add_vline(
-                x=ciclo_pedido + tiempo_reposicion + 1,
-                line_dash="dash",
-                line_color="blue",
-                annotation_text="Segunda Llegada"
+            indices = indices_ejecucion_cache(
+                ejecucion.ruta, ejecucion.meta["creada"], texto_sku, columna_filtro, minimo, maximo,
+                columna_orden, descendente
             )
+            n_filas = ejecucion.n_filas if indices is None else len(indices)
             
-            fig2.update_layout(
-                title="Proyección del Inventario - Sistema de Período Fijo",
-                xaxis_title="Días",
-                yaxis_title="Unidades en Inventario",
-                hovermode='x unified',
-                yaxis=dict(range=[0, max(max(inventario_proyectado), nivel_objetivo) * 1.1])
+            col_p1, col_p2 = st.columns(2)
+            filas_por_pagina = col_p2.selectbox(
+                "Filas por página:", FILAS_POR_PAGINA, index=1, key="filas_pagina_guardada"
+            )
+            n_paginas = max(1, -(-n_filas // filas_por_pagina))
+            pagina = col_p1.number_input(
+                f"Página (de {n_paginas:,})", min_value=1, max_value=n_paginas, value=1, step=1,
+                key="pagina_guardada"
+            )
+            st.dataframe(
+                ejecucion.pagina(min(pagina, n_paginas) - 1, filas_por_pagina, indices=indices),
+                use_container_width=True
             )
+            st.caption(f"{n_filas:,} filas")
             
-            st.plotly_chart(fig2, use_container_width=True)
+            def exportar_excel_guardado():
+                """
+                Genera el Excel al pulsar el botón, en un archivo temporal y no en memoria
+                """
+                archivo = tempfile.TemporaryFile()
+                ejecucion.exportar_excel(archivo, indices=indices)
+                archivo.seek(0)
+                return archivo
             
-            # Gráfico de barras comparativo (segundo)
-            categorias = ['Inventario Actual', 'Inventario de Seguridad', 'Demanda Esperada', 'Nivel Objetivo']
-            valores = [inventario_actual, inventario_seguridad, demanda_esperada, nivel_objetivo]
-            colores = ['lightblue', 'orange', 'lightgreen', 'red']
-            
-            fig = go.Figure(data=[
-                go.Bar(x=categorias, y=valores, marker_color=colores)
-            ])
-            
-            fig.update_layout(
-                title="Comparación de Niveles de Inventario",
-                xaxis_title="Categorías",
-                yaxis_title="Unidades",
-                showlegend=False
+            st.download_button(
+                f"📥 Exportar {n_filas:,} filas a Excel",
+                exportar_excel_guardado,
+                file_name=f"{ejecucion.nombre}.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                help="Exporta todas las filas filtradas, en el orden elegido"
             )
-            
-            st.plotly_chart(fig, use_container_width=True)
     
     # Información adicional en el sidebar
     st.sidebar.markdown("---")
@@ -626,6 +1123,44 @@ if st.session_state.authenticated:
     - Basado en nivel objetivo
     """)
     
+    # Panel opcional de tiempos por etapa: este rerun y acumulado del proceso
+    st.sidebar.markdown("---")
+    tiempos_rerun = instrumentacion.terminar_recoleccion()
+    if st.sidebar.checkbox("⏱️ Mostrar tiempos por etapa", key="mostrar_tiempos"):
+        st.sidebar.caption(
+            "La memoria pico se mide si el servidor se arrancó con INVENTARIO_MEDIR_MEMORIA=1; "
+            "las etapas que coinciden con las de otra sesión quedan sin pico."
+        )
+        
+        def tabla_tiempos(filas):
+            return [{
+                "Etapa": fila["etapa"],
+                "Llamadas": fila["llamadas"],
+                "Total (ms)": round(fila["segundos_total"] * 1e3, 2),
+                "Máx. (ms)": round(fila["segundos_max"] * 1e3, 2),
+                "Memoria pico (MB)": round(fila["memoria_pico_bytes"] / 2**20, 2),
+            } for fila in filas]
+        
+        st.sidebar.markdown("**Este rerun**")
+        st.sidebar.dataframe(tabla_tiempos(tiempos_rerun), hide_index=True)
+        tiempos_proceso = instrumentacion.resumen()
+        st.sidebar.markdown("**Acumulado del proceso**")
+        st.sidebar.dataframe(tabla_tiempos(tiempos_proceso), hide_index=True)
+        st.sidebar.download_button(
+            "Exportar (Prometheus)",
+            instrumentacion.texto_prometheus(),
+            file_name="metricas_inventario.prom",
+            mime="text/plain"
+        )
+        st.sidebar.download_button(
+            "Exportar (JSON)",
+            "\n".join(json.dumps(fila) for fila in tiempos_proceso) + "\n",
+            file_name="metricas_inventario.jsonl",
+            mime="application/x-ndjson"
+        )
+        if st.sidebar.button("Reiniciar mediciones"):
+            instrumentacion.reiniciar()
+    
     st.sidebar.markdown("---")
     st.sidebar.markdown("**Desarrollado para gestión de inventario**")
     st.sidebar.markdown("📊 Cálculos basados en teoría estadística")
@@ -0,0 +1,379 @@
+"""
+Benchmarks de los cálculos y simulaciones críticos.
+
+Mide cada caso con 1, 1k, 100k y 1M artículos o trayectorias (datos de
+entrada generados con semilla fija) e informa rendimiento (elementos por
+segundo), latencias p50/p95/p99 de las repeticiones y memoria máxima
+asignada (tracemalloc, en una ejecución aparte para no distorsionar los
+tiempos).
+
+Uso:
+    python benchmarks/rendimiento.py                         # todos los casos
+    python benchmarks/rendimiento.py --casos simulacion_cantidad_fija --tamanos 1000 100000
+    python benchmarks/rendimiento.py --guardar-base base.json
+    python benchmarks/rendimiento.py --comparar base.json --tolerancia 0.2
+
+Con --comparar sale con código 1 si la mediana de algún caso empeora más
+que la tolerancia respecto de la base guardada en la misma máquina.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventario.calculos import (  # noqa: E402
+    calcular_desviacion_demanda_real,
+    calcular_inventario_seguridad,
+    calcular_inventario_seguridad_lote,
+    calcular_z_score,
+    calcular_z_score_lote,
+    estadisticas_demanda_lote,
+)
+from inventario.backtesting import backtest_cantidad_fija  # noqa: E402
+from inventario.cuantiles import calcular_cantidad_fija_modelos_lote  # noqa: E402
+from inventario.ejecutor import planificar_parametros  # noqa: E402
+from inventario.escenarios import barrido_periodo_fijo  # noqa: E402
+from inventario.incremental import MotorIncremental  # noqa: E402
+from inventario.multiescalon import simular_multiescalon  # noqa: E402
+from inventario.parametros import ParametrosSKU  # noqa: E402
+from inventario.plazo_variable import cuantil_demanda_plazo_lote  # noqa: E402
+from inventario.pronostico import pronosticar_demanda_lote  # noqa: E402
+from inventario.proyeccion import proyectar_periodo_fijo, proyectar_periodo_fijo_lote  # noqa: E402
+from inventario.simulacion import simular_cantidad_fija  # noqa: E402
+
+TAMANOS = (1, 1_000, 100_000, 1_000_000)
+SEMILLA = 12345
+
+# nombre -> (preparar, tamaño máximo). preparar(n, rng) devuelve la función a medir, o
+# (función, elementos) si procesa un número de elementos distinto de n
+CASOS = {}
+
+
+def caso(nombre, tamano_maximo=None):
+    """
+    Registra un caso de benchmark
+    """
+    def registrar(preparar):
+        CASOS[nombre] = (preparar, tamano_maximo)
+        return preparar
+    return registrar
+
+
+@caso("calcular_z_score_lote")
+def _z_score_lote(n, rng):
+    prob = rng.integers(1, 51, n)
+    return lambda: calcular_z_score_lote(prob)
+
+
+@caso("calcular_z_score", tamano_maximo=100_000)
+def _z_score(n, rng):
+    prob = rng.integers(1, 51, n).tolist()
+    # Sin la memoización de lru_cache: con solo 50 probabilidades distintas se medirían aciertos de caché
+    z_score = calcular_z_score.__wrapped__
+    return lambda: [z_score(p) for p in prob]
+
+
+@caso("calcular_inventario_seguridad_lote")
+def _inventario_seguridad_lote(n, rng):
+    z = rng.normal(1.5, 0.3, n)
+    desviacion = rng.gamma(2.0, 2.0, n)
+    tiempo = rng.integers(1, 60, n)
+    return lambda: calcular_inventario_seguridad_lote(z, desviacion, tiempo)
+
+
+@caso("calcular_inventario_seguridad", tamano_maximo=100_000)
+def _inventario_seguridad(n, rng):
+    valores = list(zip(rng.normal(1.5, 0.3, n).tolist(), rng.gamma(2.0, 2.0, n).tolist(),
+                       rng.integers(1, 60, n).tolist()))
+    return lambda: [calcular_inventario_seguridad(z, s, t) for z, s, t in valores]
+
+
+@caso("calcular_desviacion_demanda_lote")
+def _desviacion_lote(n, rng):
+    consumos = rng.poisson(10, (n, 7)).astype(float)
+    return lambda: estadisticas_demanda_lote(consumos)
+
+
+@caso("calcular_desviacion_demanda_real", tamano_maximo=100_000)
+def _desviacion(n, rng):
+    consumos = rng.poisson(10, (n, 7)).tolist()
+    return lambda: [calcular_desviacion_demanda_real(c) for c in consumos]
+
+
+@caso("simulacion_cantidad_fija")
+def _simulacion(n, rng):
+    semilla = int(rng.integers(2**32))
+    return lambda: simular_cantidad_fija(
+        punto_reorden=40, cantidad_pedido=80, inventario_inicial=120,
+        demanda_promedio_diaria=10, desviacion_demanda=4, tiempo_reposicion=3,
+        dias=30, n_trayectorias=n, semilla=semilla,
+    )
+
+
+@caso("simulacion_cantidad_fija_plazo_largo")
+def _simulacion_plazo_largo(n, rng):
+    # Plazo de 30 días con pedidos de 5 días de demanda: unos seis pedidos en camino a la vez
+    semilla = int(rng.integers(2**32))
+    return lambda: simular_cantidad_fija(
+        punto_reorden=330, cantidad_pedido=50, inventario_inicial=380,
+        demanda_promedio_diaria=10, desviacion_demanda=4, tiempo_reposicion=30,
+        dias=90, n_trayectorias=n, semilla=semilla,
+    )
+
+
+@caso("simulacion_multiescalon_200_tiendas_365d", tamano_maximo=1_000)
+def _simulacion_multiescalon(n, rng):
+    # Un almacén central de período fijo y 200 tiendas; n es el número de trayectorias
+    tiendas = 200
+    media = rng.uniform(2, 20, tiendas)
+    plazo = rng.integers(1, 4, tiendas)
+    punto_reorden = media * (plazo + 1) + 2 * 0.4 * media * np.sqrt(plazo + 1)
+    semilla = int(rng.integers(2**32))
+    return lambda: simular_multiescalon(
+        padre=np.r_[-1, np.zeros(tiendas, dtype=int)],
+        politica=["periodo_fijo"] + ["punto_reorden"] * tiendas,
+        tiempo_reposicion=np.r_[7, plazo],
+        inventario_inicial=np.r_[media.sum() * 14, punto_reorden + media * 7],
+        demanda_promedio_diaria=np.r_[0, media],
+        desviacion_demanda=np.r_[0, 0.4 * media],
+        punto_reorden=np.r_[np.nan, punto_reorden],
+        cantidad_pedido=np.r_[np.nan, media * 7],
+        nivel_objetivo=np.r_[media.sum() * 21, np.full(tiendas, np.nan)],
+        ciclo_pedido=7,
+        dias=365, n_trayectorias=n, semilla=semilla,
+    )
+
+
+@caso("proyeccion_periodo_fijo", tamano_maximo=100_000)
+def _proyeccion(n, rng):
+    filas = list(zip(rng.integers(0, 200, n).tolist(), rng.gamma(4.0, 3.0, n).tolist(),
+                     rng.integers(0, 200, n).tolist(), rng.integers(1, 10, n).tolist(),
+                     rng.integers(1, 15, n).tolist()))
+    return lambda: [proyectar_periodo_fijo(*fila) for fila in filas]
+
+
+@caso("proyeccion_periodo_fijo_lote_365d")
+def _proyeccion_lote(n, rng):
+    columnas = (rng.integers(0, 200, n), rng.gamma(4.0, 3.0, n), rng.integers(0, 200, n),
+                rng.integers(1, 10, n), rng.integers(1, 15, n))
+    return lambda: proyectar_periodo_fijo_lote(*columnas, horizonte=365)
+
+
+@caso("cuantil_demanda_plazo_convolucion", tamano_maximo=100_000)
+def _cuantil_plazo(n, rng):
+    consumos = rng.poisson(8, (n, 30)).astype(float)
+    plazos = rng.integers(2, 20, (n, 12)).astype(float)
+    return lambda: cuantil_demanda_plazo_lote(consumos, plazos, 0.95)
+
+
+@caso("cantidad_fija_modelo_gamma")
+def _modelo_gamma(n, rng):
+    demanda = rng.gamma(2.0, 5.0, n)
+    desviacion = demanda * rng.uniform(0.2, 1.5, n)
+    prob, tiempo = rng.integers(1, 51, n), rng.integers(1, 30, n)
+    return lambda: calcular_cantidad_fija_modelos_lote(
+        prob, tiempo, demanda_promedio_diaria=demanda, desviacion_demanda=desviacion, modelo="gamma"
+    )
+
+
+@caso("cantidad_fija_modelo_binomial_negativa")
+def _modelo_binomial_negativa(n, rng):
+    demanda = rng.gamma(2.0, 5.0, n)
+    desviacion = demanda * rng.uniform(0.2, 1.5, n)
+    prob, tiempo = rng.integers(1, 51, n), rng.integers(1, 30, n)
+    return lambda: calcular_cantidad_fija_modelos_lote(
+        prob, tiempo, demanda_promedio_diaria=demanda, desviacion_demanda=desviacion,
+        modelo="binomial_negativa",
+    )
+
+
+@caso("backtest_cantidad_fija_365d", tamano_maximo=100_000)
+def _backtest(n, rng):
+    consumos = rng.poisson(rng.gamma(2.0, 5.0, (n, 1)), (n, 365)).astype(float)
+    prob, tiempo = rng.integers(1, 51, n), rng.integers(1, 15, n)
+    return lambda: backtest_cantidad_fija(consumos, prob, tiempo)
+
+
+@caso("pronostico_holt_winters_365d", tamano_maximo=100_000)
+def _pronostico(n, rng):
+    semana = np.array([1.0, 1.2, 1.0, 0.9, 1.1, 1.6, 0.4])
+    consumos = rng.poisson(rng.gamma(2.0, 5.0, (n, 1)) * semana[np.arange(365) % 7]).astype(float)
+    return lambda: pronosticar_demanda_lote(consumos, "holt_winters")
+
+
+@caso("barrido_periodo_fijo_50_probabilidades")
+def _barrido(n, rng):
+    # Unos n escenarios: 50 probabilidades × lado tiempos de reposición × lado ciclos
+    lado = np.arange(1, max(1, int(np.sqrt(n / 50))) + 1)
+    return lambda: barrido_periodo_fijo(12.0, 4.0, 100.0, lado, lado, np.arange(1, 51)), 50 * len(lado) ** 2
+
+
+@caso("recalculo_incremental_200_skus")
+def _recalculo_incremental(n, rng):
+    # Un catálogo de n SKUs en el que llega consumo nuevo de 200 de ellos
+    catalogo = pd.DataFrame({"prob_falta_stock": rng.integers(1, 51, n),
+                             "tiempo_reposicion": rng.integers(1, 30, n)})
+    motor = MotorIncremental(catalogo)
+    motor.recalcular()
+    skus = rng.integers(0, n, 200)
+    consumos = rng.poisson(8, 200).astype(float)
+
+    def recalcular():
+        motor.registrar_consumo(skus, consumos)
+        motor.recalcular()
+    return recalcular
+
+
+@caso("planificar_parametros_sku")
+def _planificar_parametros(n, rng):
+    # Catálogo compacto con 7 días de consumo en el búfer circular
+    parametros = ParametrosSKU(n)
+    parametros["prob_falta_stock"][:] = rng.integers(1, 51, n)
+    parametros["tiempo_reposicion"][:] = rng.integers(1, 30, n)
+    parametros["ciclo_pedido"][:] = rng.integers(1, 30, n)
+    parametros["inventario_actual"][:] = rng.integers(1, 500, n)
+    for _ in range(parametros.ancho):
+        parametros.registrar_consumo(rng.poisson(8, n))
+    return lambda: planificar_parametros(parametros)
+
+
+def percentil(valores, q):
+    """
+    Percentil q (0-100) de una lista de tiempos
+    """
+    return float(np.percentile(valores, q))
+
+
+def medir_caso(nombre, n, repeticiones, tiempo_maximo):
+    """
+    Mide un caso de tamaño n y devuelve sus métricas; el rendimiento usa los elementos que procesa el caso
+    """
+    preparar, _ = CASOS[nombre]
+    funcion = preparar(n, np.random.default_rng(SEMILLA))
+    elementos = n
+    if isinstance(funcion, tuple):
+        funcion, elementos = funcion
+
+    # Calentamiento (cachés, importaciones perezosas, asignación inicial)
+    funcion()
+
+    tiempos = []
+    inicio_total = time.perf_counter()
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+        if time.perf_counter() - inicio_total > tiempo_maximo:
+            break
+
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mediana = statistics.median(tiempos)
+    return {
+        "caso": nombre,
+        "n": n,
+        "repeticiones": len(tiempos),
+        "mediana_s": mediana,
+        "p50_s": percentil(tiempos, 50),
+        "p95_s": percentil(tiempos, 95),
+        "p99_s": percentil(tiempos, 99),
+        "elementos_por_s": elementos / mediana if mediana > 0 else float("inf"),
+        "memoria_pico_mb": pico / 2**20,
+    }
+
+
+def entorno():
+    """
+    Describe la máquina y las versiones, para saber si dos bases son comparables
+    """
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def comparar(resultados, base, tolerancia):
+    """
+    Devuelve los casos cuya mediana empeora más que la tolerancia respecto de la base
+    """
+    referencia = {(r["caso"], r["n"]): r for r in base["resultados"]}
+    regresiones = []
+    for r in resultados:
+        anterior = referencia.get((r["caso"], r["n"]))
+        if anterior is None:
+            continue
+        cambio = r["mediana_s"] / anterior["mediana_s"] - 1
+        r["cambio_vs_base"] = cambio
+        if cambio > tolerancia:
+            regresiones.append(r)
+    return regresiones
+
+
+def imprimir(resultados):
+    cabecera = f"{'caso':<36}{'n':>10}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'elem/s':>14}{'MB pico':>10}{'vs base':>9}"
+    print(cabecera)
+    print("-" * len(cabecera))
+    for r in resultados:
+        cambio = f"{r['cambio_vs_base'] * 100:+.0f}%" if "cambio_vs_base" in r else ""
+        print(f"{r['caso']:<36}{r['n']:>10}{r['p50_s'] * 1e3:>11.3f}{r['p95_s'] * 1e3:>11.3f}"
+              f"{r['p99_s'] * 1e3:>11.3f}{r['elementos_por_s']:>14.3g}{r['memoria_pico_mb']:>10.1f}{cambio:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de cálculos y simulaciones")
+    parser.add_argument("--casos", nargs="+", choices=sorted(CASOS), default=list(CASOS))
+    parser.add_argument("--tamanos", nargs="+", type=int, default=list(TAMANOS))
+    parser.add_argument("--repeticiones", type=int, default=7)
+    parser.add_argument("--tiempo-maximo", type=float, default=10.0,
+                        help="Segundos máximos de repeticiones por caso y tamaño")
+    parser.add_argument("--salida", help="Guarda los resultados en JSON")
+    parser.add_argument("--guardar-base", help="Guarda los resultados como base de comparación")
+    parser.add_argument("--comparar", help="Compara con una base guardada")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="Empeoramiento relativo de la mediana admitido con --comparar")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for nombre in args.casos:
+        _, tamano_maximo = CASOS[nombre]
+        for n in args.tamanos:
+            if tamano_maximo is not None and n > tamano_maximo:
+                continue
+            resultados.append(medir_caso(nombre, n, args.repeticiones, args.tiempo_maximo))
+
+    regresiones = []
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            regresiones = comparar(resultados, json.load(archivo), args.tolerancia)
+
+    imprimir(resultados)
+
+    informe = {"entorno": entorno(), "resultados": resultados}
+    for ruta in filter(None, (args.salida, args.guardar_base)):
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            json.dump(informe, archivo, indent=2)
+
+    if regresiones:
+        print(f"\n{len(regresiones)} regresiones por encima de {args.tolerancia * 100:.0f}%:")
+        for r in regresiones:
+            print(f"  {r['caso']} n={r['n']}: {r['cambio_vs_base'] * 100:+.0f}%")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Mide el rendimiento del servicio HTTP/JSON (inventario.servicio).
+
+Arranca el servicio en un proceso aparte en un puerto libre, envía lotes de
+distintos tamaños a /lote/cantidad-fija y /lote/periodo-fijo desde varias
+conexiones concurrentes y simulaciones a /simulacion/cantidad-fija, e
+informa artículos por segundo y latencias p50/p95/p99 por solicitud
+(incluido el tiempo de recibir todo el flujo NDJSON).
+
+Uso:
+    python benchmarks/servicio.py
+    python benchmarks/servicio.py --tamanos 1000 100000 --conexiones 8 --procesos 4
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEMILLA = 12345
+TAMANOS = (1_000, 10_000, 100_000)
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def arrancar_servicio(puerto, procesos):
+    """
+    Arranca inventario.servicio y espera a que responda en /salud
+    """
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "inventario.servicio", "--puerto", str(puerto)]
+        + (["--procesos", str(procesos)] if procesos else []),
+        cwd=RAIZ,
+    )
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        try:
+            conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=1)
+            conexion.request("GET", "/salud")
+            if conexion.getresponse().status == 200:
+                return proceso
+        except OSError:
+            time.sleep(0.1)
+    proceso.kill()
+    raise RuntimeError("El servicio no respondió en 30 s")
+
+
+def generar_lote(sistema, n, rng):
+    """
+    Cuerpo NDJSON de n artículos con siete días de consumo
+    """
+    consumos = rng.poisson(10, (n, 7)).tolist()
+    prob = rng.integers(1, 51, n).tolist()
+    tiempo = rng.integers(1, 30, n).tolist()
+    ciclo = rng.integers(1, 15, n).tolist()
+    inventario = rng.integers(1, 500, n).tolist()
+    lineas = []
+    for i in range(n):
+        articulo = {"id": i, "prob_falta_stock": prob[i], "tiempo_reposicion": tiempo[i],
+                    "consumos_diarios": consumos[i]}
+        if sistema == "periodo-fijo":
+            articulo.update(ciclo_pedido=ciclo[i], inventario_actual=inventario[i])
+        lineas.append(json.dumps(articulo))
+    return "\n".join(lineas).encode("utf-8")
+
+
+def enviar(puerto, ruta, cuerpo, tipo="application/x-ndjson"):
+    """
+    Envía una solicitud, lee toda la respuesta y devuelve (segundos, líneas recibidas)
+    """
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto)
+    inicio = time.perf_counter()
+    conexion.request("POST", ruta, body=cuerpo, headers={"Content-Type": tipo})
+    respuesta = conexion.getresponse()
+    datos = respuesta.read()
+    duracion = time.perf_counter() - inicio
+    conexion.close()
+    if respuesta.status != 200:
+        raise RuntimeError(f"{ruta}: {respuesta.status} {datos[:200]!r}")
+    return duracion, datos.count(b"\n")
+
+
+def medir(puerto, ruta, cuerpo, n_articulos, solicitudes, conexiones, tipo="application/x-ndjson"):
+    """
+    Envía solicitudes iguales desde varias conexiones y resume latencias y rendimiento
+    """
+    enviar(puerto, ruta, cuerpo, tipo)  # calentamiento
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=conexiones) as hilos:
+        resultados = list(hilos.map(lambda _: enviar(puerto, ruta, cuerpo, tipo), range(solicitudes)))
+    total = time.perf_counter() - inicio
+
+    tiempos = [duracion for duracion, _ in resultados]
+    if any(lineas != n_articulos for _, lineas in resultados):
+        raise RuntimeError(f"{ruta}: respuesta incompleta")
+    return {
+        "ruta": ruta,
+        "n": n_articulos,
+        "solicitudes": solicitudes,
+        "conexiones": conexiones,
+        "p50_s": float(np.percentile(tiempos, 50)),
+        "p95_s": float(np.percentile(tiempos, 95)),
+        "p99_s": float(np.percentile(tiempos, 99)),
+        "articulos_por_s": n_articulos * solicitudes / total,
+    }
+
+
+def imprimir(resultados):
+    cabecera = f"{'ruta':<28}{'n':>9}{'conex.':>8}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'artículos/s':>14}"
+    print(cabecera)
+    print("-" * len(cabecera))
+    for r in resultados:
+        print(f"{r['ruta']:<28}{r['n']:>9}{r['conexiones']:>8}{r['p50_s'] * 1e3:>11.1f}"
+              f"{r['p95_s'] * 1e3:>11.1f}{r['p99_s'] * 1e3:>11.1f}{r['articulos_por_s']:>14.3g}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rendimiento del servicio HTTP/JSON")
+    parser.add_argument("--tamanos", nargs="+", type=int, default=list(TAMANOS))
+    parser.add_argument("--solicitudes", type=int, default=8)
+    parser.add_argument("--conexiones", type=int, default=4)
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="Procesos de simulación del servicio")
+    parser.add_argument("--simulaciones", type=int, default=16,
+                        help="Simulaciones de 10.000 trayectorias por solicitud")
+    parser.add_argument("--salida", help="Guarda los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(SEMILLA)
+    puerto = puerto_libre()
+    proceso = arrancar_servicio(puerto, args.procesos)
+    try:
+        resultados = []
+        for sistema in ("cantidad-fija", "periodo-fijo"):
+            for n in args.tamanos:
+                cuerpo = generar_lote(sistema, n, rng)
+                resultados.append(medir(puerto, f"/lote/{sistema}", cuerpo, n,
+                                        args.solicitudes, args.conexiones))
+
+        simulaciones = json.dumps([
+            {"punto_reorden": 40, "cantidad_pedido": 80, "demanda_promedio_diaria": 10,
+             "desviacion_demanda": 4, "tiempo_reposicion": 3, "semilla": i}
+            for i in range(args.simulaciones)
+        ]).encode("utf-8")
+        resultados.append(medir(puerto, "/simulacion/cantidad-fija", simulaciones, args.simulaciones,
+                                max(1, args.solicitudes // 4), args.conexiones, "application/json"))
+    finally:
+        proceso.terminate()
+        proceso.wait()
+
+    imprimir(resultados)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(resultados, archivo, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Mide el tiempo de importación de la pantalla de acceso y de la vista de planificación.
+
+Cada grupo de módulos se importa en un intérprete nuevo (como en un arranque
+en frío del contenedor) y se compara la mediana con el presupuesto definido
+en PRESUPUESTO_SEGUNDOS. También comprueba que la pantalla de acceso de
+app.py no cargue scipy ni pandas.
+
+Uso:
+    python benchmarks/tiempo_importacion.py [--repeticiones 5]
+
+Sale con código 1 si algún grupo supera su presupuesto.
+"""
+import argparse
+import ast
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def modulos_inventario_app():
+    """
+    Módulos del paquete inventario que importa app.py, leídos de su código para no desfasarse de él
+    """
+    with open(os.path.join(RAIZ, "app.py"), encoding="utf-8") as archivo:
+        arbol = ast.parse(archivo.read())
+    modulos = set()
+    for nodo in ast.walk(arbol):
+        if isinstance(nodo, ast.Import):
+            modulos.update(alias.name for alias in nodo.names if alias.name.startswith("inventario."))
+        elif isinstance(nodo, ast.ImportFrom) and nodo.module == "inventario":
+            modulos.update(f"inventario.{alias.name}" for alias in nodo.names)
+        elif isinstance(nodo, ast.ImportFrom) and (nodo.module or "").startswith("inventario."):
+            modulos.add(nodo.module)
+    return sorted(modulos)
+
+
+# Módulos que carga cada etapa de app.py
+GRUPOS = {
+    "pantalla_acceso": "import streamlit",
+    "vista_planificacion": "import streamlit, numpy, " + ", ".join(modulos_inventario_app()),
+}
+
+# Presupuesto de importación en segundos, ya descontado el arranque del intérprete
+PRESUPUESTO_SEGUNDOS = {
+    "pantalla_acceso": 1.0,
+    "vista_planificacion": 2.5,
+}
+
+# Módulos pesados que la pantalla de acceso no debe cargar. plotly no figura porque
+# algunas versiones de streamlit lo importan por su cuenta al arrancar
+MODULOS_PROHIBIDOS_ACCESO = ("scipy", "pandas")
+
+_SCRIPT_ACCESO = """
+import sys
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({ruta!r})
+at.secrets["PASSWORD"] = "-"
+at.run()
+print(",".join(m for m in {prohibidos!r} if m in sys.modules))
+"""
+
+
+def medir(codigo, repeticiones):
+    """
+    Mide la mediana del tiempo de pared de ejecutar codigo en un intérprete nuevo
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, check=True)
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos)
+
+
+def modulos_cargados_en_acceso():
+    """
+    Ejecuta la pantalla de acceso de app.py y devuelve los módulos pesados que cargó
+    """
+    script = _SCRIPT_ACCESO.format(
+        ruta=os.path.join(RAIZ, "app.py"), prohibidos=MODULOS_PROHIBIDOS_ACCESO
+    )
+    salida = subprocess.run(
+        [sys.executable, "-c", script], cwd=RAIZ, check=True, capture_output=True, text=True
+    )
+    ultima_linea = salida.stdout.strip().splitlines()[-1] if salida.stdout.strip() else ""
+    return [m for m in ultima_linea.split(",") if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    base = medir("pass", args.repeticiones)
+    print(f"Arranque del intérprete: {base:.3f} s")
+
+    excedidos = []
+    for grupo, codigo in GRUPOS.items():
+        tiempo = medir(codigo, args.repeticiones) - base
+        presupuesto = PRESUPUESTO_SEGUNDOS[grupo]
+        estado = "OK" if tiempo <= presupuesto else "EXCEDIDO"
+        print(f"{grupo:<22} {tiempo:6.3f} s  (presupuesto {presupuesto:.1f} s)  {estado}")
+        if tiempo > presupuesto:
+            excedidos.append(grupo)
+
+    cargados = modulos_cargados_en_acceso()
+    if cargados:
+        print(f"La pantalla de acceso carga módulos pesados: {', '.join(cargados)}")
+        excedidos.append("pantalla_acceso (módulos)")
+    else:
+        print("La pantalla de acceso no carga " + ", ".join(MODULOS_PROHIBIDOS_ACCESO))
+
+    return 1 if excedidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+"""
+Motor de cálculo de inventario independiente de Streamlit.
+
+Los módulos de este paquete se importan por separado (por ejemplo
+``from inventario.calculos import calcular_cantidad_fija_lote``) para que
+cargar uno de ellos no arrastre las dependencias de los demás.
+"""
@@ -0,0 +1,70 @@
+"""
+Flujos de números aleatorios independientes y reproducibles para las simulaciones.
+
+Una simulación parte de una semilla (un entero, None o una SeedSequence) y
+reparte sus trayectorias en grupos fijos de TRAYECTORIAS_POR_FLUJO; el grupo
+k usa su propio generador, creado con el hijo k de la SeedSequence de la
+semilla. Los hijos de SeedSequence son estadísticamente independientes y se
+pueden reconstruir en cualquier proceso a partir de la semilla y de k, así
+que el resultado es el mismo con cualquier tamaño de bloque o número de
+procesos, siempre que los bloques contengan grupos completos.
+"""
+import numpy as np
+
+# Trayectorias que comparten un mismo flujo de números aleatorios
+TRAYECTORIAS_POR_FLUJO = 4096
+
+
+def secuencia_semilla(semilla=None):
+    """
+    SeedSequence de la semilla; con None se toma entropía del sistema una sola vez
+
+    Para repartir una simulación sin semilla entre procesos hay que pasarles
+    la SeedSequence devuelta, no None, para que todos usen la misma entropía.
+    """
+    if isinstance(semilla, np.random.SeedSequence):
+        return semilla
+    return np.random.SeedSequence(semilla)
+
+
+def flujo(secuencia, indice):
+    """
+    Generador del flujo indice: el mismo que daría secuencia.spawn(indice + 1)[indice]
+    """
+    hijo = np.random.SeedSequence(
+        secuencia.entropy, spawn_key=tuple(secuencia.spawn_key) + (int(indice),),
+        pool_size=secuencia.pool_size,
+    )
+    return np.random.default_rng(hijo)
+
+
+def flujos_trayectorias(secuencia, inicio, fin):
+    """
+    Generadores y tramos (relativos a inicio) de los flujos que cubren las trayectorias inicio..fin
+
+    inicio debe ser múltiplo de TRAYECTORIAS_POR_FLUJO para que cada flujo
+    quede completo dentro del bloque.
+    """
+    if inicio % TRAYECTORIAS_POR_FLUJO:
+        raise ValueError(f"El bloque debe empezar en un múltiplo de {TRAYECTORIAS_POR_FLUJO} trayectorias")
+    return [
+        (flujo(secuencia, primera // TRAYECTORIAS_POR_FLUJO),
+         slice(primera - inicio, min(primera + TRAYECTORIAS_POR_FLUJO, fin) - inicio))
+        for primera in range(inicio, fin, TRAYECTORIAS_POR_FLUJO)
+    ]
+
+
+def normales_estandar(flujos, salida):
+    """
+    Llena salida con normales estándar, cada tramo con su flujo
+    """
+    for generador, tramo in flujos:
+        generador.standard_normal(out=salida[tramo])
+    return salida
+
+
+def tamano_bloque_flujos(tamano_bloque):
+    """
+    Redondea el tamaño de bloque a grupos completos de TRAYECTORIAS_POR_FLUJO (al menos uno)
+    """
+    return max(1, tamano_bloque // TRAYECTORIAS_POR_FLUJO) * TRAYECTORIAS_POR_FLUJO
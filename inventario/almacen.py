@@ -0,0 +1,315 @@
+"""
+Almacén en disco de los resultados por SKU de cada ejecución.
+
+Cada ejecución se guarda en su propio directorio, nombrado por la fecha de
+ejecución, con un archivo .npy por columna y un meta.json que describe las
+columnas:
+
+    resultados/
+        2026-10-16/
+            meta.json
+            sku.npy
+            inventario_seguridad.npy
+            ...
+
+Los .npy se abren con memoria mapeada, de modo que abrir una ejecución de un
+millón de filas no lee nada más que meta.json y cada página o filtro solo
+toca las columnas y filas que necesita. Las ejecuciones se escriben en un
+directorio temporal y se renombran al terminar, así que un lector nunca ve
+una ejecución a medias.
+"""
+import datetime as dt
+import json
+import os
+import re
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+VERSION_FORMATO = 1
+ARCHIVO_META = "meta.json"
+
+# Filas de datos por hoja de Excel (el límite de 1.048.576 filas menos la cabecera)
+MAX_FILAS_HOJA_EXCEL = 1_048_575
+
+# Filas que se leen del disco a la vez al exportar
+FILAS_POR_BLOQUE_EXPORTACION = 10_000
+
+# Directorio del almacén por defecto (se puede cambiar con la variable de entorno)
+DIRECTORIO_ALMACEN = os.environ.get("INVENTARIO_ALMACEN", "resultados")
+
+
+def nombre_ejecucion(fecha=None):
+    """
+    Nombre del directorio de una ejecución: AAAA-MM-DD, o AAAA-MM-DDTHHMMSS si se indica la hora
+    """
+    if fecha is None:
+        fecha = dt.date.today()
+    if isinstance(fecha, dt.datetime):
+        return fecha.strftime("%Y-%m-%dT%H%M%S")
+    if isinstance(fecha, dt.date):
+        return fecha.isoformat()
+    fecha = str(fecha)
+    if not re.fullmatch(r"[0-9A-Za-z_.\-]+", fecha):
+        raise ValueError(f"Nombre de ejecución no válido: {fecha!r}")
+    return fecha
+
+
+def _arreglo_columna(serie):
+    """
+    Convierte una columna de pandas en un arreglo NumPy guardable sin pickle
+    """
+    if pd.api.types.is_bool_dtype(serie) or pd.api.types.is_numeric_dtype(serie):
+        if serie.isna().any() and not pd.api.types.is_float_dtype(serie):
+            return serie.to_numpy(dtype=float, na_value=np.nan)
+        return serie.to_numpy()
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.to_numpy(dtype="datetime64[ns]")
+    # Texto y resto de tipos: cadenas de ancho fijo, que también se pueden mapear en memoria
+    return serie.astype(object).where(serie.notna(), "").astype(str).to_numpy(dtype=str)
+
+
+def _nombres_archivo(columnas):
+    """
+    Nombre de archivo legible y único para cada columna
+    """
+    usados = set()
+    archivos = []
+    for columna in columnas:
+        base = re.sub(r"[^0-9A-Za-z_]+", "_", str(columna)).strip("_") or "columna"
+        archivo, sufijo = base, 1
+        while archivo.lower() in usados:
+            sufijo += 1
+            archivo = f"{base}_{sufijo}"
+        usados.add(archivo.lower())
+        archivos.append(f"{archivo}.npy")
+    return archivos
+
+
+def guardar_ejecucion(resultados, raiz=DIRECTORIO_ALMACEN, fecha=None, metadatos=None, reemplazar=False):
+    """
+    Guarda un DataFrame de resultados por SKU como una nueva ejecución y devuelve su directorio
+
+    Con reemplazar=False falla si ya existe una ejecución con el mismo nombre.
+    metadatos es un diccionario serializable en JSON que se guarda en meta.json.
+    """
+    nombre = nombre_ejecucion(fecha)
+    destino = os.path.join(raiz, nombre)
+    if os.path.exists(destino) and not reemplazar:
+        raise FileExistsError(f"Ya existe la ejecución {nombre} en {raiz}")
+    os.makedirs(raiz, exist_ok=True)
+
+    resultados = resultados.reset_index(drop=True)
+    temporal = tempfile.mkdtemp(prefix=f".{nombre}.", dir=raiz)
+    try:
+        # mkdtemp crea el directorio solo para el propietario; el panel puede ejecutarse con otro usuario
+        os.chmod(temporal, 0o755)
+        columnas = []
+        for columna, archivo in zip(resultados.columns, _nombres_archivo(resultados.columns)):
+            arreglo = _arreglo_columna(resultados[columna])
+            np.save(os.path.join(temporal, archivo), arreglo, allow_pickle=False)
+            columnas.append({"nombre": str(columna), "archivo": archivo, "dtype": arreglo.dtype.str})
+
+        meta = {
+            "version_formato": VERSION_FORMATO,
+            "ejecucion": nombre,
+            "creada": dt.datetime.now().isoformat(timespec="seconds"),
+            "n_filas": len(resultados),
+            "columnas": columnas,
+            "metadatos": metadatos or {},
+        }
+        with open(os.path.join(temporal, ARCHIVO_META), "w", encoding="utf-8") as archivo:
+            json.dump(meta, archivo, ensure_ascii=False, indent=2)
+
+        # La ejecución anterior se aparta con un nombre oculto antes de colocar la nueva y solo se
+        # borra después: si el proceso cae a mitad, la anterior sigue entera en ese directorio
+        anterior = None
+        if os.path.exists(destino):
+            anterior = f"{temporal}.anterior"
+            os.rename(destino, anterior)
+        try:
+            os.replace(temporal, destino)
+        except BaseException:
+            if anterior is not None:
+                os.rename(anterior, destino)
+            raise
+    except BaseException:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+    if anterior is not None:
+        shutil.rmtree(anterior, ignore_errors=True)
+    return destino
+
+
+def listar_ejecuciones(raiz=DIRECTORIO_ALMACEN):
+    """
+    Nombres de las ejecuciones completas del almacén, de la más antigua a la más reciente
+    """
+    if not os.path.isdir(raiz):
+        return []
+    return sorted(
+        nombre for nombre in os.listdir(raiz)
+        if not nombre.startswith(".") and os.path.isfile(os.path.join(raiz, nombre, ARCHIVO_META))
+    )
+
+
+def abrir_ejecucion(raiz=DIRECTORIO_ALMACEN, nombre=None):
+    """
+    Abre una ejecución del almacén (la más reciente si no se indica nombre)
+    """
+    if nombre is None:
+        ejecuciones = listar_ejecuciones(raiz)
+        if not ejecuciones:
+            raise FileNotFoundError(f"No hay ejecuciones guardadas en {raiz}")
+        nombre = ejecuciones[-1]
+    return Ejecucion(os.path.join(raiz, nombre))
+
+
+class Ejecucion:
+    """
+    Ejecución guardada cuyas columnas se leen bajo demanda con memoria mapeada
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        with open(os.path.join(ruta, ARCHIVO_META), encoding="utf-8") as archivo:
+            self.meta = json.load(archivo)
+        if self.meta.get("version_formato", 0) > VERSION_FORMATO:
+            raise ValueError(f"Formato de ejecución más reciente que el soportado: {ruta}")
+        self._archivos = {c["nombre"]: c["archivo"] for c in self.meta["columnas"]}
+        self._abiertas = {}
+
+    @property
+    def nombre(self):
+        return self.meta["ejecucion"]
+
+    @property
+    def n_filas(self):
+        return self.meta["n_filas"]
+
+    @property
+    def columnas(self):
+        return list(self._archivos)
+
+    @property
+    def metadatos(self):
+        return self.meta.get("metadatos", {})
+
+    def __len__(self):
+        return self.n_filas
+
+    def columna(self, nombre):
+        """
+        Columna completa como arreglo de solo lectura mapeado en memoria
+        """
+        if nombre not in self._abiertas:
+            if nombre not in self._archivos:
+                raise KeyError(f"La ejecución {self.nombre} no tiene la columna {nombre!r}")
+            self._abiertas[nombre] = np.load(
+                os.path.join(self.ruta, self._archivos[nombre]), mmap_mode="r", allow_pickle=False
+            )
+        return self._abiertas[nombre]
+
+    def filas(self, seleccion, columnas=None):
+        """
+        DataFrame con las filas indicadas (slice, índices o máscara) y solo las columnas pedidas
+        """
+        columnas = self.columnas if columnas is None else list(columnas)
+        if isinstance(seleccion, slice):
+            indice = np.arange(self.n_filas)[seleccion]
+        else:
+            seleccion = np.asarray(seleccion)
+            indice = np.flatnonzero(seleccion) if seleccion.dtype == bool else seleccion
+        return pd.DataFrame(
+            {nombre: np.asarray(self.columna(nombre)[seleccion]) for nombre in columnas},
+            index=indice,
+        )
+
+    def pagina(self, numero, tamano=100, columnas=None, indices=None):
+        """
+        Página numero (desde 0) de tamano filas, sobre todas las filas o sobre los índices dados
+        """
+        inicio = numero * tamano
+        if indices is None:
+            return self.filas(slice(inicio, min(inicio + tamano, self.n_filas)), columnas)
+        return self.filas(np.asarray(indices)[inicio:inicio + tamano], columnas)
+
+    def buscar(self, columna, texto):
+        """
+        Índices de las filas cuya columna de texto contiene texto (sin distinguir mayúsculas)
+        """
+        valores = np.char.lower(np.asarray(self.columna(columna)).astype(str))
+        return np.flatnonzero(np.char.find(valores, str(texto).lower()) >= 0)
+
+    def filtrar(self, columna, minimo=None, maximo=None, indices=None):
+        """
+        Índices de las filas (todas o las de indices) cuya columna está entre minimo y maximo, inclusive
+        """
+        valores = np.asarray(self.columna(columna))
+        if indices is not None:
+            indices = np.asarray(indices)
+            valores = valores[indices]
+        dentro = np.ones(valores.shape, dtype=bool)
+        if minimo is not None:
+            dentro &= valores >= minimo
+        if maximo is not None:
+            dentro &= valores <= maximo
+        posiciones = np.flatnonzero(dentro)
+        return posiciones if indices is None else indices[posiciones]
+
+    def ordenar(self, columna, descendente=False, indices=None):
+        """
+        Índices de las filas (todas o las de indices) ordenados por la columna, con los NaN al final
+        """
+        valores = np.asarray(self.columna(columna))
+        if indices is not None:
+            indices = np.asarray(indices)
+            valores = valores[indices]
+        if valores.dtype == bool:
+            valores = valores.astype(np.int8)
+        if not descendente:
+            orden = np.argsort(valores, kind="stable")
+        elif valores.dtype.kind == "f":
+            # Negar conserva el orden de los empates y deja los NaN al final
+            orden = np.argsort(-valores, kind="stable")
+        else:
+            # Negar desborda con enteros sin signo (y con el mínimo de los enteros con signo):
+            # ordenar al revés la columna invertida mantiene los empates en su orden original
+            orden = len(valores) - 1 - np.argsort(valores[::-1], kind="stable")[::-1]
+        return orden if indices is None else indices[orden]
+
+    def exportar_excel(self, destino, indices=None, columnas=None):
+        """
+        Escribe las filas (todas o las de indices, en ese orden) en un .xlsx sin cargar la ejecución
+
+        Usa el modo write_only de openpyxl y lee del disco por bloques, así que
+        la memoria no crece con el número de filas. Si hay más filas de las que
+        caben en una hoja, continúa en hojas nuevas. destino es una ruta o un
+        archivo binario.
+        """
+        # openpyxl solo se necesita para exportar; se importa aquí para no cargarlo al abrir
+        from openpyxl import Workbook
+
+        columnas = self.columnas if columnas is None else list(columnas)
+        n_filas = self.n_filas if indices is None else len(indices)
+        libro = Workbook(write_only=True)
+        for n_hoja, inicio_hoja in enumerate(range(0, max(n_filas, 1), MAX_FILAS_HOJA_EXCEL)):
+            hoja = libro.create_sheet(self.nombre if n_hoja == 0 else f"{self.nombre} ({n_hoja + 1})")
+            hoja.append(columnas)
+            fin_hoja = min(inicio_hoja + MAX_FILAS_HOJA_EXCEL, n_filas)
+            for inicio in range(inicio_hoja, fin_hoja, FILAS_POR_BLOQUE_EXPORTACION):
+                fin = min(inicio + FILAS_POR_BLOQUE_EXPORTACION, fin_hoja)
+                seleccion = slice(inicio, fin) if indices is None else np.asarray(indices[inicio:fin])
+                bloque = self.filas(seleccion, columnas).astype(object)
+                # Excel no tiene NaN: las celdas vacías se escriben como None
+                for fila in bloque.where(bloque.notna(), None).itertuples(index=False, name=None):
+                    hoja.append(fila)
+        libro.save(destino)
+
+    def a_dataframe(self, columnas=None):
+        """
+        Carga la ejecución completa (o las columnas pedidas) en un DataFrame
+        """
+        return self.filas(slice(None), columnas)
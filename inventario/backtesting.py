@@ -0,0 +1,291 @@
+"""
+Backtesting del punto de reorden del Sistema de Cantidad Fija con el consumo real.
+
+Reproduce día a día el consumo histórico de cada SKU contra la política que
+habrían dado las fórmulas de la app: el punto de reorden se recalcula con
+la media y la desviación del consumo de los últimos `ventana` días, que
+VentanaMovil mantiene en O(1) por SKU y día sin volver a recorrer la
+ventana. El bucle recorre los días y cada paso opera sobre todos los SKUs
+del bloque a la vez, con las mismas reglas que simular_cantidad_fija:
+posición de inventario, varios pedidos en camino en un búfer circular y la
+demanda no atendida queda pendiente.
+
+Uso:
+    python -m inventario.backtesting historial.parquet backtest.csv --prob-falta-stock 5 --tiempo-reposicion 3
+    python -m inventario.backtesting historial.csv backtest.parquet --catalogo catalogo.csv --ventana 56
+
+Con --catalogo, prob_falta_stock y tiempo_reposicion se toman por SKU de
+ese archivo (columnas sku, prob_falta_stock, tiempo_reposicion).
+"""
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from inventario.calculos import calcular_inventario_seguridad_lote, calcular_z_score_lote
+from inventario.estadisticas import VentanaMovil
+from inventario.ingesta import COLUMNAS_HISTORIAL, TAMANO_BLOQUE, leer_historial_por_bloques
+
+# Días de consumo con los que se recalcula la política por defecto
+VENTANA_POR_DEFECTO = 28
+
+# SKUs que se reproducen a la vez
+FILAS_POR_BLOQUE = 8192
+
+
+@dataclass
+class ResultadoBacktest:
+    """
+    Resumen por SKU de un backtesting y, con detalle, las series diarias evaluadas
+    """
+    resumen: pd.DataFrame
+    primer_dia: int
+    inventario: np.ndarray = None
+    punto_reorden: np.ndarray = None
+
+
+def matriz_consumos(origen, tamano_bloque=TAMANO_BLOQUE, formato=None, columnas=COLUMNAS_HISTORIAL):
+    """
+    Convierte un historial largo (sku, fecha, cantidad) en una matriz de consumo diario SKUs × días
+
+    Lee el historial por bloques y devuelve los SKUs (ordenados), las fechas
+    (todos los días entre la primera y la última del archivo) y la matriz.
+    Los días sin fila para un SKU cuentan como consumo cero y varias filas
+    del mismo SKU y día se suman.
+    """
+    partes = []
+    for bloque in leer_historial_por_bloques(origen, tamano_bloque, formato, columnas):
+        if bloque.empty:
+            continue
+        bloque["fecha"] = pd.to_datetime(bloque["fecha"]).dt.normalize()
+        bloque["cantidad"] = bloque["cantidad"].fillna(0.0)
+        partes.append(bloque.groupby(["sku", "fecha"], sort=False)["cantidad"].sum())
+
+    if not partes:
+        return pd.Index([], name="sku"), pd.DatetimeIndex([], name="fecha"), np.zeros((0, 0))
+
+    diario = pd.concat(partes).groupby(level=["sku", "fecha"], sort=False).sum()
+    codigos_sku, skus = pd.factorize(diario.index.get_level_values("sku"), sort=True)
+    fechas_filas = diario.index.get_level_values("fecha")
+    fechas = pd.date_range(fechas_filas.min(), fechas_filas.max(), freq="D", name="fecha")
+    dias = (fechas_filas - fechas[0]).days.to_numpy()
+
+    matriz = np.zeros((len(skus), len(fechas)))
+    matriz[codigos_sku, dias] = diario.to_numpy(dtype=float)
+    return pd.Index(skus, name="sku"), fechas, matriz
+
+
+def backtest_cantidad_fija(consumos, prob_falta_stock, tiempo_reposicion, ventana=VENTANA_POR_DEFECTO,
+                           cantidad_pedido=None, inventario_inicial=None, recalcular_cada=1,
+                           skus=None, detalle=False, filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Reproduce el consumo real (SKUs × días) contra el punto de reorden recalculado en una ventana móvil
+
+    Los primeros `ventana` días solo llenan la ventana; desde ese día, cada
+    recalcular_cada días el punto de reorden es demanda × tiempo_reposicion
+    + z × σ × √tiempo_reposicion con la media y la desviación (ddof=1) de la
+    ventana. Como en la simulación de la app, sin cantidad_pedido se pide
+    dos veces el punto de reorden vigente y sin inventario_inicial se
+    empieza con tres veces el primero. Los pedidos se hacen al cierre del
+    día y llegan al inicio del día dia + tiempo_reposicion + 1, de modo que
+    cubren tiempo_reposicion días de consumo. prob_falta_stock, tiempo_reposicion,
+    cantidad_pedido e inventario_inicial son escalares o un valor por SKU.
+
+    Devuelve por SKU el nivel de llenado realizado, los días con falta de
+    stock, el inventario promedio, los pedidos, la probabilidad de falta por
+    ciclo de reposición y el punto de reorden promedio. Con detalle=True
+    añade las existencias al cierre y el punto de reorden de cada día
+    evaluado (SKUs × días), que empiezan en el día primer_dia de la matriz.
+    """
+    consumos = np.atleast_2d(np.asarray(consumos))
+    n_skus, n_dias = consumos.shape
+    if ventana < 2:
+        raise ValueError("La ventana debe tener al menos 2 días para estimar la desviación")
+    if n_dias <= ventana:
+        raise ValueError(f"El historial tiene {n_dias} días; se necesitan más que la ventana ({ventana})")
+    if recalcular_cada < 1:
+        raise ValueError("recalcular_cada debe ser al menos 1")
+
+    def por_sku(valor, dtype=float):
+        return np.broadcast_to(np.asarray(valor, dtype=dtype), (n_skus,))
+
+    z_score = calcular_z_score_lote(por_sku(prob_falta_stock))
+    plazo = np.maximum(por_sku(tiempo_reposicion, np.int64), 1)
+    cantidad_fija = None if cantidad_pedido is None else por_sku(cantidad_pedido)
+    inicial_fijo = None if inventario_inicial is None else por_sku(inventario_inicial)
+
+    dias_evaluados = n_dias - ventana
+    if detalle:
+        serie_inventario = np.empty((n_skus, dias_evaluados))
+        serie_punto_reorden = np.empty((n_skus, dias_evaluados))
+    columnas = {
+        "demanda_total": np.zeros(n_skus),
+        "demanda_atendida": np.zeros(n_skus),
+        "dias_sin_stock": np.zeros(n_skus, dtype=np.int64),
+        "inventario_acumulado": np.zeros(n_skus),
+        "pedidos": np.zeros(n_skus, dtype=np.int64),
+        "ciclos": np.zeros(n_skus, dtype=np.int64),
+        "ciclos_con_falta": np.zeros(n_skus, dtype=np.int64),
+        "punto_reorden_acumulado": np.zeros(n_skus),
+    }
+
+    for inicio in range(0, n_skus, filas_por_bloque):
+        filas = slice(inicio, min(inicio + filas_por_bloque, n_skus))
+        # Días × SKUs contiguo: cada paso del bucle lee una fila seguida
+        diario = np.ascontiguousarray(np.asarray(consumos[filas], dtype=float).T)
+        n_bloque = diario.shape[1]
+        z, plazo_bloque = z_score[filas], plazo[filas]
+
+        estadisticas = VentanaMovil(n_bloque, ventana)
+        for dia in range(ventana):
+            estadisticas.actualizar(diario[dia])
+
+        ranuras = int(plazo_bloque.max()) + 2
+        llegadas = np.zeros((ranuras, n_bloque))
+        dia_pedido = np.zeros((ranuras, n_bloque), dtype=np.int32)
+        ultimo_dia_falta = np.full(n_bloque, -1, dtype=np.int32)
+        # Vistas del tramo del bloque en las columnas del resumen
+        acumulados = {nombre: valores[filas] for nombre, valores in columnas.items()}
+
+        for paso, dia in enumerate(range(ventana, n_dias)):
+            # Política con la ventana de los días anteriores
+            if paso % recalcular_cada == 0:
+                media = estadisticas.media
+                inventario_seguridad = calcular_inventario_seguridad_lote(
+                    z, estadisticas.desviacion, plazo_bloque
+                )
+                punto_reorden = media * plazo_bloque + inventario_seguridad
+                cantidad = 2 * punto_reorden if cantidad_fija is None else cantidad_fija[filas]
+            if paso == 0:
+                inventario = 3 * punto_reorden if inicial_fijo is None else inicial_fijo[filas].astype(float)
+                posicion = inventario.copy()
+
+            # Llegadas del día
+            ranura = dia % ranuras
+            llega = llegadas[ranura]
+            recibido = llega > 0
+            inventario += llega
+            acumulados["ciclos"] += recibido
+            acumulados["ciclos_con_falta"] += recibido & (ultimo_dia_falta > dia_pedido[ranura])
+            llega.fill(0)
+
+            # Consumo real
+            consumo = diario[dia]
+            atendido = np.clip(inventario, 0, consumo)
+            faltante = atendido < consumo
+            acumulados["demanda_total"] += consumo
+            acumulados["demanda_atendida"] += atendido
+            acumulados["dias_sin_stock"] += faltante
+            ultimo_dia_falta[faltante] = dia
+            inventario -= consumo
+            posicion -= consumo
+
+            # Pedido cuando la posición de inventario alcanza el punto de reorden
+            pedir = np.flatnonzero((posicion <= punto_reorden) & (cantidad > 0))
+            if pedir.size:
+                multiplos = np.floor((punto_reorden[pedir] - posicion[pedir]) / cantidad[pedir]) + 1
+                pedido = multiplos * cantidad[pedir]
+                # Llega al inicio del día dia + plazo + 1: cubre plazo días de consumo, como el punto de reorden
+                ranura_llegada = (dia + plazo_bloque[pedir] + 1) % ranuras
+                llegadas[ranura_llegada, pedir] += pedido
+                dia_pedido[ranura_llegada, pedir] = dia
+                posicion[pedir] += pedido
+                acumulados["pedidos"][pedir] += 1
+
+            existencias = np.maximum(inventario, 0)
+            acumulados["inventario_acumulado"] += existencias
+            acumulados["punto_reorden_acumulado"] += punto_reorden
+            if detalle:
+                serie_inventario[filas, paso] = existencias
+                serie_punto_reorden[filas, paso] = punto_reorden
+
+            estadisticas.actualizar(consumo)
+
+    demanda_total = columnas["demanda_total"]
+    ciclos = columnas["ciclos"]
+    resumen = pd.DataFrame({
+        "dias_evaluados": np.full(n_skus, dias_evaluados),
+        "demanda_total": demanda_total,
+        "nivel_llenado": np.divide(columnas["demanda_atendida"], demanda_total,
+                                   out=np.ones(n_skus), where=demanda_total > 0),
+        "dias_sin_stock": columnas["dias_sin_stock"],
+        "frecuencia_dias_sin_stock": columnas["dias_sin_stock"] / dias_evaluados,
+        "inventario_promedio": columnas["inventario_acumulado"] / dias_evaluados,
+        "pedidos": columnas["pedidos"],
+        "prob_falta_ciclo": np.divide(columnas["ciclos_con_falta"], ciclos,
+                                      out=np.full(n_skus, np.nan), where=ciclos > 0),
+        "punto_reorden_promedio": columnas["punto_reorden_acumulado"] / dias_evaluados,
+    }, index=skus)
+    return ResultadoBacktest(
+        resumen=resumen,
+        primer_dia=ventana,
+        inventario=serie_inventario if detalle else None,
+        punto_reorden=serie_punto_reorden if detalle else None,
+    )
+
+
+def _parametros_catalogo(ruta, skus):
+    """
+    prob_falta_stock y tiempo_reposicion por SKU desde un catálogo, en el orden de skus
+    """
+    if str(ruta).lower().endswith((".parquet", ".pq")):
+        catalogo = pd.read_parquet(ruta, columns=["sku", "prob_falta_stock", "tiempo_reposicion"])
+    else:
+        catalogo = pd.read_csv(ruta, usecols=["sku", "prob_falta_stock", "tiempo_reposicion"],
+                               dtype={"sku": str})
+    catalogo = catalogo.drop_duplicates("sku").set_index("sku").reindex(skus)
+    faltan = catalogo["prob_falta_stock"].isna() | catalogo["tiempo_reposicion"].isna()
+    return catalogo["prob_falta_stock"].to_numpy(), catalogo["tiempo_reposicion"].to_numpy(), faltan.to_numpy()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Backtesting del punto de reorden del Sistema de Cantidad Fija con el historial real"
+    )
+    parser.add_argument("historial", help="Historial largo CSV o Parquet (sku, fecha, cantidad)")
+    parser.add_argument("salida", help="Resultados por SKU (.csv o .parquet)")
+    parser.add_argument("--prob-falta-stock", type=float, default=5.0,
+                        help="Probabilidad de falta de stock aceptada (%%) para todos los SKUs")
+    parser.add_argument("--tiempo-reposicion", type=int, default=3,
+                        help="Plazo de entrega (días) para todos los SKUs")
+    parser.add_argument("--catalogo", default=None,
+                        help="Catálogo con prob_falta_stock y tiempo_reposicion por SKU")
+    parser.add_argument("--ventana", type=int, default=VENTANA_POR_DEFECTO,
+                        help="Días de consumo con los que se recalcula el punto de reorden")
+    parser.add_argument("--recalcular-cada", type=int, default=1,
+                        help="Días entre recálculos del punto de reorden")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    skus, fechas, consumos = matriz_consumos(args.historial)
+    prob, plazo = args.prob_falta_stock, args.tiempo_reposicion
+    if args.catalogo:
+        prob, plazo, faltan = _parametros_catalogo(args.catalogo, skus)
+        if faltan.any():
+            print(f"Aviso: {int(faltan.sum())} SKUs del historial no están en el catálogo y se omiten",
+                  file=sys.stderr)
+            skus, consumos, prob, plazo = skus[~faltan], consumos[~faltan], prob[~faltan], plazo[~faltan]
+
+    resultado = backtest_cantidad_fija(
+        consumos, prob, plazo, ventana=args.ventana, recalcular_cada=args.recalcular_cada, skus=skus
+    )
+    resumen = resultado.resumen
+    if str(args.salida).lower().endswith((".parquet", ".pq")):
+        resumen.to_parquet(args.salida)
+    else:
+        resumen.to_csv(args.salida)
+
+    demanda = resumen["demanda_total"].sum()
+    atendida = (resumen["nivel_llenado"] * resumen["demanda_total"]).sum()
+    llenado = atendida / demanda if demanda > 0 else 1.0
+    print(f"{len(resumen)} SKUs desde {fechas[resultado.primer_dia].date()} en "
+          f"{time.perf_counter() - inicio:.1f} s; nivel de llenado global {llenado * 100:.2f}% "
+          f"-> {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""
+Fórmulas de inventario de seguridad, punto de reorden y cantidad a pedir.
+
+Incluye las funciones por artículo que usa app.py y sus equivalentes
+vectorizados para calcular un catálogo completo de SKUs en una sola pasada.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+
+# Función para calcular el valor z de la distribución normal
+@lru_cache(maxsize=1024)
+def calcular_z_score(probabilidad_falta_stock):
+    """
+    Calcula el z-score para una probabilidad de falta de stock dada
+    El resultado se memoriza: la app solo usa unas decenas de probabilidades distintas
+    """
+    nivel_servicio = (100 - probabilidad_falta_stock) / 100
+    z_score = stats.norm.ppf(nivel_servicio)
+    return z_score
+
+
+# Función para calcular inventario de seguridad
+def calcular_inventario_seguridad(z_score, desviacion_estandar_demanda, tiempo_reposicion):
+    """
+    Calcula el inventario de seguridad
+    """
+    return z_score * desviacion_estandar_demanda * math.sqrt(tiempo_reposicion)
+
+
+# Función para calcular inventario de seguridad con plazo de entrega variable
+def calcular_inventario_seguridad_plazo_variable(z_score, desviacion_estandar_demanda, tiempo_reposicion,
+                                                 demanda_promedio_diaria, desviacion_tiempo_reposicion):
+    """
+    Calcula el inventario de seguridad cuando el plazo de entrega también varía
+    z × √(L × σ² + d² × σL²), con L el plazo promedio y σL su desviación estándar
+    Con σL = 0 coincide con calcular_inventario_seguridad
+    """
+    return z_score * math.sqrt(
+        tiempo_reposicion * desviacion_estandar_demanda ** 2
+        + demanda_promedio_diaria ** 2 * desviacion_tiempo_reposicion ** 2
+    )
+
+
+# Función para calcular la desviación estándar real de la demanda
+def calcular_desviacion_demanda_real(consumos_diarios):
+    """
+    Calcula la desviación estándar real basada en los datos históricos diarios
+    """
+    if len(consumos_diarios) < 2:
+        return 0
+    return np.std(consumos_diarios, ddof=1)
+
+
+# Función para estimar la desviación estándar de la demanda (método anterior como respaldo)
+def estimar_desviacion_demanda(consumo_7_dias):
+    """
+    Estima la desviación estándar diaria de la demanda
+    Asume que la desviación estándar es aproximadamente 20% de la demanda promedio
+    """
+    demanda_promedio_diaria = consumo_7_dias / 7
+    return demanda_promedio_diaria * 0.2
+
+
+# Función para validar inputs
+def validar_inputs(**kwargs):
+    """
+    Valida que todos los inputs sean válidos
+    """
+    errores = []
+
+    for nombre, valor in kwargs.items():
+        if valor is None or valor <= 0:
+            errores.append(f"El campo '{nombre}' debe ser un número positivo")
+
+    return errores
+
+
+# ---------------------------------------------------------------------------
+# Versiones vectorizadas (un SKU por fila)
+# ---------------------------------------------------------------------------
+
+def _indice(*columnas):
+    """
+    Devuelve el índice del primer argumento de pandas, si lo hay
+    """
+    for columna in columnas:
+        if isinstance(columna, (pd.Series, pd.DataFrame)):
+            return columna.index
+    return None
+
+
+def _columna(valores, n_filas=None):
+    """
+    Convierte un escalar, lista o columna de pandas en un arreglo float de una dimensión
+    """
+    arreglo = np.asarray(valores, dtype=float)
+    if arreglo.ndim == 0 and n_filas is not None:
+        arreglo = np.full(n_filas, float(arreglo))
+    return arreglo
+
+
+def estadisticas_demanda_lote(consumos_diarios):
+    """
+    Calcula la demanda promedio diaria y la desviación estándar real por SKU
+
+    consumos_diarios es una matriz (SKUs × días). Equivale a aplicar
+    consumo_total / n_dias y calcular_desviacion_demanda_real a cada fila.
+    """
+    consumos = np.asarray(consumos_diarios, dtype=float)
+    if consumos.ndim != 2:
+        raise ValueError("consumos_diarios debe ser una matriz de SKUs × días")
+
+    n_dias = consumos.shape[1]
+    if n_dias == 0:
+        raise ValueError("consumos_diarios debe tener al menos un día")
+
+    demanda_promedio_diaria = consumos.sum(axis=1) / n_dias
+    if n_dias < 2:
+        desviacion_demanda = np.zeros(consumos.shape[0])
+    else:
+        desviacion_demanda = np.std(consumos, axis=1, ddof=1)
+    return demanda_promedio_diaria, desviacion_demanda
+
+
+def calcular_z_score_lote(probabilidad_falta_stock):
+    """
+    Calcula el z-score para cada probabilidad de falta de stock (%)
+    """
+    nivel_servicio = (100 - _columna(probabilidad_falta_stock)) / 100
+    return stats.norm.ppf(nivel_servicio)
+
+
+def calcular_inventario_seguridad_lote(z_score, desviacion_estandar_demanda, tiempo_reposicion):
+    """
+    Calcula el inventario de seguridad z × σ × √(tiempo) para cada SKU
+    """
+    return (
+        np.asarray(z_score, dtype=float)
+        * np.asarray(desviacion_estandar_demanda, dtype=float)
+        * np.sqrt(np.asarray(tiempo_reposicion, dtype=float))
+    )
+
+
+def calcular_inventario_seguridad_plazo_variable_lote(z_score, desviacion_estandar_demanda,
+                                                      tiempo_reposicion, demanda_promedio_diaria,
+                                                      desviacion_tiempo_reposicion):
+    """
+    Calcula el inventario de seguridad z × √(L × σ² + d² × σL²) para cada SKU
+    """
+    desviacion = np.asarray(desviacion_estandar_demanda, dtype=float)
+    demanda = np.asarray(demanda_promedio_diaria, dtype=float)
+    desviacion_tiempo = np.asarray(desviacion_tiempo_reposicion, dtype=float)
+    return np.asarray(z_score, dtype=float) * np.sqrt(
+        np.asarray(tiempo_reposicion, dtype=float) * desviacion ** 2
+        + demanda ** 2 * desviacion_tiempo ** 2
+    )
+
+
+def _demanda_lote(consumos_diarios, demanda_promedio_diaria, desviacion_demanda):
+    """
+    Obtiene demanda promedio y desviación a partir de la matriz de consumos o de columnas ya calculadas
+    """
+    if consumos_diarios is not None:
+        if demanda_promedio_diaria is not None or desviacion_demanda is not None:
+            raise ValueError(
+                "Indique consumos_diarios o demanda_promedio_diaria/desviacion_demanda, no ambos"
+            )
+        return estadisticas_demanda_lote(consumos_diarios)
+
+    if demanda_promedio_diaria is None or desviacion_demanda is None:
+        raise ValueError(
+            "Se necesita consumos_diarios o bien demanda_promedio_diaria y desviacion_demanda"
+        )
+    return _columna(demanda_promedio_diaria), _columna(desviacion_demanda)
+
+
+def calcular_cantidad_fija_lote(prob_falta_stock, tiempo_reposicion, consumos_diarios=None,
+                                demanda_promedio_diaria=None, desviacion_demanda=None,
+                                desviacion_tiempo_reposicion=None):
+    """
+    Calcula inventario de seguridad y punto de reorden del Sistema de Cantidad Fija por SKU
+
+    Recibe columnas (NumPy o pandas) con una fila por SKU y una matriz de
+    consumos diarios (SKUs × días), o bien la demanda promedio y su
+    desviación ya calculadas. Devuelve un DataFrame con las mismas cifras
+    que las fórmulas por artículo de app.py. Con desviacion_tiempo_reposicion,
+    tiempo_reposicion es el plazo promedio y el inventario de seguridad
+    incluye la variabilidad del plazo.
+    """
+    indice = _indice(prob_falta_stock, tiempo_reposicion, consumos_diarios,
+                     demanda_promedio_diaria, desviacion_demanda, desviacion_tiempo_reposicion)
+    demanda, desviacion = _demanda_lote(consumos_diarios, demanda_promedio_diaria, desviacion_demanda)
+    n_filas = demanda.shape[0]
+
+    prob = _columna(prob_falta_stock, n_filas)
+    tiempo = _columna(tiempo_reposicion, n_filas)
+
+    z_score = calcular_z_score_lote(prob)
+    if desviacion_tiempo_reposicion is None:
+        inventario_seguridad = calcular_inventario_seguridad_lote(z_score, desviacion, tiempo)
+    else:
+        inventario_seguridad = calcular_inventario_seguridad_plazo_variable_lote(
+            z_score, desviacion, tiempo, demanda, _columna(desviacion_tiempo_reposicion, n_filas)
+        )
+    punto_reorden = (demanda * tiempo) + inventario_seguridad
+
+    # Mismas reglas que validar_inputs: todos los campos deben ser positivos
+    valido = (prob > 0) & (tiempo > 0) & (demanda > 0)
+
+    return pd.DataFrame({
+        "demanda_promedio_diaria": demanda,
+        "desviacion_demanda": desviacion,
+        "z_score": z_score,
+        "inventario_seguridad": inventario_seguridad,
+        "punto_reorden": punto_reorden,
+        "valido": valido,
+    }, index=indice)
+
+
+def calcular_periodo_fijo_lote(prob_falta_stock, tiempo_reposicion, ciclo_pedido, inventario_actual,
+                               consumos_diarios=None, demanda_promedio_diaria=None,
+                               desviacion_demanda=None, desviacion_tiempo_reposicion=None):
+    """
+    Calcula nivel objetivo y cantidad a pedir del Sistema de Período Fijo por SKU
+
+    El inventario de seguridad usa el período de riesgo completo
+    (ciclo + tiempo de reposición). Una cantidad_pedir negativa indica que no
+    es necesario pedir, igual que en app.py. Con desviacion_tiempo_reposicion
+    el período de riesgo usa el plazo promedio y se suma su variabilidad.
+    """
+    indice = _indice(prob_falta_stock, tiempo_reposicion, ciclo_pedido, inventario_actual,
+                     consumos_diarios, demanda_promedio_diaria, desviacion_demanda,
+                     desviacion_tiempo_reposicion)
+    demanda, desviacion = _demanda_lote(consumos_diarios, demanda_promedio_diaria, desviacion_demanda)
+    n_filas = demanda.shape[0]
+
+    prob = _columna(prob_falta_stock, n_filas)
+    tiempo = _columna(tiempo_reposicion, n_filas)
+    ciclo = _columna(ciclo_pedido, n_filas)
+    inventario = _columna(inventario_actual, n_filas)
+
+    z_score = calcular_z_score_lote(prob)
+
+    # Período de riesgo (ciclo de pedido + tiempo de reposición)
+    periodo_riesgo = ciclo + tiempo
+    if desviacion_tiempo_reposicion is None:
+        inventario_seguridad = calcular_inventario_seguridad_lote(z_score, desviacion, periodo_riesgo)
+    else:
+        inventario_seguridad = calcular_inventario_seguridad_plazo_variable_lote(
+            z_score, desviacion, periodo_riesgo, demanda, _columna(desviacion_tiempo_reposicion, n_filas)
+        )
+    demanda_esperada = demanda * periodo_riesgo
+    nivel_objetivo = demanda_esperada + inventario_seguridad
+    cantidad_pedir = nivel_objetivo - inventario
+
+    valido = (prob > 0) & (tiempo > 0) & (ciclo > 0) & (inventario > 0) & (demanda > 0)
+
+    return pd.DataFrame({
+        "demanda_promedio_diaria": demanda,
+        "desviacion_demanda": desviacion,
+        "z_score": z_score,
+        "periodo_riesgo": periodo_riesgo,
+        "inventario_seguridad": inventario_seguridad,
+        "demanda_esperada": demanda_esperada,
+        "nivel_objetivo": nivel_objetivo,
+        "cantidad_pedir": cantidad_pedir,
+        "valido": valido,
+    }, index=indice)
@@ -0,0 +1,283 @@
+"""
+Cuantiles de la demanda con modelos no normales, elegidos por SKU.
+
+calcular_z_score supone demanda normal. Para artículos intermitentes o muy
+asimétricos (coeficiente de variación alto) el punto de reorden se calcula
+aquí como el cuantil de la demanda durante el plazo según otro modelo:
+
+    normal              d × L + z × σ × √L, como en la app
+    poisson             Poisson(d × L)
+    binomial_negativa   media d × L y varianza σ² × L
+    gamma               forma L × d² / σ², escala σ² / d
+    empirico            suma de L días remuestreados del historial (bootstrap),
+                        calculada exactamente por convolución
+
+Los cuantiles de la gamma salen de un índice de interpolación precalculado
+por nivel de servicio, sin llamar a scipy por artículo; Poisson y binomial
+negativa parten de ese índice y se corrigen con su función de distribución
+vectorizada hasta el entero exacto.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy import special
+
+from inventario.calculos import _columna, _indice, calcular_z_score_lote
+from inventario.plazo_variable import cuantil_demanda_plazo_lote, matriz_muestras, momentos_muestras
+
+MODELOS = ("normal", "poisson", "binomial_negativa", "gamma", "empirico")
+
+# Con modelo="auto": hasta este coeficiente de variación se mantiene la normal
+UMBRAL_CV_NORMAL = 0.4
+
+# Con modelo="auto": proporción de días sin consumo a partir de la cual el artículo es
+# intermitente y se usa el modelo empírico (si hay suficientes días de historial)
+UMBRAL_DIAS_SIN_CONSUMO = 0.3
+MIN_DIAS_EMPIRICO = 28
+
+# Dispersión (varianza / media) hasta la que un conteo se modela como Poisson
+MAX_DISPERSION_POISSON = 1.1
+
+# Rejilla del índice de la gamma: log(forma) equiespaciado
+FORMA_MINIMA = 1e-3
+FORMA_MAXIMA = 1e6
+PUNTOS_INDICE = 4096
+
+# Pasos máximos de corrección del cuantil discreto a partir de la aproximación gamma
+MAX_PASOS_DISCRETOS = 64
+
+
+@lru_cache(maxsize=1024)
+def _indice_gamma(nivel_servicio):
+    """
+    Índice de interpolación del cuantil de la gamma(forma, 1) para un nivel de servicio
+
+    Devuelve la rejilla de log(forma) y log(cuantil / forma), que varía
+    suavemente con la forma y se interpola linealmente.
+    """
+    log_forma = np.linspace(np.log(FORMA_MINIMA), np.log(FORMA_MAXIMA), PUNTOS_INDICE)
+    forma = np.exp(log_forma)
+    with np.errstate(divide="ignore"):
+        log_relativo = np.log(special.gammaincinv(forma, nivel_servicio) / forma)
+    log_relativo.setflags(write=False)
+    return log_forma, log_relativo
+
+
+def cuantil_gamma_lote(forma, nivel_servicio):
+    """
+    Cuantil de la gamma(forma, escala 1) para cada SKU, interpolado en el índice precalculado
+
+    Las formas fuera de la rejilla (y cuantiles que serían 0) se calculan con scipy directamente.
+    """
+    forma = np.atleast_1d(np.asarray(forma, dtype=float))
+    nivel = _columna(nivel_servicio, forma.shape[0])
+    cuantil = np.empty(forma.shape[0])
+
+    en_rejilla = (forma >= FORMA_MINIMA) & (forma <= FORMA_MAXIMA)
+    # pd.unique no ordena: con un millón de SKUs y pocos niveles distintos es mucho más rápido
+    for valor in pd.unique(nivel[en_rejilla]):
+        filas = en_rejilla & (nivel == valor)
+        log_forma, log_relativo = _indice_gamma(float(valor))
+        cuantil[filas] = forma[filas] * np.exp(np.interp(np.log(forma[filas]), log_forma, log_relativo))
+
+    fuera = ~en_rejilla | ~np.isfinite(cuantil)
+    if fuera.any():
+        cuantil[fuera] = special.gammaincinv(forma[fuera], nivel[fuera])
+    return cuantil
+
+
+def _corregir_discreto(cuantil_continuo, distribucion, nivel):
+    """
+    Menor entero k con distribucion(k) >= nivel, partiendo de una aproximación continua
+
+    distribucion(k, filas) devuelve P(X <= k) de las filas indicadas.
+    """
+    k = np.maximum(np.floor(cuantil_continuo), 0)
+    filas = np.flatnonzero(np.isfinite(k))
+    for _ in range(MAX_PASOS_DISCRETOS):
+        if filas.size == 0:
+            break
+        bajo = distribucion(k[filas], filas) < nivel[filas]
+        k[filas[bajo]] += 1
+        alto = ~bajo & (k[filas] > 0)
+        alto[alto] = distribucion(k[filas[alto]] - 1, filas[alto]) >= nivel[filas[alto]]
+        k[filas[alto]] -= 1
+        filas = filas[bajo | alto]
+    return k
+
+
+def cuantil_poisson_lote(media, nivel_servicio):
+    """
+    Cuantil de la Poisson(media) para cada SKU
+    """
+    media = np.atleast_1d(np.asarray(media, dtype=float))
+    nivel = _columna(nivel_servicio, media.shape[0])
+    cuantil = np.zeros(media.shape[0])
+    positivas = media > 0
+    if positivas.any():
+        m = media[positivas]
+        cuantil[positivas] = _corregir_discreto(
+            cuantil_gamma_lote(m, nivel[positivas]),
+            lambda k, filas: special.pdtr(k, m[filas]),
+            nivel[positivas],
+        )
+    return cuantil
+
+
+def cuantil_binomial_negativa_lote(media, varianza, nivel_servicio):
+    """
+    Cuantil de la binomial negativa con la media y varianza dadas para cada SKU
+
+    Sin sobredispersión (varianza <= media) se usa la Poisson.
+    """
+    media = np.atleast_1d(np.asarray(media, dtype=float))
+    varianza = np.broadcast_to(np.asarray(varianza, dtype=float), media.shape)
+    nivel = _columna(nivel_servicio, media.shape[0])
+
+    sobredispersa = (varianza > media) & (media > 0)
+    cuantil = cuantil_poisson_lote(np.where(sobredispersa, 0.0, media), nivel)
+    if sobredispersa.any():
+        m, v = media[sobredispersa], varianza[sobredispersa]
+        exitos = m ** 2 / (v - m)
+        probabilidad = m / v
+        cuantil[sobredispersa] = _corregir_discreto(
+            cuantil_gamma_lote(m ** 2 / v, nivel[sobredispersa]) * (v / m),
+            lambda k, filas: special.betainc(exitos[filas], k + 1, probabilidad[filas]),
+            nivel[sobredispersa],
+        )
+    return cuantil
+
+
+def elegir_modelo_lote(consumos_diarios=None, demanda_promedio_diaria=None, desviacion_demanda=None):
+    """
+    Elige el modelo de demanda de cada SKU
+
+    Normal si el coeficiente de variación no supera UMBRAL_CV_NORMAL; si no,
+    empírico para artículos intermitentes con historial suficiente, Poisson o
+    binomial negativa para conteos enteros según su dispersión, y gamma para
+    el resto. Sin consumos diarios solo se distingue entre normal y gamma.
+    """
+    if consumos_diarios is not None:
+        consumos = matriz_muestras(consumos_diarios)
+        n_dias, demanda, desviacion = momentos_muestras(consumos)
+        validos = ~np.isnan(consumos)
+        sin_consumo = (validos & (consumos == 0)).sum(axis=1) / np.maximum(n_dias, 1)
+        enteros = (~validos | (consumos == np.round(consumos))).all(axis=1)
+    else:
+        demanda, desviacion = _columna(demanda_promedio_diaria), _columna(desviacion_demanda)
+        n_dias = np.zeros(demanda.shape[0])
+        sin_consumo = np.zeros(demanda.shape[0])
+        enteros = np.zeros(demanda.shape[0], dtype=bool)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        coeficiente_variacion = np.where(demanda > 0, desviacion / demanda, np.inf)
+        dispersion = np.where(demanda > 0, desviacion ** 2 / demanda, np.inf)
+
+    return np.select(
+        [
+            coeficiente_variacion <= UMBRAL_CV_NORMAL,
+            (sin_consumo >= UMBRAL_DIAS_SIN_CONSUMO) & (n_dias >= MIN_DIAS_EMPIRICO),
+            enteros & (dispersion <= MAX_DISPERSION_POISSON),
+            enteros,
+        ],
+        ["normal", "empirico", "poisson", "binomial_negativa"],
+        default="gamma",
+    ).astype(object)
+
+
+def cuantil_demanda_modelos_lote(modelos, demanda_promedio_diaria, desviacion_demanda, dias,
+                                 nivel_servicio, consumos_diarios=None):
+    """
+    Cuantil nivel_servicio de la demanda de dias días de cada SKU según su modelo
+
+    dias es el tiempo de reposición (o el período de riesgo en período fijo).
+    El modelo empírico necesita consumos_diarios.
+    """
+    demanda = _columna(demanda_promedio_diaria)
+    n_filas = demanda.shape[0]
+    desviacion = _columna(desviacion_demanda, n_filas)
+    dias = _columna(dias, n_filas)
+    nivel = _columna(nivel_servicio, n_filas)
+    modelos = np.broadcast_to(np.asarray(modelos, dtype=object), (n_filas,))
+
+    desconocidos = set(pd.unique(modelos)) - set(MODELOS)
+    if desconocidos:
+        raise ValueError(f"Modelos desconocidos: {sorted(desconocidos)}; use uno de {MODELOS}")
+
+    media = demanda * dias
+    varianza = desviacion ** 2 * dias
+    cuantil = np.full(n_filas, np.nan)
+
+    filas = modelos == "normal"
+    cuantil[filas] = media[filas] + calcular_z_score_lote(100 - 100 * nivel[filas]) * np.sqrt(varianza[filas])
+
+    filas = modelos == "poisson"
+    cuantil[filas] = cuantil_poisson_lote(media[filas], nivel[filas])
+
+    filas = modelos == "binomial_negativa"
+    cuantil[filas] = cuantil_binomial_negativa_lote(media[filas], varianza[filas], nivel[filas])
+
+    filas = (modelos == "gamma") & (varianza > 0) & (media > 0)
+    escala = varianza[filas] / media[filas]
+    cuantil[filas] = cuantil_gamma_lote(media[filas] / escala, nivel[filas]) * escala
+    # Sin variabilidad la demanda es determinista
+    filas = (modelos == "gamma") & ~((varianza > 0) & (media > 0))
+    cuantil[filas] = media[filas]
+
+    filas = modelos == "empirico"
+    if filas.any():
+        if consumos_diarios is None:
+            raise ValueError("El modelo empírico necesita consumos_diarios")
+        cuantil[filas] = cuantil_demanda_plazo_lote(
+            matriz_muestras(consumos_diarios)[filas], dias[filas, None], nivel[filas]
+        )
+    return cuantil
+
+
+def calcular_cantidad_fija_modelos_lote(prob_falta_stock, tiempo_reposicion, consumos_diarios=None,
+                                        demanda_promedio_diaria=None, desviacion_demanda=None,
+                                        modelo="auto"):
+    """
+    Inventario de seguridad y punto de reorden del Sistema de Cantidad Fija con el modelo de demanda de cada SKU
+
+    modelo es "auto", uno de MODELOS o una columna con un modelo por SKU. El
+    punto de reorden es el cuantil de la demanda durante el plazo y el
+    inventario de seguridad su diferencia con la demanda promedio. Se añade
+    z_equivalente, el z-score que daría el mismo inventario con la fórmula normal.
+    """
+    indice = _indice(prob_falta_stock, tiempo_reposicion, consumos_diarios,
+                     demanda_promedio_diaria, desviacion_demanda, modelo)
+    if consumos_diarios is not None:
+        consumos_diarios = matriz_muestras(consumos_diarios)
+        _, demanda, desviacion = momentos_muestras(consumos_diarios)
+    elif demanda_promedio_diaria is not None and desviacion_demanda is not None:
+        demanda, desviacion = _columna(demanda_promedio_diaria), _columna(desviacion_demanda)
+    else:
+        raise ValueError("Se necesita consumos_diarios o bien demanda_promedio_diaria y desviacion_demanda")
+    n_filas = demanda.shape[0]
+
+    prob = _columna(prob_falta_stock, n_filas)
+    tiempo = _columna(tiempo_reposicion, n_filas)
+    if isinstance(modelo, str) and modelo == "auto":
+        modelos = elegir_modelo_lote(consumos_diarios, demanda, desviacion)
+    else:
+        modelos = np.array(np.broadcast_to(np.asarray(modelo, dtype=object), (n_filas,)))
+
+    punto_reorden = cuantil_demanda_modelos_lote(
+        modelos, demanda, desviacion, tiempo, (100 - prob) / 100, consumos_diarios
+    )
+    inventario_seguridad = punto_reorden - demanda * tiempo
+    desviacion_plazo = desviacion * np.sqrt(tiempo)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z_equivalente = np.where(desviacion_plazo > 0, inventario_seguridad / desviacion_plazo, np.nan)
+
+    return pd.DataFrame({
+        "demanda_promedio_diaria": demanda,
+        "desviacion_demanda": desviacion,
+        "modelo": modelos,
+        "z_equivalente": z_equivalente,
+        "inventario_seguridad": inventario_seguridad,
+        "punto_reorden": punto_reorden,
+        "valido": (prob > 0) & (tiempo > 0) & (demanda > 0),
+    }, index=indice)
@@ -0,0 +1,292 @@
+"""
+Planificación por lotes del Sistema de Período Fijo para todo el catálogo.
+
+Reparte el catálogo (una fila por SKU y almacén) en bloques entre un grupo
+de procesos, calcula inventario de seguridad, nivel objetivo, cantidad a
+pedir y el resumen de la proyección de cada fila, y escribe el resultado en
+un archivo Parquet. El resultado no depende del número de procesos.
+
+Uso:
+    python -m inventario.ejecutor catalogo.parquet resultados.parquet [--procesos 32]
+    python -m inventario.ejecutor catalogo.parquet --almacen resultados/   # ejecución del día
+    python -m inventario.ejecutor catalogo.parquet resultados.parquet --historial historial.parquet --pronostico holt_winters
+    python -m inventario.ejecutor catalogo.parquet resultados.parquet --procesos 32 --memoria-compartida
+
+El catálogo (CSV o Parquet) debe tener las columnas prob_falta_stock,
+tiempo_reposicion, ciclo_pedido e inventario_actual, más la demanda en una
+de estas formas:
+    - columnas consumo_1 ... consumo_n con el consumo diario de cada fila, o
+    - columnas demanda_promedio_diaria y desviacion_demanda, o
+    - un historial largo indicado con --historial (se une por sku). Con
+      --pronostico, la demanda es la media pronosticada para el período de
+      riesgo de cada fila y la desviación es la del error de pronóstico.
+Con la columna opcional desviacion_tiempo_reposicion, tiempo_reposicion es
+el plazo promedio y el inventario de seguridad incluye su variabilidad. Las
+columnas sku y almacen, si existen, se copian al resultado.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from inventario.calculos import calcular_periodo_fijo_lote
+from inventario.pronostico import METODOS
+from inventario.proyeccion import (
+    horizonte_periodo_fijo,
+    proyectar_periodo_fijo_lote,
+    resumir_proyeccion_lote,
+)
+
+COLUMNAS_CLAVE = ("sku", "almacen")
+PREFIJO_CONSUMO = "consumo_"
+TAMANO_BLOQUE = 10_000
+
+
+def leer_catalogo(ruta):
+    """
+    Lee el catálogo de un archivo CSV o Parquet
+    """
+    if str(ruta).lower().endswith((".parquet", ".pq")):
+        return pd.read_parquet(ruta)
+    return pd.read_csv(ruta)
+
+
+def columnas_consumo_ordenadas(catalogo):
+    """
+    Devuelve las columnas de consumo diario ordenadas por su número (consumo_1, consumo_2, ...)
+    """
+    columnas = [c for c in catalogo.columns if str(c).startswith(PREFIJO_CONSUMO)]
+    return sorted(columnas, key=lambda c: int(c[len(PREFIJO_CONSUMO):]))
+
+
+def _planificar(columnas):
+    """
+    Calcula el Sistema de Período Fijo y el resumen de su proyección con los argumentos de calcular_periodo_fijo_lote
+    """
+    resultados = calcular_periodo_fijo_lote(**columnas)
+
+    # Proyección de todas las filas a la vez; cada fila se resume solo hasta su propio horizonte
+    tiempo = np.asarray(columnas["tiempo_reposicion"], dtype=np.int64)
+    ciclo = np.asarray(columnas["ciclo_pedido"], dtype=np.int64)
+    dias, proyeccion = proyectar_periodo_fijo_lote(
+        np.asarray(columnas["inventario_actual"], dtype=float),
+        resultados["demanda_promedio_diaria"].to_numpy(),
+        resultados["cantidad_pedir"].to_numpy(),
+        tiempo,
+        ciclo,
+        n_pedidos=2,
+    )
+    dias_validos = dias[None, :] < horizonte_periodo_fijo(tiempo, ciclo)[:, None]
+    resumen = resumir_proyeccion_lote(proyeccion, resultados["inventario_seguridad"], dias_validos)
+    resumen.index = resultados.index
+    return pd.concat([resultados, resumen], axis=1)
+
+
+def planificar_periodo_fijo(catalogo):
+    """
+    Calcula el Sistema de Período Fijo y el resumen de su proyección para cada fila del catálogo
+    """
+    columnas = {nombre: catalogo[nombre] for nombre in
+                ("prob_falta_stock", "tiempo_reposicion", "ciclo_pedido", "inventario_actual")}
+    columnas_consumo = columnas_consumo_ordenadas(catalogo)
+    if columnas_consumo:
+        columnas["consumos_diarios"] = catalogo[columnas_consumo].to_numpy(dtype=float)
+    else:
+        columnas["demanda_promedio_diaria"] = catalogo["demanda_promedio_diaria"]
+        columnas["desviacion_demanda"] = catalogo["desviacion_demanda"]
+
+    if "desviacion_tiempo_reposicion" in catalogo.columns:
+        columnas["desviacion_tiempo_reposicion"] = catalogo["desviacion_tiempo_reposicion"]
+
+    claves = catalogo[[c for c in COLUMNAS_CLAVE if c in catalogo.columns]]
+    return pd.concat([claves, _planificar(columnas)], axis=1)
+
+
+def planificar_parametros(parametros, filas=slice(None)):
+    """
+    Calcula el Sistema de Período Fijo y el resumen de su proyección para filas de un ParametrosSKU
+    """
+    return _planificar(parametros.argumentos_periodo_fijo(filas))
+
+
+def _planificar_bloque_compartido(descriptor, inicio, fin):
+    """
+    Planifica las filas inicio..fin de un ParametrosSKU en memoria compartida (se ejecuta en cada proceso)
+    """
+    from inventario.parametros import ParametrosSKU
+
+    with ParametrosSKU.adjuntar(descriptor) as parametros:
+        return planificar_parametros(parametros, slice(inicio, fin))
+
+
+def ejecutar(catalogo, procesos=None, tamano_bloque=TAMANO_BLOQUE, memoria_compartida=False):
+    """
+    Planifica el catálogo repartiendo bloques de tamano_bloque filas entre procesos
+
+    Con procesos=1 se calcula en el proceso actual. El orden de las filas y
+    los valores son los mismos con cualquier número de procesos. Con
+    memoria_compartida los parámetros se guardan en un ParametrosSKU
+    (valores en float32) que los procesos leen desde memoria compartida, en
+    lugar de recibir cada uno una copia serializada de su bloque; las copias
+    float64 de los cálculos se hacen bloque a bloque.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    if memoria_compartida:
+        return _ejecutar_memoria_compartida(catalogo, procesos, tamano_bloque)
+    if procesos == 1 or len(catalogo) <= tamano_bloque:
+        return planificar_periodo_fijo(catalogo)
+
+    bloques = [catalogo.iloc[inicio:inicio + tamano_bloque]
+               for inicio in range(0, len(catalogo), tamano_bloque)]
+    with ProcessPoolExecutor(max_workers=procesos) as grupo:
+        partes = list(grupo.map(planificar_periodo_fijo, bloques))
+    return pd.concat(partes)
+
+
+def _ejecutar_memoria_compartida(catalogo, procesos, tamano_bloque):
+    """
+    Planifica el catálogo desde un ParametrosSKU, en memoria compartida si hay varios procesos
+    """
+    from inventario.parametros import ParametrosSKU
+
+    parametros = ParametrosSKU.desde_catalogo(catalogo)
+    inicios = range(0, len(catalogo), tamano_bloque)
+    if procesos == 1 or len(catalogo) <= tamano_bloque:
+        # También por bloques: los cálculos copian en float64 las filas que reciben
+        partes = [planificar_parametros(parametros, slice(inicio, inicio + tamano_bloque))
+                  for inicio in inicios] or [planificar_parametros(parametros)]
+    else:
+        with parametros.exportar_memoria_compartida() as compartido, \
+                ProcessPoolExecutor(max_workers=procesos) as grupo:
+            descriptor = compartido.descriptor
+            partes = list(grupo.map(
+                _planificar_bloque_compartido,
+                [descriptor] * len(inicios), inicios,
+                [min(inicio + tamano_bloque, len(catalogo)) for inicio in inicios],
+            ))
+
+    resultados = pd.concat(partes)
+    resultados.index = catalogo.index
+    claves = catalogo[[c for c in COLUMNAS_CLAVE if c in catalogo.columns]]
+    return pd.concat([claves, resultados], axis=1)
+
+
+def _unir_historial(catalogo, ruta_historial):
+    """
+    Añade demanda promedio y desviación por SKU calculadas desde un historial largo
+    """
+    from inventario.ingesta import agregar_historial
+
+    estadisticas = agregar_historial(ruta_historial, rellenar_dias_sin_consumo=True)
+    catalogo = catalogo.drop(columns=["demanda_promedio_diaria", "desviacion_demanda"], errors="ignore")
+    catalogo = catalogo.join(
+        estadisticas[["demanda_promedio_diaria", "desviacion_demanda"]], on="sku"
+    )
+    faltantes = catalogo["demanda_promedio_diaria"].isna()
+    if faltantes.any():
+        print(f"Aviso: {faltantes.sum()} filas sin historial; se planifican con demanda cero",
+              file=sys.stderr)
+        catalogo[["demanda_promedio_diaria", "desviacion_demanda"]] = (
+            catalogo[["demanda_promedio_diaria", "desviacion_demanda"]].fillna(0.0)
+        )
+    return catalogo
+
+
+def _unir_pronostico(catalogo, ruta_historial, metodo):
+    """
+    Añade demanda pronosticada para el período de riesgo de cada fila y desviación del error de pronóstico
+    """
+    from inventario.backtesting import matriz_consumos
+    from inventario.pronostico import pronosticar_demanda_lote
+
+    skus, _, consumos = matriz_consumos(ruta_historial)
+    periodo_riesgo = (catalogo["tiempo_reposicion"] + catalogo["ciclo_pedido"]).to_numpy(dtype=np.int64)
+    resultado = pronosticar_demanda_lote(
+        consumos, metodo, horizonte=int(periodo_riesgo.max(initial=1)), skus=skus
+    )
+
+    # Media de la trayectoria pronosticada de cada SKU hasta el período de riesgo de cada fila
+    fila_sku = skus.get_indexer(catalogo["sku"])
+    con_historial = fila_sku >= 0
+    acumulado = np.cumsum(resultado.pronostico, axis=1)
+    dias = np.clip(periodo_riesgo, 1, acumulado.shape[1])
+    demanda = np.zeros(len(catalogo))
+    desviacion = np.zeros(len(catalogo))
+    demanda[con_historial] = (
+        acumulado[fila_sku[con_historial], dias[con_historial] - 1] / dias[con_historial]
+    )
+    desviacion[con_historial] = resultado.resumen["desviacion_demanda"].to_numpy()[fila_sku[con_historial]]
+
+    if not con_historial.all():
+        print(f"Aviso: {(~con_historial).sum()} filas sin historial; se planifican con demanda cero",
+              file=sys.stderr)
+    catalogo = catalogo.drop(columns=["demanda_promedio_diaria", "desviacion_demanda"], errors="ignore")
+    return catalogo.assign(demanda_promedio_diaria=demanda, desviacion_demanda=desviacion)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Planificación por lotes del Sistema de Período Fijo"
+    )
+    parser.add_argument("catalogo", help="Catálogo CSV o Parquet")
+    parser.add_argument("salida", nargs="?", default=None, help="Archivo Parquet de resultados")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="Número de procesos (por defecto, todos los núcleos)")
+    parser.add_argument("--tamano-bloque", type=int, default=TAMANO_BLOQUE,
+                        help="Filas por bloque enviado a cada proceso")
+    parser.add_argument("--historial", default=None,
+                        help="Historial largo (sku, fecha, cantidad) para calcular la demanda")
+    parser.add_argument("--pronostico", choices=METODOS, default=None,
+                        help="Pronostica la demanda del historial con suavizado exponencial "
+                             "en lugar de usar su media")
+    parser.add_argument("--memoria-compartida", action="store_true",
+                        help="Pasa los parámetros a los procesos en un almacén compacto en memoria "
+                             "compartida (valores en float32) en lugar de copiar cada bloque")
+    parser.add_argument("--almacen", default=None,
+                        help="Guarda también el resultado como ejecución del almacén en este directorio")
+    parser.add_argument("--fecha-ejecucion", default=None,
+                        help="Nombre de la ejecución en el almacén (por defecto, la fecha de hoy)")
+    parser.add_argument("--reemplazar", action="store_true",
+                        help="Reemplaza la ejecución del almacén si ya existe")
+    args = parser.parse_args(argv)
+    if args.salida is None and args.almacen is None:
+        parser.error("indique un archivo de salida, --almacen o ambos")
+    if args.pronostico and not args.historial:
+        parser.error("--pronostico necesita --historial")
+
+    inicio = time.perf_counter()
+    catalogo = leer_catalogo(args.catalogo)
+    if args.pronostico:
+        catalogo = _unir_pronostico(catalogo, args.historial, args.pronostico)
+    elif args.historial:
+        catalogo = _unir_historial(catalogo, args.historial)
+
+    resultados = ejecutar(catalogo, args.procesos, args.tamano_bloque, args.memoria_compartida)
+    destinos = []
+    if args.salida:
+        resultados.to_parquet(args.salida, index=False)
+        destinos.append(args.salida)
+    if args.almacen:
+        from inventario.almacen import guardar_ejecucion
+
+        try:
+            destinos.append(guardar_ejecucion(
+                resultados, args.almacen, fecha=args.fecha_ejecucion, reemplazar=args.reemplazar,
+                metadatos={"catalogo": os.path.abspath(args.catalogo), "historial": args.historial,
+                           "pronostico": args.pronostico, "sistema": "periodo_fijo"},
+            ))
+        except FileExistsError as error:
+            print(f"Error: {error} (use --reemplazar para sobrescribirla)", file=sys.stderr)
+            return 1
+
+    print(f"{len(resultados)} filas planificadas en {time.perf_counter() - inicio:.1f} s "
+          f"-> {', '.join(destinos)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
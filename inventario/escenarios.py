@@ -0,0 +1,82 @@
+"""
+Barrido de escenarios del Sistema de Período Fijo.
+
+Calcula de una vez el inventario de seguridad, el nivel objetivo y la
+cantidad a pedir de un SKU para todas las combinaciones de probabilidad de
+falta de stock, tiempo de reposición y ciclo de pedido, con difusión de
+NumPy sobre un cubo (probabilidades × tiempos × ciclos). El z-score se
+calcula una vez por probabilidad y la raíz del período de riesgo una vez
+por par tiempo × ciclo, así que un cubo de 50 × 365 × 365 es una sola
+multiplicación en lugar de miles de ejecuciones de la app.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from inventario.calculos import calcular_z_score_lote
+
+
+@dataclass
+class CuboEscenarios:
+    """
+    Resultados del Sistema de Período Fijo por probabilidad × tiempo de reposición × ciclo de pedido
+    """
+    probabilidades: np.ndarray
+    tiempos_reposicion: np.ndarray
+    ciclos_pedido: np.ndarray
+    inventario_seguridad: np.ndarray
+    nivel_objetivo: np.ndarray
+    inventario_actual: float
+
+    @property
+    def cantidad_pedir(self):
+        """
+        Cantidad a pedir de cada escenario; negativa cuando no es necesario pedir, como en la app
+        """
+        return self.nivel_objetivo - self.inventario_actual
+
+    def corte(self, probabilidad):
+        """
+        Posición en el cubo de la probabilidad de falta de stock indicada
+        """
+        posicion = np.flatnonzero(self.probabilidades == probabilidad)
+        if posicion.size == 0:
+            raise KeyError(f"La probabilidad {probabilidad} no está en el barrido")
+        return int(posicion[0])
+
+
+def barrido_periodo_fijo(demanda_promedio_diaria, desviacion_demanda, inventario_actual,
+                         tiempos_reposicion, ciclos_pedido, probabilidades,
+                         desviacion_tiempo_reposicion=0.0, dtype=np.float32):
+    """
+    Inventario de seguridad y nivel objetivo del Sistema de Período Fijo para todo el cubo de escenarios
+
+    Usa las mismas fórmulas que calcular_periodo_fijo_lote con período de
+    riesgo ciclo + tiempo de reposición, y con desviacion_tiempo_reposicion
+    mayor que cero incluye la variabilidad del plazo. Los cubos se guardan
+    en dtype (float32 por defecto: un cubo de 50 × 365 × 365 ocupa 27 MB).
+    """
+    probabilidades = np.asarray(probabilidades)
+    tiempos = np.asarray(tiempos_reposicion, dtype=float)
+    ciclos = np.asarray(ciclos_pedido, dtype=float)
+
+    z_score = calcular_z_score_lote(probabilidades).astype(dtype)[:, None, None]
+    periodo_riesgo = (tiempos[:, None] + ciclos[None, :])
+    if desviacion_tiempo_reposicion > 0:
+        desviacion_riesgo = np.sqrt(
+            periodo_riesgo * desviacion_demanda ** 2
+            + demanda_promedio_diaria ** 2 * desviacion_tiempo_reposicion ** 2
+        )
+    else:
+        desviacion_riesgo = desviacion_demanda * np.sqrt(periodo_riesgo)
+
+    inventario_seguridad = z_score * desviacion_riesgo.astype(dtype)[None]
+    nivel_objetivo = inventario_seguridad + (demanda_promedio_diaria * periodo_riesgo).astype(dtype)[None]
+    return CuboEscenarios(
+        probabilidades=probabilidades,
+        tiempos_reposicion=np.asarray(tiempos_reposicion),
+        ciclos_pedido=np.asarray(ciclos_pedido),
+        inventario_seguridad=inventario_seguridad,
+        nivel_objetivo=nivel_objetivo,
+        inventario_actual=float(inventario_actual),
+    )
@@ -0,0 +1,249 @@
+"""
+Estadísticas de demanda incrementales por SKU.
+
+AcumuladorWelford mantiene media y varianza de todo el historial y
+VentanaMovil las de los últimos días; ambos se actualizan en O(1) por SKU al
+llegar el consumo de un nuevo día, sin volver a recorrer el historial, y se
+pueden guardar en disco entre ejecuciones nocturnas.
+"""
+import numpy as np
+
+
+def combinar_momentos(n_a, media_a, m2_a, n_b, media_b, m2_b):
+    """
+    Combina número de datos, media y suma de cuadrados de desviaciones de dos conjuntos
+
+    Fórmula de Chan et al.; acepta escalares, arreglos o columnas de pandas.
+    Donde ambos conjuntos están vacíos devuelve media y m2 cero.
+    """
+    n = n_a + n_b
+    delta = media_b - media_a
+    with np.errstate(invalid="ignore", divide="ignore"):
+        peso_b = np.where(n > 0, n_b / np.where(n > 0, n, 1), 0.0)
+        media = media_a + delta * peso_b
+        m2 = m2_a + m2_b + delta ** 2 * n_a * peso_b
+    return n, media, m2
+
+
+def desviacion_muestral(n, m2):
+    """
+    Desviación estándar con ddof=1; 0 con menos de dos datos, como calcular_desviacion_demanda_real
+    """
+    varianza = np.where(n >= 2, m2 / np.maximum(n - 1, 1), 0.0)
+    return np.sqrt(np.maximum(varianza, 0.0))
+
+
+def _indices(indices, n_skus):
+    """
+    Normaliza el subconjunto de SKUs a actualizar
+    """
+    if indices is None:
+        return slice(None)
+    indices = np.asarray(indices)
+    if indices.dtype == bool and indices.shape != (n_skus,):
+        raise ValueError("La máscara de SKUs debe tener un valor por SKU")
+    return indices
+
+
+def posiciones_skus(indices, n_skus):
+    """
+    Posiciones de los SKUs a actualizar; una lista de posiciones se usa tal cual, sin recorrer todo el catálogo
+    """
+    seleccion = _indices(indices, n_skus)
+    if isinstance(seleccion, slice) or seleccion.dtype == bool:
+        return np.arange(n_skus)[seleccion]
+    return seleccion
+
+
+class AcumuladorWelford:
+    """
+    Media y varianza de todo el historial por SKU con el algoritmo de Welford
+    """
+
+    def __init__(self, n_skus):
+        self.n = np.zeros(n_skus, dtype=np.int64)
+        self.media = np.zeros(n_skus)
+        self.m2 = np.zeros(n_skus)
+
+    @property
+    def n_skus(self):
+        return self.n.shape[0]
+
+    @property
+    def desviacion(self):
+        """
+        Desviación estándar con ddof=1 por SKU
+        """
+        return desviacion_muestral(self.n, self.m2)
+
+    def actualizar(self, consumos, indices=None):
+        """
+        Añade el consumo de un día para todos los SKUs o para los indicados en indices
+        """
+        seleccion = _indices(indices, self.n_skus)
+        consumos = np.asarray(consumos, dtype=float)
+
+        n = self.n[seleccion] + 1
+        delta = consumos - self.media[seleccion]
+        media = self.media[seleccion] + delta / n
+        self.m2[seleccion] += delta * (consumos - media)
+        self.media[seleccion] = media
+        self.n[seleccion] = n
+
+    def actualizar_bloque(self, consumos):
+        """
+        Añade varios días de una vez; consumos es una matriz (SKUs × días)
+        """
+        consumos = np.asarray(consumos, dtype=float)
+        n_b = consumos.shape[1]
+        if n_b == 0:
+            return
+        media_b = consumos.mean(axis=1)
+        m2_b = ((consumos - media_b[:, None]) ** 2).sum(axis=1)
+        self.n, self.media, self.m2 = combinar_momentos(
+            self.n, self.media, self.m2, n_b, media_b, m2_b
+        )
+
+    def combinar(self, otro):
+        """
+        Incorpora los datos de otro acumulador con los mismos SKUs (por ejemplo de otro proceso)
+        """
+        self.n, self.media, self.m2 = combinar_momentos(
+            self.n, self.media, self.m2, otro.n, otro.media, otro.m2
+        )
+
+    def guardar(self, ruta):
+        """
+        Guarda el estado en un archivo .npz
+        """
+        np.savez(ruta, n=self.n, media=self.media, m2=self.m2)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """
+        Restaura un acumulador guardado con guardar
+        """
+        with np.load(ruta) as datos:
+            acumulador = cls(datos["n"].shape[0])
+            acumulador.n = datos["n"].copy()
+            acumulador.media = datos["media"].copy()
+            acumulador.m2 = datos["m2"].copy()
+        return acumulador
+
+
+class VentanaMovil:
+    """
+    Media y varianza de los últimos `ancho` días por SKU
+
+    Guarda los consumos en un búfer circular; al llegar un día nuevo sustituye
+    al más antiguo y corrige media y m2 en O(1). Cada recalcular_cada
+    actualizaciones recalcula los momentos desde el búfer para que no se
+    acumule error de redondeo.
+    """
+
+    def __init__(self, n_skus, ancho, recalcular_cada=1000):
+        if ancho < 1:
+            raise ValueError("El ancho de la ventana debe ser positivo")
+        self.ancho = ancho
+        self.recalcular_cada = recalcular_cada
+        self.buffer = np.zeros((n_skus, ancho))
+        self.posicion = np.zeros(n_skus, dtype=np.int64)
+        self.n = np.zeros(n_skus, dtype=np.int64)
+        self.media = np.zeros(n_skus)
+        self.m2 = np.zeros(n_skus)
+        self._actualizaciones = 0
+
+    @property
+    def n_skus(self):
+        return self.n.shape[0]
+
+    @property
+    def desviacion(self):
+        """
+        Desviación estándar con ddof=1 de la ventana de cada SKU
+        """
+        return desviacion_muestral(self.n, self.m2)
+
+    def actualizar(self, consumos, indices=None):
+        """
+        Añade el consumo de un día para todos los SKUs o para los indicados en indices
+        """
+        seleccion = posiciones_skus(indices, self.n_skus)
+        consumos = np.broadcast_to(np.asarray(consumos, dtype=float), seleccion.shape)
+
+        posicion = self.posicion[seleccion]
+        antiguo = self.buffer[seleccion, posicion]
+        n = self.n[seleccion]
+        media = self.media[seleccion]
+        m2 = self.m2[seleccion]
+        llena = n == self.ancho
+
+        # Ventana incompleta: paso de Welford normal
+        n_nuevo = np.where(llena, n, n + 1)
+        delta = consumos - np.where(llena, antiguo, media)
+        media_nueva = media + delta / n_nuevo
+        m2_nuevo = np.where(
+            llena,
+            m2 + delta * (consumos - media_nueva + antiguo - media),
+            m2 + delta * (consumos - media_nueva),
+        )
+
+        self.buffer[seleccion, posicion] = consumos
+        self.posicion[seleccion] = (posicion + 1) % self.ancho
+        self.n[seleccion] = n_nuevo
+        self.media[seleccion] = media_nueva
+        self.m2[seleccion] = np.maximum(m2_nuevo, 0.0)
+
+        self._actualizaciones += 1
+        if self.recalcular_cada and self._actualizaciones % self.recalcular_cada == 0:
+            self.recalcular()
+
+    def ventana_ordenada(self):
+        """
+        Devuelve los consumos de la ventana del más antiguo al más reciente (SKUs × ancho)
+
+        Las posiciones aún no llenas quedan al principio con valor cero.
+        """
+        columnas = (self.posicion[:, None] + np.arange(self.ancho)) % self.ancho
+        return np.take_along_axis(self.buffer, columnas, axis=1)
+
+    def recalcular(self, indices=None):
+        """
+        Recalcula media y m2 exactos desde el búfer
+        """
+        seleccion = posiciones_skus(indices, self.n_skus)
+        n = self.n[seleccion]
+        # Las posiciones sin datos del búfer contienen cero y no cuentan
+        validos = np.arange(self.ancho) < n[:, None]
+        columnas = (self.posicion[seleccion, None] - 1 - np.arange(self.ancho)) % self.ancho
+        valores = np.take_along_axis(self.buffer[seleccion], columnas, axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            media = np.where(n > 0, (valores * validos).sum(axis=1) / np.maximum(n, 1), 0.0)
+        self.media[seleccion] = media
+        self.m2[seleccion] = (((valores - media[:, None]) * validos) ** 2).sum(axis=1)
+
+    def guardar(self, ruta):
+        """
+        Guarda el estado en un archivo .npz
+        """
+        np.savez(
+            ruta, buffer=self.buffer, posicion=self.posicion, n=self.n,
+            media=self.media, m2=self.m2, recalcular_cada=self.recalcular_cada,
+            actualizaciones=self._actualizaciones,
+        )
+
+    @classmethod
+    def cargar(cls, ruta):
+        """
+        Restaura una ventana guardada con guardar
+        """
+        with np.load(ruta) as datos:
+            n_skus, ancho = datos["buffer"].shape
+            ventana = cls(n_skus, ancho, int(datos["recalcular_cada"]))
+            ventana.buffer = datos["buffer"].copy()
+            ventana.posicion = datos["posicion"].copy()
+            ventana.n = datos["n"].copy()
+            ventana.media = datos["media"].copy()
+            ventana.m2 = datos["m2"].copy()
+            ventana._actualizaciones = int(datos["actualizaciones"])
+        return ventana
@@ -0,0 +1,346 @@
+"""
+Construcción de los gráficos de plotly que muestra app.py.
+
+Las funciones solo reciben valores y devuelven la figura, de modo que la app
+puede memorizarlas por sus argumentos. Las series largas se reducen en el
+servidor con LTTB y pasan a Scattergl (WebGL) por encima de un umbral, y las
+trayectorias Monte Carlo se muestran como bandas de percentiles, para que el
+tamaño de la página no dependa del horizonte ni del número de trayectorias.
+"""
+import numpy as np
+import plotly.graph_objects as go
+
+DIAS_LABELS = ['Hace 7 días', 'Hace 6 días', 'Hace 5 días', 'Hace 4 días', 'Hace 3 días', 'Hace 2 días', 'Ayer']
+
+# Puntos máximos por serie que se envían al navegador
+MAX_PUNTOS_SERIE = 2000
+
+# A partir de estos puntos la serie se dibuja con WebGL y sin marcadores
+UMBRAL_WEBGL = 500
+
+# Percentiles de las bandas de trayectorias Monte Carlo (exterior e interior) y mediana
+PERCENTILES_BANDAS = (5, 25, 50, 75, 95)
+
+
+def lttb(x, y, n_puntos):
+    """
+    Índices de los puntos elegidos por Largest-Triangle-Three-Buckets
+
+    Conserva el primer y el último punto y, en cada tramo intermedio, el que
+    forma el triángulo de mayor área con el punto elegido antes y el
+    promedio del tramo siguiente, de modo que se mantienen picos y caídas.
+    """
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ns]").astype(np.int64)
+    x = x.astype(float)
+    y = np.asarray(y, dtype=float)
+    n = x.shape[0]
+    if n_puntos >= n or n_puntos < 3:
+        return np.arange(n)
+
+    bordes = np.linspace(1, n - 1, n_puntos - 1).astype(np.int64)
+    indices = np.empty(n_puntos, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    elegido = 0
+    for tramo in range(n_puntos - 2):
+        inicio, fin = bordes[tramo], bordes[tramo + 1]
+        if tramo + 2 < bordes.shape[0]:
+            siguiente = slice(bordes[tramo + 1], bordes[tramo + 2])
+        else:
+            siguiente = slice(n - 1, n)
+        x_medio, y_medio = x[siguiente].mean(), y[siguiente].mean()
+        area = np.abs(
+            (x[elegido] - x_medio) * (y[inicio:fin] - y[elegido])
+            - (x[elegido] - x[inicio:fin]) * (y_medio - y[elegido])
+        )
+        elegido = inicio + int(np.argmax(area))
+        indices[tramo + 1] = elegido
+    return indices
+
+
+def traza_serie(x, y, max_puntos=MAX_PUNTOS_SERIE, **kwargs):
+    """
+    Traza de línea que reduce la serie con LTTB y usa Scattergl cuando es larga
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if x.shape[0] > max_puntos:
+        seleccion = lttb(x, y, max_puntos)
+        x, y = x[seleccion], y[seleccion]
+
+    if x.shape[0] > UMBRAL_WEBGL:
+        return go.Scattergl(x=x, y=y, mode='lines', **kwargs)
+    return go.Scatter(x=x, y=y, mode='lines+markers', **kwargs)
+
+
+def percentiles_bandas(trayectorias):
+    """
+    Percentiles PERCENTILES_BANDAS de cada día de un conjunto de trayectorias (percentiles × días)
+    """
+    return np.percentile(trayectorias, PERCENTILES_BANDAS, axis=0)
+
+
+def trazas_bandas_percentiles(dias, trayectorias=None, color='blue', nombre='Trayectorias',
+                              max_puntos=MAX_PUNTOS_SERIE, bandas=None):
+    """
+    Bandas de percentiles 5-95 y 25-75 más la mediana de un conjunto de trayectorias (trayectorias × días)
+
+    En lugar de las trayectorias se pueden pasar las bandas ya calculadas con percentiles_bandas.
+    """
+    dias = np.asarray(dias)
+    p05, p25, p50, p75, p95 = percentiles_bandas(trayectorias) if bandas is None else bandas
+    if dias.shape[0] > max_puntos:
+        # Las bandas son suaves; basta con un muestreo regular
+        seleccion = np.linspace(0, dias.shape[0] - 1, max_puntos).astype(np.int64)
+        dias, p05, p25, p50, p75, p95 = (v[seleccion] for v in (dias, p05, p25, p50, p75, p95))
+
+    def borde(y, relleno, nombre_borde, mostrar):
+        return go.Scatter(
+            x=dias, y=y, mode='lines', line=dict(width=0, color=color), fill=relleno,
+            name=nombre_borde, showlegend=mostrar, hoverinfo='skip', opacity=0.2,
+        )
+
+    return [
+        borde(p05, None, f'{nombre} p5-p95', False),
+        borde(p95, 'tonexty', f'{nombre} p5-p95', True),
+        borde(p25, None, f'{nombre} p25-p75', False),
+        borde(p75, 'tonexty', f'{nombre} p25-p75', True),
+        go.Scatter(x=dias, y=p50, mode='lines', name=f'{nombre} mediana',
+                   line=dict(color=color, width=1, dash='dot')),
+    ]
+
+
+def figura_consumo_diario(consumos_diarios, color):
+    """
+    Gráfico de barras del consumo de los últimos 7 días con su promedio
+    """
+    fig = go.Figure(data=[
+        go.Bar(x=DIAS_LABELS, y=list(consumos_diarios), marker_color=color)
+    ])
+    fig.add_hline(y=sum(consumos_diarios)/7, line_dash="dash", line_color="red", annotation_text="Promedio")
+    fig.update_layout(
+        title="Patrón de Consumo Diario - Últimos 7 Días",
+        xaxis_title="Días",
+        yaxis_title="Unidades Consumidas",
+        showlegend=False
+    )
+    return fig
+
+
+def figura_simulacion_cantidad_fija(dias, inventario_simulado, punto_reorden, inventario_seguridad,
+                                    trayectorias=None, bandas=None):
+    """
+    Evolución simulada del inventario en el Sistema de Cantidad Fija
+
+    Si se pasan trayectorias (trayectorias × días) o sus bandas de
+    percentiles, se dibujan detrás de la trayectoria de ejemplo.
+    """
+    fig = go.Figure()
+
+    if bandas is None and trayectorias is not None and len(trayectorias) > 1:
+        bandas = percentiles_bandas(trayectorias)
+    if bandas is not None:
+        fig.add_traces(trazas_bandas_percentiles(dias, color='royalblue', nombre='Simulación',
+                                                 bandas=bandas))
+
+    fig.add_trace(traza_serie(
+        dias,
+        inventario_simulado,
+        name='Nivel de Inventario',
+        line=dict(color='blue', width=2)
+    ))
+
+    fig.add_hline(
+        y=punto_reorden,
+        line_dash="dash",
+        line_color="red",
+        annotation_text="Punto de Reorden"
+    )
+
+    fig.add_hline(
+        y=inventario_seguridad,
+        line_dash="dash",
+        line_color="orange",
+        annotation_text="Inventario de Seguridad"
+    )
+
+    fig.update_layout(
+        title="Simulación del Sistema de Cantidad Fija",
+        xaxis_title="Días",
+        yaxis_title="Unidades en Inventario",
+        hovermode='x unified',
+        yaxis=dict(range=[0, max(np.max(inventario_simulado),
+                                 np.max(trayectorias) if trayectorias is not None else 0,
+                                 np.max(bandas) if bandas is not None else 0) * 1.1])
+    )
+    return fig
+
+
+def figura_backtest_cantidad_fija(fechas, inventario, punto_reorden):
+    """
+    Existencias al cierre y punto de reorden recalculado de cada día del backtesting
+    """
+    fig = go.Figure()
+
+    fig.add_trace(traza_serie(
+        fechas,
+        inventario,
+        name='Existencias',
+        line=dict(color='blue', width=2)
+    ))
+
+    fig.add_trace(traza_serie(
+        fechas,
+        punto_reorden,
+        name='Punto de Reorden',
+        line=dict(color='red', width=1.5, dash='dash')
+    ))
+
+    fig.update_layout(
+        title="Backtesting del Sistema de Cantidad Fija con el consumo real",
+        xaxis_title="Fecha",
+        yaxis_title="Unidades en Inventario",
+        hovermode='x unified'
+    )
+    return fig
+
+
+def figura_proyeccion_periodo_fijo(dias_proyeccion, inventario_proyectado, inventario_seguridad,
+                                   tiempo_reposicion, ciclo_pedido, nivel_objetivo):
+    """
+    Proyección del inventario en el Sistema de Período Fijo con las llegadas de pedidos
+    """
+    fig = go.Figure()
+
+    fig.add_trace(traza_serie(
+        dias_proyeccion,
+        inventario_proyectado,
+        name='Inventario Proyectado',
+        line=dict(color='blue', width=2)
+    ))
+
+    fig.add_hline(
+        y=inventario_seguridad,
+        line_dash="dash",
+        line_color="orange",
+        annotation_text="Inventario de Seguridad"
+    )
+
+    fig.add_vline(
+        x=tiempo_reposicion + 1,
+        line_dash="dash",
+        line_color="green",
+        annotation_text="Primera Llegada"
+    )
+
+    fig.add_vline(
+        x=ciclo_pedido + tiempo_reposicion + 1,
+        line_dash="dash",
+        line_color="blue",
+        annotation_text="Segunda Llegada"
+    )
+
+    fig.update_layout(
+        title="Proyección del Inventario - Sistema de Período Fijo",
+        xaxis_title="Días",
+        yaxis_title="Unidades en Inventario",
+        hovermode='x unified',
+        yaxis=dict(range=[0, max(max(inventario_proyectado), nivel_objetivo) * 1.1])
+    )
+    return fig
+
+
+def figura_comparacion_niveles(inventario_actual, inventario_seguridad, demanda_esperada, nivel_objetivo):
+    """
+    Barras comparativas de los niveles de inventario del Sistema de Período Fijo
+    """
+    categorias = ['Inventario Actual', 'Inventario de Seguridad', 'Demanda Esperada', 'Nivel Objetivo']
+    valores = [inventario_actual, inventario_seguridad, demanda_esperada, nivel_objetivo]
+    colores = ['lightblue', 'orange', 'lightgreen', 'red']
+
+    fig = go.Figure(data=[
+        go.Bar(x=categorias, y=valores, marker_color=colores)
+    ])
+
+    fig.update_layout(
+        title="Comparación de Niveles de Inventario",
+        xaxis_title="Categorías",
+        yaxis_title="Unidades",
+        showlegend=False
+    )
+    return fig
+
+
+def figura_mapa_calor_escenarios(tiempos_reposicion, ciclos_pedido, valores, titulo, etiqueta,
+                                 tiempo_actual=None, ciclo_actual=None, escala='Viridis'):
+    """
+    Mapa de calor de un corte del barrido de escenarios (tiempo de reposición × ciclo de pedido)
+    """
+    fig = go.Figure()
+
+    fig.add_trace(go.Heatmap(
+        x=ciclos_pedido,
+        y=tiempos_reposicion,
+        z=valores,
+        colorscale=escala,
+        colorbar=dict(title=etiqueta),
+        hovertemplate='Ciclo: %{x} días<br>Reposición: %{y} días<br>' + etiqueta + ': %{z:.0f}<extra></extra>'
+    ))
+
+    if tiempo_actual is not None and ciclo_actual is not None:
+        fig.add_trace(go.Scatter(
+            x=[ciclo_actual],
+            y=[tiempo_actual],
+            mode='markers',
+            name='Parámetros actuales',
+            marker=dict(color='red', size=10, symbol='x')
+        ))
+
+    fig.update_layout(
+        title=titulo,
+        xaxis_title="Ciclo de pedido (días)",
+        yaxis_title="Tiempo de reposición (días)",
+        showlegend=False
+    )
+    return fig
+
+
+def figura_costos_nivel_servicio(probabilidades, costos, costos_monte_carlo, prob_optima):
+    """
+    Costo diario esperado según la probabilidad de falta de stock, con el óptimo marcado
+    """
+    fig = go.Figure()
+
+    fig.add_trace(go.Scatter(
+        x=probabilidades,
+        y=costos,
+        mode='lines',
+        name='Fórmula z × σ × √L',
+        line=dict(color='blue', width=2)
+    ))
+
+    if costos_monte_carlo is not None:
+        fig.add_trace(go.Scatter(
+            x=probabilidades,
+            y=costos_monte_carlo,
+            mode='lines',
+            name='Simulación Monte Carlo',
+            line=dict(color='gray', width=2, dash='dot')
+        ))
+
+    fig.add_vline(
+        x=prob_optima,
+        line_dash="dash",
+        line_color="green",
+        annotation_text="Óptimo"
+    )
+
+    fig.update_layout(
+        title="Costo Diario según la Probabilidad de Falta de Stock",
+        xaxis_title="Probabilidad aceptable de escasez de stock (%)",
+        yaxis_title="Costo diario esperado",
+        hovermode='x unified'
+    )
+    return fig
@@ -0,0 +1,393 @@
+"""
+Recálculo incremental del Sistema de Cantidad Fija cuando llegan datos nuevos.
+
+MotorIncremental guarda, por SKU, las entradas (consumo diario, probabilidad
+de falta de stock, tiempo de reposición, posición de inventario y cantidad
+de pedido fija) y las columnas derivadas de la app: demanda promedio,
+desviación, z-score, inventario de seguridad, punto de reorden, cantidad de
+pedido y cantidad a pedir. Cada columna derivada declara en DEPENDENCIAS de
+qué columnas depende; un cambio en una entrada marca como pendientes solo
+las columnas que dependen de ella y solo en los SKUs que cambiaron, y
+recalcular las calcula en orden topológico sobre esas filas. El consumo se
+lleva en una VentanaMovil, así que un día nuevo de un SKU cuesta O(1).
+
+Los cambios llegan como eventos: filas con sku y cualquiera de las entradas
+(un valor vacío deja la entrada como estaba). Se pueden aplicar directamente
+(aplicar_eventos), desde una cola local (procesar_cola) o desde archivos CSV
+o Parquet que se dejan en un directorio vigilado (vigilar_directorio).
+
+Uso:
+    python -m inventario.incremental catalogo.parquet --vigilar entrada/ --salida cambios.jsonl
+    python -m inventario.incremental catalogo.csv --historial historial.parquet --vigilar entrada/ --ventana 56
+
+El catálogo debe tener las columnas sku, prob_falta_stock y
+tiempo_reposicion, y opcionalmente inventario_actual (posición de
+inventario), cantidad_pedido_fija (por defecto dos veces el punto de
+reorden, como en la app) y consumo_1 ... consumo_n con los últimos días de
+consumo. Cada archivo de eventos procesado se mueve a entrada/procesados (o
+a entrada/errores si no se pudo aplicar) y las filas recalculadas se añaden
+a la salida como líneas JSON.
+"""
+import argparse
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from inventario.calculos import calcular_inventario_seguridad_lote, calcular_z_score_lote
+from inventario.ejecutor import columnas_consumo_ordenadas, leer_catalogo
+from inventario.estadisticas import VentanaMovil, desviacion_muestral
+from inventario.instrumentacion import instrumentar
+
+# Días de consumo con los que se calculan demanda y desviación
+VENTANA_POR_DEFECTO = 28
+
+# Entradas por SKU que pueden cambiar con un evento (además de consumo)
+ENTRADAS = ("prob_falta_stock", "tiempo_reposicion", "inventario_actual", "cantidad_pedido_fija")
+
+# Columna derivada -> columnas de las que depende, en orden topológico
+DEPENDENCIAS = {
+    "demanda_promedio_diaria": ("consumo",),
+    "desviacion_demanda": ("consumo",),
+    "z_score": ("prob_falta_stock",),
+    "inventario_seguridad": ("z_score", "desviacion_demanda", "tiempo_reposicion"),
+    "punto_reorden": ("demanda_promedio_diaria", "tiempo_reposicion", "inventario_seguridad"),
+    "cantidad_pedido": ("punto_reorden", "cantidad_pedido_fija"),
+    "cantidad_pedir": ("punto_reorden", "cantidad_pedido", "inventario_actual"),
+}
+
+EXTENSIONES_EVENTOS = (".csv", ".parquet", ".pq")
+DIRECTORIO_PROCESADOS = "procesados"
+DIRECTORIO_ERRORES = "errores"
+
+
+def _afectadas(columna):
+    """
+    Columnas derivadas que dependen, directa o indirectamente, de la columna (en orden topológico)
+    """
+    afectadas = set()
+    for derivada, dependencias in DEPENDENCIAS.items():
+        if columna in dependencias or afectadas.intersection(dependencias):
+            afectadas.add(derivada)
+    return tuple(derivada for derivada in DEPENDENCIAS if derivada in afectadas)
+
+
+AFECTADAS = {columna: _afectadas(columna) for columna in ("consumo",) + ENTRADAS}
+
+
+class MotorIncremental:
+    """
+    Entradas y resultados por SKU que se recalculan solo donde cambian sus dependencias
+    """
+
+    def __init__(self, catalogo, consumos=None, ventana=VENTANA_POR_DEFECTO):
+        """
+        catalogo es un DataFrame con una fila por SKU (columna sku o índice);
+        consumos, una matriz SKUs × días alineada con el catálogo. Sin
+        consumos se usan las columnas consumo_1 ... consumo_n del catálogo.
+        """
+        if "sku" in catalogo.columns:
+            catalogo = catalogo.set_index("sku")
+        if not catalogo.index.is_unique:
+            raise ValueError("El catálogo debe tener una sola fila por SKU")
+        self.skus = pd.Index(catalogo.index, name="sku")
+        n_skus = len(self.skus)
+
+        self.columnas = {}
+        for entrada in ENTRADAS:
+            if entrada in catalogo.columns:
+                self.columnas[entrada] = catalogo[entrada].to_numpy(dtype=float).copy()
+            elif entrada in ("prob_falta_stock", "tiempo_reposicion"):
+                raise ValueError(f"Falta la columna {entrada} en el catálogo")
+            else:
+                self.columnas[entrada] = np.full(n_skus, np.nan)
+        for derivada in DEPENDENCIAS:
+            self.columnas[derivada] = np.full(n_skus, np.nan)
+
+        if consumos is None:
+            columnas_consumo = columnas_consumo_ordenadas(catalogo)
+            consumos = catalogo[columnas_consumo].to_numpy(dtype=float) if columnas_consumo else None
+        self.ventana = VentanaMovil(n_skus, ventana)
+        if consumos is not None:
+            consumos = np.asarray(consumos, dtype=float)
+            for dia in range(max(0, consumos.shape[1] - ventana), consumos.shape[1]):
+                self.ventana.actualizar(consumos[:, dia])
+
+        # Filas pendientes por columna derivada; al empezar, todas
+        self._pendientes = {derivada: [np.arange(n_skus)] for derivada in DEPENDENCIAS}
+
+    def __len__(self):
+        return len(self.skus)
+
+    def indices(self, skus):
+        """
+        Posiciones de los SKUs indicados; falla si alguno no está en el catálogo
+        """
+        posiciones = self.skus.get_indexer(pd.Index(np.atleast_1d(skus)))
+        if np.any(posiciones < 0):
+            desconocidos = np.atleast_1d(skus)[posiciones < 0]
+            raise KeyError(f"SKUs que no están en el catálogo: {list(desconocidos[:10])}")
+        return posiciones
+
+    def _marcar(self, columna, posiciones):
+        for derivada in AFECTADAS[columna]:
+            self._pendientes[derivada].append(posiciones)
+
+    def registrar_consumo(self, skus, consumos):
+        """
+        Añade un día de consumo a cada SKU indicado (un SKU repetido suma varios días, en orden)
+        """
+        posiciones = self.indices(skus)
+        consumos = np.broadcast_to(np.asarray(consumos, dtype=float), posiciones.shape)
+        # VentanaMovil necesita SKUs distintos en cada actualización: los repetidos van en rondas
+        ronda = pd.Series(posiciones).groupby(posiciones).cumcount().to_numpy()
+        for numero in range(int(ronda.max()) + 1 if ronda.size else 0):
+            en_ronda = ronda == numero
+            self.ventana.actualizar(consumos[en_ronda], posiciones[en_ronda])
+        self._marcar("consumo", np.unique(posiciones))
+
+    def actualizar_entradas(self, skus, **valores):
+        """
+        Cambia entradas por SKU (prob_falta_stock, tiempo_reposicion, inventario_actual, cantidad_pedido_fija)
+        """
+        posiciones = self.indices(skus)
+        for entrada, valor in valores.items():
+            if entrada not in ENTRADAS:
+                raise ValueError(f"Entrada desconocida: {entrada!r} (use una de {ENTRADAS})")
+            self.columnas[entrada][posiciones] = valor
+            self._marcar(entrada, posiciones)
+
+    def aplicar_eventos(self, eventos):
+        """
+        Aplica un DataFrame de eventos (sku más consumo y/o entradas; los vacíos no cambian nada)
+        """
+        if "sku" not in eventos.columns:
+            raise ValueError("Los eventos deben tener la columna sku")
+        conocidas = {"sku", "consumo", *ENTRADAS}
+        desconocidas = set(eventos.columns) - conocidas
+        if desconocidas:
+            raise ValueError(f"Columnas de eventos desconocidas: {sorted(desconocidas)}")
+        # Se comprueban SKUs y valores antes de cambiar nada, para no aplicar un lote a medias
+        self.indices(eventos["sku"].to_numpy())
+        columnas = [c for c in ("consumo", *ENTRADAS) if c in eventos.columns]
+        try:
+            valores = {c: eventos[c].to_numpy(dtype=float) for c in columnas}
+        except (TypeError, ValueError) as error:
+            raise ValueError(f"Valores no numéricos en los eventos: {error}") from None
+        infinitos = [c for c in columnas if np.isinf(valores[c]).any()]
+        if infinitos:
+            raise ValueError(f"Valores infinitos en las columnas de eventos: {infinitos}")
+
+        skus = eventos["sku"].to_numpy()
+        if "consumo" in valores:
+            con_consumo = ~np.isnan(valores["consumo"])
+            if con_consumo.any():
+                self.registrar_consumo(skus[con_consumo], valores["consumo"][con_consumo])
+        for entrada in ENTRADAS:
+            if entrada not in valores:
+                continue
+            con_valor = ~np.isnan(valores[entrada])
+            if con_valor.any():
+                # Si un SKU cambia varias veces en el lote, queda el último valor
+                cambios = pd.DataFrame({"sku": skus[con_valor], entrada: valores[entrada][con_valor]})
+                cambios = cambios.drop_duplicates("sku", keep="last")
+                self.actualizar_entradas(cambios["sku"].to_numpy(), **{entrada: cambios[entrada].to_numpy()})
+
+    @instrumentar("recalcular_incremental")
+    def recalcular(self):
+        """
+        Recalcula las columnas pendientes solo en sus SKUs y devuelve las posiciones recalculadas
+        """
+        recalculadas = []
+        for derivada in DEPENDENCIAS:
+            if not self._pendientes[derivada]:
+                continue
+            posiciones = np.unique(np.concatenate(self._pendientes[derivada]))
+            self._pendientes[derivada] = []
+            self.columnas[derivada][posiciones] = self._calcular(derivada, posiciones)
+            recalculadas.append(posiciones)
+        if not recalculadas:
+            return np.array([], dtype=np.int64)
+        return np.unique(np.concatenate(recalculadas))
+
+    def _calcular(self, derivada, posiciones):
+        """
+        Valor de una columna derivada en las posiciones indicadas, con las mismas fórmulas que la app
+        """
+        c = {nombre: valores[posiciones] for nombre, valores in self.columnas.items()}
+        if derivada == "demanda_promedio_diaria":
+            return self.ventana.media[posiciones]
+        if derivada == "desviacion_demanda":
+            # Solo las filas pedidas: la propiedad desviacion recorre todo el catálogo
+            return desviacion_muestral(self.ventana.n[posiciones], self.ventana.m2[posiciones])
+        if derivada == "z_score":
+            return calcular_z_score_lote(c["prob_falta_stock"])
+        if derivada == "inventario_seguridad":
+            return calcular_inventario_seguridad_lote(c["z_score"], c["desviacion_demanda"], c["tiempo_reposicion"])
+        if derivada == "punto_reorden":
+            return c["demanda_promedio_diaria"] * c["tiempo_reposicion"] + c["inventario_seguridad"]
+        if derivada == "cantidad_pedido":
+            return np.where(np.isnan(c["cantidad_pedido_fija"]), 2 * c["punto_reorden"], c["cantidad_pedido_fija"])
+        if derivada == "cantidad_pedir":
+            # Como en la simulación: al llegar al punto de reorden se pide el múltiplo que lo supera
+            rop, cantidad, posicion = c["punto_reorden"], c["cantidad_pedido"], c["inventario_actual"]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                multiplos = np.floor((rop - posicion) / cantidad) + 1
+                return np.where(posicion <= rop, np.where(cantidad > 0, multiplos * cantidad, 0.0),
+                                np.where(np.isnan(posicion), np.nan, 0.0))
+        raise KeyError(derivada)
+
+    def resultados(self, posiciones=None):
+        """
+        DataFrame de entradas y columnas derivadas (todas las filas o las posiciones indicadas)
+        """
+        seleccion = slice(None) if posiciones is None else np.asarray(posiciones)
+        return pd.DataFrame(
+            {nombre: valores[seleccion] for nombre, valores in self.columnas.items()},
+            index=self.skus[seleccion],
+        )
+
+
+def procesar_cola(motor, cola, al_recalcular=None, max_eventos_lote=10_000, espera=0.5, detener=None):
+    """
+    Consume eventos (diccionarios con sku y entradas) de una cola local y recalcula por lotes
+
+    Espera el primer evento y toma sin esperar los que ya estén en la cola,
+    hasta max_eventos_lote, para recalcular una sola vez por lote. Un None
+    en la cola termina el proceso. al_recalcular recibe el DataFrame de las
+    filas recalculadas.
+    """
+    while detener is None or not detener.is_set():
+        try:
+            evento = cola.get(timeout=espera)
+        except queue.Empty:
+            continue
+        if evento is None:
+            return
+        lote = [evento]
+        terminar = False
+        while len(lote) < max_eventos_lote:
+            try:
+                evento = cola.get_nowait()
+            except queue.Empty:
+                break
+            if evento is None:
+                terminar = True
+                break
+            lote.append(evento)
+
+        motor.aplicar_eventos(pd.DataFrame(lote))
+        recalculadas = motor.recalcular()
+        if al_recalcular is not None and recalculadas.size:
+            al_recalcular(motor.resultados(recalculadas))
+        if terminar:
+            return
+
+
+def _archivos_eventos(directorio):
+    """
+    Archivos de eventos completos del directorio, del más antiguo al más reciente por nombre
+    """
+    # Los archivos que empiezan por punto se consideran a medio escribir
+    return sorted(
+        entrada.path for entrada in os.scandir(directorio)
+        if entrada.is_file() and not entrada.name.startswith(".")
+        and entrada.name.lower().endswith(EXTENSIONES_EVENTOS)
+    )
+
+
+def vigilar_directorio(motor, directorio, al_recalcular=None, intervalo=1.0, detener=None):
+    """
+    Aplica cada archivo de eventos CSV o Parquet que aparece en el directorio y lo mueve a procesados
+
+    Revisa el directorio cada intervalo segundos (sin dependencias externas)
+    hasta que se active detener (un threading.Event). Los archivos de una
+    misma revisión se aplican juntos y se recalcula una sola vez. Para que
+    no se lea un archivo a medio escribir, escríbalo con un nombre que
+    empiece por punto y renómbrelo al terminar. Un archivo con SKUs o
+    columnas desconocidos no se aplica y se mueve a errores.
+    """
+    detener = detener or threading.Event()
+    procesados = os.path.join(directorio, DIRECTORIO_PROCESADOS)
+    errores = os.path.join(directorio, DIRECTORIO_ERRORES)
+    os.makedirs(procesados, exist_ok=True)
+    os.makedirs(errores, exist_ok=True)
+    while not detener.is_set():
+        archivos = _archivos_eventos(directorio)
+        for archivo in archivos:
+            destino = procesados
+            try:
+                motor.aplicar_eventos(leer_catalogo(archivo))
+            except (KeyError, ValueError) as error:
+                print(f"Error en {archivo}: {error}", file=sys.stderr)
+                destino = errores
+            shutil.move(archivo, os.path.join(destino, os.path.basename(archivo)))
+        if archivos:
+            recalculadas = motor.recalcular()
+            if al_recalcular is not None and recalculadas.size:
+                al_recalcular(motor.resultados(recalculadas))
+        detener.wait(intervalo)
+
+
+def _escribir_cambios(ruta):
+    """
+    Función que añade las filas recalculadas a un archivo de líneas JSON (o a la salida estándar)
+    """
+    def escribir(resultados):
+        filas = resultados.reset_index().to_json(orient="records", lines=True)
+        if ruta is None:
+            sys.stdout.write(filas)
+            sys.stdout.flush()
+        else:
+            with open(ruta, "a", encoding="utf-8") as archivo:
+                archivo.write(filas)
+        print(f"{len(resultados)} SKUs recalculados", file=sys.stderr)
+    return escribir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Recálculo incremental del Sistema de Cantidad Fija con archivos de eventos"
+    )
+    parser.add_argument("catalogo", help="Catálogo CSV o Parquet con una fila por SKU")
+    parser.add_argument("--vigilar", required=True, help="Directorio donde llegan los archivos de eventos")
+    parser.add_argument("--salida", default=None,
+                        help="Archivo de líneas JSON al que se añaden las filas recalculadas "
+                             "(por defecto, la salida estándar)")
+    parser.add_argument("--historial", default=None,
+                        help="Historial largo (sku, fecha, cantidad) con el que se llena la ventana")
+    parser.add_argument("--ventana", type=int, default=VENTANA_POR_DEFECTO,
+                        help="Días de consumo de la ventana móvil")
+    parser.add_argument("--intervalo", type=float, default=1.0,
+                        help="Segundos entre revisiones del directorio")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    catalogo = leer_catalogo(args.catalogo)
+    consumos = None
+    if args.historial:
+        from inventario.backtesting import matriz_consumos
+
+        skus, _, matriz = matriz_consumos(args.historial)
+        fila = skus.get_indexer(catalogo["sku"])
+        consumos = np.zeros((len(catalogo), matriz.shape[1]))
+        consumos[fila >= 0] = matriz[fila[fila >= 0]]
+    motor = MotorIncremental(catalogo, consumos, args.ventana)
+    motor.recalcular()
+    print(f"{len(motor)} SKUs calculados en {time.perf_counter() - inicio:.1f} s; "
+          f"vigilando {args.vigilar}", file=sys.stderr)
+
+    try:
+        vigilar_directorio(motor, args.vigilar, _escribir_cambios(args.salida), args.intervalo)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Ingesta por bloques del historial de consumo en formato largo (sku, fecha, cantidad).
+
+Lee archivos CSV o Parquet de cualquier tamaño por bloques, suma el consumo
+de cada SKU y día, y calcula por SKU el número de días, la media y la suma de
+cuadrados de desviaciones. La memoria depende del número de pares SKU-día y
+no del número de filas del archivo.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from inventario.estadisticas import combinar_momentos
+
+COLUMNAS_HISTORIAL = ("sku", "fecha", "cantidad")
+TAMANO_BLOQUE = 1_000_000
+
+
+def _formato(origen, formato):
+    """
+    Deduce el formato ('csv' o 'parquet') a partir del nombre del archivo
+    """
+    if formato is not None:
+        return formato
+    nombre = origen if isinstance(origen, (str, os.PathLike)) else getattr(origen, "name", "")
+    extension = os.path.splitext(str(nombre))[1].lower()
+    if extension in (".parquet", ".pq"):
+        return "parquet"
+    if extension in (".csv", ".txt", ".gz", ""):
+        return "csv"
+    raise ValueError(f"Formato de historial no soportado: '{extension}'")
+
+
+def leer_historial_por_bloques(origen, tamano_bloque=TAMANO_BLOQUE, formato=None,
+                               columnas=COLUMNAS_HISTORIAL):
+    """
+    Lee el historial por bloques de tamano_bloque filas
+
+    origen puede ser una ruta o un archivo abierto (por ejemplo el de
+    st.file_uploader). Cada bloque es un DataFrame con las columnas sku,
+    fecha y cantidad, renombradas desde los nombres indicados en columnas.
+    """
+    columna_sku, columna_fecha, columna_cantidad = columnas
+    nombres = dict(zip(columnas, COLUMNAS_HISTORIAL))
+
+    if _formato(origen, formato) == "parquet":
+        # pyarrow ya viene con streamlit; se importa aquí para no cargarlo en la lectura de CSV
+        import pyarrow.parquet as pq
+
+        archivo = pq.ParquetFile(origen)
+        for lote in archivo.iter_batches(batch_size=tamano_bloque, columns=list(columnas)):
+            yield lote.to_pandas().rename(columns=nombres)
+    else:
+        lector = pd.read_csv(
+            origen,
+            usecols=list(columnas),
+            dtype={columna_sku: str, columna_fecha: str, columna_cantidad: float},
+            chunksize=tamano_bloque,
+        )
+        with lector:
+            for bloque in lector:
+                yield bloque.rename(columns=nombres)
+
+
+def _momentos_diarios(diario):
+    """
+    Calcula número de días, media y suma de cuadrados de desviaciones por SKU del consumo diario
+    """
+    por_sku = diario.groupby(level="sku", sort=False)
+    n = por_sku.count().astype(float)
+    media = por_sku.mean()
+    m2 = por_sku.var(ddof=0).fillna(0.0) * n
+    return pd.DataFrame({"n": n, "media": media, "m2": m2})
+
+
+def _combinar(acumulado, nuevo):
+    """
+    Combina dos conjuntos de momentos por SKU
+    """
+    indice = acumulado.index.union(nuevo.index)
+    a = acumulado.reindex(indice, fill_value=0.0)
+    b = nuevo.reindex(indice, fill_value=0.0)
+    n, media, m2 = combinar_momentos(a["n"], a["media"], a["m2"], b["n"], b["media"], b["m2"])
+    return pd.DataFrame({"n": n, "media": media, "m2": m2}, index=indice)
+
+
+def agregar_historial(origen, tamano_bloque=TAMANO_BLOQUE, formato=None,
+                      columnas=COLUMNAS_HISTORIAL, rellenar_dias_sin_consumo=False):
+    """
+    Calcula demanda promedio diaria y desviación estándar por SKU leyendo el historial por bloques
+
+    Devuelve un DataFrame indexado por SKU con n_dias, demanda_promedio_diaria
+    y desviacion_demanda (ddof=1, 0 con menos de dos días), las mismas
+    definiciones que usa app.py con los consumos de 7 días.
+
+    Varias filas del mismo SKU y día se suman como un solo día, aunque
+    caigan en bloques distintos. Con rellenar_dias_sin_consumo=True los días
+    sin fila entre la primera y la última fecha de cada SKU cuentan como
+    consumo cero, que es como suelen omitirlos las exportaciones del ERP.
+    """
+    partes = []
+    for bloque in leer_historial_por_bloques(origen, tamano_bloque, formato, columnas):
+        if bloque.empty:
+            continue
+        bloque["fecha"] = pd.to_datetime(bloque["fecha"]).dt.normalize()
+        bloque["cantidad"] = bloque["cantidad"].fillna(0.0)
+        partes.append(bloque.groupby(["sku", "fecha"], sort=False)["cantidad"].sum())
+
+    if not partes:
+        return pd.DataFrame(
+            columns=["n_dias", "demanda_promedio_diaria", "desviacion_demanda"],
+            index=pd.Index([], name="sku"),
+        )
+
+    # Un mismo día puede estar repartido entre bloques: se vuelve a sumar tras unirlos
+    diario = pd.concat(partes).groupby(level=["sku", "fecha"], sort=False).sum()
+    acumulado = _momentos_diarios(diario)
+
+    if rellenar_dias_sin_consumo:
+        fechas = pd.Series(diario.index.get_level_values("fecha"), index=diario.index.get_level_values("sku"))
+        por_sku = fechas.groupby(level="sku", sort=False)
+        dias_totales = ((por_sku.max() - por_sku.min()).dt.days + 1).reindex(acumulado.index)
+        dias_sin_fila = np.maximum(dias_totales - acumulado["n"], 0)
+        ceros = pd.DataFrame({"n": dias_sin_fila, "media": 0.0, "m2": 0.0}, index=acumulado.index)
+        acumulado = _combinar(acumulado, ceros)
+
+    n = acumulado["n"]
+    varianza = np.where(n >= 2, acumulado["m2"] / np.maximum(n - 1, 1), 0.0)
+    resultado = pd.DataFrame({
+        "n_dias": n.astype(np.int64),
+        "demanda_promedio_diaria": acumulado["media"],
+        "desviacion_demanda": np.sqrt(varianza),
+    }, index=acumulado.index)
+    resultado.index.name = "sku"
+    return resultado.sort_index()
@@ -0,0 +1,230 @@
+"""
+Instrumentación de las etapas críticas: tiempo de pared, llamadas y memoria.
+
+Cada etapa medida (una función decorada con instrumentar o un bloque
+with medir("etapa")) acumula en un registro del proceso el número de
+llamadas, el tiempo total y máximo y, si está activado, el pico de memoria
+asignada medido con tracemalloc (más lento, desactivado por defecto).
+
+tracemalloc es global del proceso, así que la medición de memoria se decide
+para todo el proceso: con la variable de entorno INVENTARIO_MEDIR_MEMORIA=1
+al arrancar o con configurar(memoria=True) desde un script, nunca desde una
+sesión de la app. El pico solo se registra en las etapas durante las que
+ningún otro hilo medía memoria; con etapas concurrentes no se puede saber
+qué hilo asignó qué y se registra como desconocido.
+
+El registro se exporta como texto de Prometheus (texto_prometheus) o como
+JSON (resumen), y cada medición se emite además como una línea JSON en el
+logger "inventario.instrumentacion" con nivel DEBUG. iniciar_recoleccion y
+terminar_recoleccion permiten ver por separado las etapas de una sola
+ejecución de la app, aunque otras sesiones midan en paralelo.
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger("inventario.instrumentacion")
+
+_bloqueo = threading.Lock()
+_registro = {}
+_local = threading.local()
+_configuracion = {"activa": True, "memoria": False}
+# Marcos de medición de memoria abiertos en todos los hilos
+_marcos_memoria = []
+
+PREFIJO_METRICAS = "inventario_etapa"
+
+
+def configurar(activa=None, memoria=None):
+    """
+    Activa o desactiva la medición y la medición de memoria con tracemalloc
+
+    Afecta a todo el proceso: llámela al arrancar (un script, un benchmark),
+    no por sesión o por solicitud.
+    """
+    if activa is not None:
+        _configuracion["activa"] = bool(activa)
+    if memoria is not None:
+        _configuracion["memoria"] = bool(memoria)
+        if memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not memoria and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def reiniciar():
+    """
+    Borra las mediciones acumuladas
+    """
+    with _bloqueo:
+        _registro.clear()
+
+
+def _pila():
+    if not hasattr(_local, "pila"):
+        _local.pila = []
+    return _local.pila
+
+
+def _registrar(etapa, segundos, memoria_pico):
+    with _bloqueo:
+        estadistica = _registro.get(etapa)
+        if estadistica is None:
+            estadistica = _registro[etapa] = {
+                "llamadas": 0, "segundos_total": 0.0, "segundos_max": 0.0, "memoria_pico_bytes": 0,
+            }
+        estadistica["llamadas"] += 1
+        estadistica["segundos_total"] += segundos
+        estadistica["segundos_max"] = max(estadistica["segundos_max"], segundos)
+        if memoria_pico is not None:
+            estadistica["memoria_pico_bytes"] = max(estadistica["memoria_pico_bytes"], memoria_pico)
+
+    recoleccion = getattr(_local, "recoleccion", None)
+    if recoleccion is not None:
+        recoleccion.append({"etapa": etapa, "segundos": segundos, "memoria_pico_bytes": memoria_pico})
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(json.dumps({"etapa": etapa, "segundos": segundos, "memoria_pico_bytes": memoria_pico}))
+
+
+@contextmanager
+def medir(etapa):
+    """
+    Mide el bloque como una llamada de la etapa
+
+    Con la medición de memoria activa, el pico es el máximo asignado
+    durante el bloque por encima de lo asignado al empezar, incluidas las
+    etapas anidadas; queda sin registrar si otro hilo medía a la vez.
+    """
+    if not _configuracion["activa"]:
+        yield
+        return
+
+    con_memoria = _configuracion["memoria"] and tracemalloc.is_tracing()
+    pila = _pila()
+    marco = None
+    if con_memoria:
+        with _bloqueo:
+            # Otro hilo midiendo: ni sus picos ni el de este bloque serían fiables
+            hilo = threading.get_ident()
+            concurrente = any(abierto["hilo"] != hilo for abierto in _marcos_memoria)
+            for abierto in _marcos_memoria if concurrente else ():
+                abierto["concurrente"] = True
+            actual, pico = tracemalloc.get_traced_memory()
+            if pila:
+                pila[-1]["pico"] = max(pila[-1]["pico"], pico)
+            if not concurrente:
+                tracemalloc.reset_peak()
+            marco = {"hilo": hilo, "inicio": actual, "pico": actual, "concurrente": concurrente}
+            _marcos_memoria.append(marco)
+        pila.append(marco)
+
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        memoria_pico = None
+        if marco is not None:
+            with _bloqueo:
+                marco["pico"] = max(marco["pico"], tracemalloc.get_traced_memory()[1])
+                _marcos_memoria.remove(marco)
+            pila.pop()
+            if pila:
+                pila[-1]["pico"] = max(pila[-1]["pico"], marco["pico"])
+            if not marco["concurrente"]:
+                memoria_pico = marco["pico"] - marco["inicio"]
+        _registrar(etapa, segundos, memoria_pico)
+
+
+def instrumentar(etapa=None):
+    """
+    Decorador que mide cada llamada de la función como la etapa indicada (por defecto, su nombre)
+    """
+    def decorar(funcion):
+        nombre = etapa or funcion.__name__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not _configuracion["activa"]:
+                return funcion(*args, **kwargs)
+            with medir(nombre):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorar
+
+
+def iniciar_recoleccion():
+    """
+    Empieza a guardar aparte las mediciones del hilo actual (una ejecución de la app)
+    """
+    _local.recoleccion = []
+
+
+def terminar_recoleccion():
+    """
+    Devuelve el resumen por etapa de las mediciones del hilo desde iniciar_recoleccion
+    """
+    mediciones = getattr(_local, "recoleccion", None) or []
+    _local.recoleccion = None
+    return _resumir(mediciones)
+
+
+def _resumir(mediciones):
+    por_etapa = {}
+    for medicion in mediciones:
+        estadistica = por_etapa.setdefault(medicion["etapa"], {
+            "llamadas": 0, "segundos_total": 0.0, "segundos_max": 0.0, "memoria_pico_bytes": 0,
+        })
+        estadistica["llamadas"] += 1
+        estadistica["segundos_total"] += medicion["segundos"]
+        estadistica["segundos_max"] = max(estadistica["segundos_max"], medicion["segundos"])
+        if medicion["memoria_pico_bytes"] is not None:
+            estadistica["memoria_pico_bytes"] = max(estadistica["memoria_pico_bytes"],
+                                                    medicion["memoria_pico_bytes"])
+    return _filas(por_etapa)
+
+
+def _filas(por_etapa):
+    return sorted(
+        ({"etapa": etapa, **valores} for etapa, valores in por_etapa.items()),
+        key=lambda fila: fila["segundos_total"], reverse=True,
+    )
+
+
+def resumen():
+    """
+    Mediciones acumuladas por etapa (lista de diccionarios, de mayor a menor tiempo total)
+    """
+    with _bloqueo:
+        return _filas({etapa: dict(valores) for etapa, valores in _registro.items()})
+
+
+def texto_prometheus():
+    """
+    Mediciones acumuladas en el formato de texto de Prometheus
+    """
+    metricas = (
+        ("llamadas_total", "counter", "Llamadas por etapa", "llamadas"),
+        ("segundos_total", "counter", "Tiempo de pared acumulado por etapa en segundos", "segundos_total"),
+        ("segundos_max", "gauge", "Tiempo de pared máximo de una llamada por etapa en segundos", "segundos_max"),
+        ("memoria_pico_bytes", "gauge", "Pico de memoria asignada por etapa (tracemalloc)", "memoria_pico_bytes"),
+    )
+    filas = resumen()
+    lineas = []
+    for sufijo, tipo, ayuda, clave in metricas:
+        nombre = f"{PREFIJO_METRICAS}_{sufijo}"
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        for fila in filas:
+            etiqueta = fila["etapa"].replace("\\", "\\\\").replace('"', '\\"')
+            lineas.append(f'{nombre}{{etapa="{etiqueta}"}} {fila[clave]!r}')
+    return "\n".join(lineas) + "\n"
+
+
+if os.environ.get("INVENTARIO_MEDIR_MEMORIA", "").strip() not in ("", "0"):
+    configurar(memoria=True)
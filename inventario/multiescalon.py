@@ -0,0 +1,297 @@
+"""
+Simulación Monte Carlo de una red de varios niveles (almacén central → tiendas).
+
+La red se describe con un arreglo padre: el nodo que abastece a cada nodo,
+o -1 para los nodos que piden a un proveedor externo. Cada nodo sigue su
+propia política, con las mismas reglas que la app:
+
+    punto_reorden   cuando la posición de inventario cae al punto de reorden
+                    pide cantidad_pedido (o el múltiplo necesario para
+                    superarlo), aunque ya tenga pedidos en camino;
+    periodo_fijo    cada ciclo_pedido días pide hasta nivel_objetivo.
+
+La posición de inventario es existencias + en camino + pedido al padre aún
+sin enviar − lo que debe a sus hijos. El estado son arreglos nodos ×
+trayectorias y el bucle recorre los días; cada día:
+
+    1. llegan los envíos programados para hoy en un búfer circular
+       (día mod R) × nodos × trayectorias, con R = plazo máximo + 2;
+    2. cada nodo atiende su demanda externa normal (lo que falta queda pendiente);
+    3. los nodos revisan su posición del nivel más profundo a la raíz, así
+       el almacén ve el mismo día los pedidos de sus tiendas;
+    4. cada padre envía lo que puede de los pedidos pendientes de sus hijos,
+       repartiendo sus existencias en proporción a lo pedido; lo enviado
+       llega al inicio del día dia + tiempo_reposicion + 1, así que cubre
+       tiempo_reposicion días de demanda como en la fórmula del punto de
+       reorden. El proveedor externo envía siempre el pedido completo.
+
+Las trayectorias se simulan por bloques para acotar la memoria del búfer, y
+cada bloque usa su propio flujo aleatorio derivado de la semilla
+(inventario.aleatorio), así que un bloque se puede repetir por separado.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from inventario.aleatorio import flujo, secuencia_semilla
+
+POLITICAS = ("punto_reorden", "periodo_fijo")
+
+# Elementos (nodos × trayectorias) de cada bloque de simulación
+ELEMENTOS_POR_BLOQUE = 2**18
+
+
+@dataclass
+class ResultadoMultiescalon:
+    """
+    Indicadores por nodo de una simulación de varios niveles
+    """
+    por_nodo: pd.DataFrame
+    n_trayectorias: int
+    dias: int
+    trayectorias: np.ndarray
+
+
+def _por_nodo(valor, n_nodos, dtype=float):
+    """
+    Expande un escalar o arreglo a un valor por nodo (NaN si no se indica)
+    """
+    if valor is None:
+        valor = np.nan
+    arreglo = np.asarray(valor, dtype=dtype)
+    if arreglo.ndim and arreglo.shape != (n_nodos,):
+        raise ValueError(f"Se esperaba un valor por nodo ({n_nodos}), no {arreglo.shape}")
+    return np.broadcast_to(arreglo, (n_nodos,))
+
+
+def niveles_red(padre):
+    """
+    Nivel de cada nodo: 0 para los que piden al proveedor externo, 1 para sus hijos, etc.
+    """
+    padre = np.asarray(padre, dtype=np.int64)
+    n_nodos = padre.shape[0]
+    if np.any((padre < -1) | (padre >= n_nodos)) or np.any(padre == np.arange(n_nodos)):
+        raise ValueError("padre debe ser -1 o el índice de otro nodo")
+
+    nivel = np.full(n_nodos, -1, dtype=np.int64)
+    nivel[padre < 0] = 0
+    for profundidad in range(1, n_nodos + 1):
+        pendientes = nivel < 0
+        if not pendientes.any():
+            break
+        nuevos = pendientes & (nivel[np.maximum(padre, 0)] == profundidad - 1)
+        if not nuevos.any():
+            raise ValueError("La red tiene ciclos o nodos sin conexión con un proveedor externo")
+        nivel[nuevos] = profundidad
+    return nivel
+
+
+def simular_multiescalon(padre, politica, tiempo_reposicion, inventario_inicial,
+                         demanda_promedio_diaria=0.0, desviacion_demanda=0.0,
+                         punto_reorden=None, cantidad_pedido=None,
+                         nivel_objetivo=None, ciclo_pedido=None,
+                         dias=365, n_trayectorias=1_000, semilla=None,
+                         trayectorias_guardadas=0):
+    """
+    Simula una red de varios niveles para n_trayectorias a la vez
+
+    Todos los parámetros son escalares o arreglos con un valor por nodo.
+    punto_reorden y cantidad_pedido son obligatorios en los nodos con
+    política "punto_reorden"; nivel_objetivo y ciclo_pedido, en los de
+    "periodo_fijo". tiempo_reposicion es el plazo desde el padre (o desde el
+    proveedor externo) y debe ser al menos 1 día. La demanda externa
+    negativa que produce la normal se trunca a cero.
+
+    Devuelve por nodo el nivel de llenado de la demanda externa, la
+    frecuencia de días con falta de stock, el inventario promedio, lo pedido
+    al padre pendiente de envío en promedio y los pedidos por trayectoria,
+    además de las existencias diarias de las primeras trayectorias_guardadas
+    trayectorias (nodos × trayectorias × días).
+    """
+    if n_trayectorias < 1 or dias < 1:
+        raise ValueError("n_trayectorias y dias deben ser positivos")
+
+    padre = np.atleast_1d(np.asarray(padre, dtype=np.int64))
+    n_nodos = padre.shape[0]
+    nivel = niveles_red(padre)
+
+    politica = np.broadcast_to(np.asarray(politica, dtype=object), (n_nodos,))
+    if not np.isin(politica, POLITICAS).all():
+        raise ValueError(f"politica debe ser una de {POLITICAS}")
+    es_reorden = politica == "punto_reorden"
+
+    plazo = _por_nodo(tiempo_reposicion, n_nodos, dtype=np.int64)
+    inicial = _por_nodo(inventario_inicial, n_nodos)
+    media = _por_nodo(demanda_promedio_diaria, n_nodos)
+    desviacion = _por_nodo(desviacion_demanda, n_nodos)
+    reorden = _por_nodo(punto_reorden, n_nodos)
+    cantidad = _por_nodo(cantidad_pedido, n_nodos)
+    objetivo = _por_nodo(nivel_objetivo, n_nodos)
+    ciclo = _por_nodo(ciclo_pedido, n_nodos)
+
+    if np.any(plazo < 1):
+        raise ValueError("tiempo_reposicion debe ser al menos 1 día")
+    if np.any(es_reorden & ~(np.isfinite(reorden) & (cantidad > 0))):
+        raise ValueError("Los nodos de punto de reorden necesitan punto_reorden y cantidad_pedido > 0")
+    if np.any(~es_reorden & ~(np.isfinite(objetivo) & (ciclo >= 1))):
+        raise ValueError("Los nodos de período fijo necesitan nivel_objetivo y ciclo_pedido >= 1")
+
+    # Orden interno: por nivel y, dentro de cada nivel, por padre, para que cada
+    # nivel sea un tramo contiguo y los hijos de un mismo padre queden juntos
+    orden = np.lexsort((padre, nivel))
+    posicion_interna = np.empty(n_nodos, dtype=np.int64)
+    posicion_interna[orden] = np.arange(n_nodos)
+    padre_interno = np.where(padre[orden] >= 0, posicion_interna[np.maximum(padre[orden], 0)], -1)
+    nivel_interno = nivel[orden]
+    es_reorden, plazo, inicial = es_reorden[orden], plazo[orden], inicial[orden]
+    media, desviacion = media[orden], desviacion[orden]
+    reorden, cantidad, objetivo = reorden[orden], cantidad[orden], objetivo[orden]
+    ciclo = np.where(es_reorden, 1, np.nan_to_num(ciclo[orden], nan=1)).astype(np.int64)
+    # Los nodos de período fijo nunca alcanzan el punto de reorden
+    reorden = np.where(es_reorden, reorden, -np.inf)
+    cantidad = np.where(es_reorden, cantidad, 1.0)
+
+    limites = np.searchsorted(nivel_interno, np.arange(nivel_interno[-1] + 2))
+    niveles = [slice(limites[k], limites[k + 1]) for k in range(len(limites) - 1)]
+    # Para cada nivel con padre: inicio de cada grupo de hermanos, su padre y el grupo de cada hijo
+    grupos = [None]
+    for tramo in niveles[1:]:
+        padres = padre_interno[tramo]
+        nuevo_grupo = np.r_[True, padres[1:] != padres[:-1]]
+        inicios = np.flatnonzero(nuevo_grupo)
+        grupos.append((inicios, padres[inicios], np.cumsum(nuevo_grupo) - 1))
+
+    con_demanda = np.flatnonzero((media > 0) | (desviacion > 0))
+    media_demanda = media[con_demanda, None]
+    desviacion_demanda_nodo = desviacion[con_demanda, None]
+    n_con_demanda = con_demanda.size
+    if n_con_demanda and con_demanda[-1] - con_demanda[0] + 1 == n_con_demanda:
+        # Lo habitual (solo las tiendas venden) es un tramo contiguo: vistas en lugar de copias
+        con_demanda = slice(con_demanda[0], con_demanda[-1] + 1)
+    ranuras = int(plazo.max()) + 2
+
+    trayectorias_guardadas = min(trayectorias_guardadas, n_trayectorias)
+    trayectorias = np.empty((n_nodos, trayectorias_guardadas, dias))
+    demanda_total = np.zeros(n_nodos)
+    demanda_atendida = np.zeros(n_nodos)
+    dias_sin_stock = np.zeros(n_nodos, dtype=np.int64)
+    inventario_acumulado = np.zeros(n_nodos)
+    pendiente_acumulado = np.zeros(n_nodos)
+    pedidos = np.zeros(n_nodos, dtype=np.int64)
+
+    secuencia = secuencia_semilla(semilla)
+    tamano_bloque = max(1, ELEMENTOS_POR_BLOQUE // n_nodos)
+
+    for inicio in range(0, n_trayectorias, tamano_bloque):
+        n_bloque = min(tamano_bloque, n_trayectorias - inicio)
+        rng = flujo(secuencia, inicio // tamano_bloque)
+        inventario = np.repeat(inicial[:, None], n_bloque, axis=1)
+        # Posición de inventario, actualizada solo por la demanda y los pedidos
+        # (las llegadas y los envíos la dejan igual)
+        posicion = inventario.copy()
+        en_camino = np.zeros((n_nodos, n_bloque))
+        pendiente = np.zeros((n_nodos, n_bloque))  # pedido al padre aún sin enviar
+        debe = np.zeros((n_nodos, n_bloque))       # pedidos de los hijos aún sin enviar
+        envios = np.zeros((ranuras, n_nodos, n_bloque))
+        guardar = max(0, min(trayectorias_guardadas - inicio, n_bloque))
+
+        for dia in range(dias):
+            # 1. Llegadas del día
+            llegadas = envios[dia % ranuras]
+            inventario += llegadas
+            en_camino -= llegadas
+            llegadas.fill(0)
+
+            # 2. Demanda externa
+            if n_con_demanda:
+                consumo = rng.standard_normal((n_con_demanda, n_bloque))
+                consumo *= desviacion_demanda_nodo
+                consumo += media_demanda
+                np.maximum(consumo, 0, out=consumo)
+                disponible = inventario[con_demanda]
+                atendido = np.clip(disponible, 0, consumo)
+                demanda_total[con_demanda] += consumo.sum(axis=1)
+                demanda_atendida[con_demanda] += atendido.sum(axis=1)
+                dias_sin_stock[con_demanda] += np.count_nonzero(atendido < consumo, axis=1)
+                inventario[con_demanda] = disponible - consumo
+                posicion[con_demanda] -= consumo
+
+            # 3. Revisión de la posición de inventario, de las hojas a la raíz
+            for k in range(len(niveles) - 1, -1, -1):
+                tramo = niveles[k]
+                faltante = reorden[tramo, None] - posicion[tramo]
+                pedido = (faltante >= 0) * cantidad[tramo, None]
+                # Casi siempre basta un pedido; solo los saltos grandes necesitan varios
+                varios = faltante >= cantidad[tramo, None]
+                if varios.any():
+                    cantidad_varios = np.broadcast_to(cantidad[tramo, None], faltante.shape)[varios]
+                    pedido[varios] = (np.floor(faltante[varios] / cantidad_varios) + 1) * cantidad_varios
+                revisa = ~es_reorden[tramo] & (dia % ciclo[tramo] == 0)
+                if revisa.any():
+                    pedido[revisa] = np.maximum(objetivo[tramo, None][revisa] - posicion[tramo][revisa], 0)
+                pedidos[tramo] += np.count_nonzero(pedido, axis=1)
+                posicion[tramo] += pedido
+
+                if k == 0:
+                    # El proveedor externo envía el pedido completo
+                    nodos = np.arange(tramo.start, tramo.stop)
+                    envios[(dia + plazo[tramo] + 1) % ranuras, nodos] += pedido
+                    en_camino[tramo] += pedido
+                else:
+                    pendiente[tramo] += pedido
+                    inicios, padres, _ = grupos[k]
+                    pedido_hijos = np.add.reduceat(pedido, inicios, axis=0)
+                    debe[padres] += pedido_hijos
+                    posicion[padres] -= pedido_hijos
+
+            # 4. Envíos de cada padre a sus hijos, en proporción a lo pedido
+            for k in range(1, len(niveles)):
+                tramo = niveles[k]
+                _, padres, grupo = grupos[k]
+                pedido_total = debe[padres]
+                if not pedido_total.any():
+                    continue
+                disponible = np.maximum(inventario[padres], 0)
+                fraccion = np.divide(disponible, pedido_total, out=np.zeros_like(disponible),
+                                     where=pedido_total > 0)
+                np.minimum(fraccion, 1, out=fraccion)
+                enviado = pedido_total * fraccion
+                inventario[padres] -= enviado
+                debe[padres] = pedido_total - enviado
+
+                envio = pendiente[tramo] * fraccion[grupo]
+                pendiente[tramo] -= envio
+                en_camino[tramo] += envio
+                nodos = np.arange(tramo.start, tramo.stop)
+                envios[(dia + plazo[tramo] + 1) % ranuras, nodos] += envio
+
+            existencias = np.maximum(inventario, 0)
+            inventario_acumulado += existencias.sum(axis=1)
+            pendiente_acumulado += pendiente.sum(axis=1)
+            if guardar:
+                trayectorias[:, inicio:inicio + guardar, dia] = existencias[:, :guardar]
+
+    dias_totales = n_trayectorias * dias
+    con_demanda_externa = demanda_total > 0
+    por_nodo = pd.DataFrame({
+        "padre": padre_interno,
+        "nivel": nivel_interno,
+        "politica": np.where(es_reorden, "punto_reorden", "periodo_fijo"),
+        "nivel_llenado": np.divide(demanda_atendida, demanda_total, out=np.full(n_nodos, np.nan),
+                                   where=con_demanda_externa),
+        "frecuencia_dias_sin_stock": np.where(con_demanda_externa, dias_sin_stock / dias_totales, np.nan),
+        "inventario_promedio": inventario_acumulado / dias_totales,
+        "pendiente_promedio": pendiente_acumulado / dias_totales,
+        "pedidos_por_trayectoria": pedidos / n_trayectorias,
+    })
+    # De vuelta al orden de nodos de la entrada
+    por_nodo = por_nodo.iloc[posicion_interna].reset_index(drop=True)
+    por_nodo["padre"] = padre
+    por_nodo.index.name = "nodo"
+    return ResultadoMultiescalon(
+        por_nodo=por_nodo,
+        n_trayectorias=n_trayectorias,
+        dias=dias,
+        trayectorias=trayectorias[posicion_interna],
+    )
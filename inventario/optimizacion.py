@@ -0,0 +1,145 @@
+"""
+Optimización del nivel de servicio del Sistema de Cantidad Fija.
+
+Evalúa para cada SKU toda la rejilla de probabilidades de falta de stock en
+una sola pasada vectorizada (SKUs × rejilla) y elige la que minimiza el costo
+diario de mantener inventario más el de las unidades faltantes.
+"""
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from inventario.calculos import calcular_z_score_lote
+from inventario.simulacion import simular_cantidad_fija
+
+# Rejilla por defecto: los mismos valores que admite la app (1 % a 50 %)
+PROBABILIDADES_FALTA = np.arange(1, 51)
+
+
+def perdida_normal(z_score):
+    """
+    Función de pérdida de la normal estándar: unidades faltantes esperadas por unidad de σ
+    """
+    z_score = np.asarray(z_score, dtype=float)
+    return stats.norm.pdf(z_score) - z_score * stats.norm.sf(z_score)
+
+
+def _columnas(*valores):
+    """
+    Convierte los parámetros por SKU en columnas (SKUs × 1) para difundir contra la rejilla
+    """
+    arreglos = np.broadcast_arrays(*[np.atleast_1d(np.asarray(v, dtype=float)) for v in valores])
+    return [a[:, None] for a in arreglos]
+
+
+def costos_nivel_servicio(demanda_promedio_diaria, desviacion_demanda, tiempo_reposicion,
+                          cantidad_pedido, costo_mantener, costo_faltante,
+                          probabilidades=PROBABILIDADES_FALTA):
+    """
+    Costo diario esperado de cada SKU para cada probabilidad de falta de la rejilla (SKUs × rejilla)
+
+    Usa la fórmula de la app, inventario de seguridad = z × σ × √L, y el
+    faltante esperado por ciclo σ√L · G(z), con G la pérdida normal. El costo
+    es costo_mantener × (cantidad_pedido / 2 + inventario de seguridad) más
+    costo_faltante × faltante por ciclo × ciclos por día (demanda / cantidad).
+    El z-score se calcula una sola vez por punto de la rejilla.
+    """
+    demanda, desviacion, tiempo, cantidad, mantener, faltante = _columnas(
+        demanda_promedio_diaria, desviacion_demanda, tiempo_reposicion,
+        cantidad_pedido, costo_mantener, costo_faltante,
+    )
+    z_score = calcular_z_score_lote(probabilidades)[None, :]
+    desviacion_plazo = desviacion * np.sqrt(tiempo)
+
+    inventario_seguridad = z_score * desviacion_plazo
+    faltante_por_ciclo = desviacion_plazo * perdida_normal(z_score)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ciclos_por_dia = np.where(cantidad > 0, demanda / cantidad, 0.0)
+
+    return (mantener * (cantidad / 2 + inventario_seguridad)
+            + faltante * faltante_por_ciclo * ciclos_por_dia)
+
+
+def costos_nivel_servicio_monte_carlo(demanda_promedio_diaria, desviacion_demanda, tiempo_reposicion,
+                                      cantidad_pedido, costo_mantener, costo_faltante,
+                                      probabilidades=PROBABILIDADES_FALTA, n_trayectorias=500,
+                                      dias=90, semilla=None):
+    """
+    Costo diario de cada SKU y punto de la rejilla estimado con la simulación de cantidad fija
+
+    Todas las combinaciones SKU × rejilla × trayectoria se simulan en una
+    sola llamada a simular_cantidad_fija. El costo es costo_mantener ×
+    inventario promedio más costo_faltante × unidades faltantes por día.
+    """
+    demanda, desviacion, tiempo, cantidad, mantener, faltante = _columnas(
+        demanda_promedio_diaria, desviacion_demanda, tiempo_reposicion,
+        cantidad_pedido, costo_mantener, costo_faltante,
+    )
+    n_skus = demanda.shape[0]
+    n_rejilla = len(probabilidades)
+
+    z_score = calcular_z_score_lote(probabilidades)[None, :]
+    inventario_seguridad = z_score * desviacion * np.sqrt(tiempo)
+    punto_reorden = demanda * tiempo + inventario_seguridad
+
+    def por_trayectoria(valor):
+        forma = (n_skus, n_rejilla, n_trayectorias)
+        return np.broadcast_to(np.asarray(valor)[:, :, None], forma).ravel()
+
+    resultado = simular_cantidad_fija(
+        punto_reorden=por_trayectoria(punto_reorden),
+        cantidad_pedido=por_trayectoria(cantidad),
+        inventario_inicial=por_trayectoria(punto_reorden + cantidad),
+        demanda_promedio_diaria=por_trayectoria(demanda),
+        desviacion_demanda=por_trayectoria(desviacion),
+        tiempo_reposicion=por_trayectoria(tiempo).astype(np.int64),
+        dias=dias,
+        n_trayectorias=n_skus * n_rejilla * n_trayectorias,
+        semilla=semilla,
+        por_trayectoria=True,
+    )
+    detalle = resultado.por_trayectoria
+    forma = (n_skus, n_rejilla, n_trayectorias)
+    inventario_promedio = detalle["inventario_promedio"].reshape(forma).mean(axis=2)
+    faltante_diario = ((detalle["demanda"] - detalle["demanda_atendida"]).reshape(forma).mean(axis=2)
+                       / dias)
+    return mantener * inventario_promedio + faltante * faltante_diario
+
+
+def optimizar_nivel_servicio(demanda_promedio_diaria, desviacion_demanda, tiempo_reposicion,
+                             cantidad_pedido, costo_mantener, costo_faltante,
+                             probabilidades=PROBABILIDADES_FALTA, monte_carlo=False,
+                             n_trayectorias=500, dias=90, semilla=None):
+    """
+    Devuelve por SKU la probabilidad de falta de stock de la rejilla con menor costo diario
+
+    Con monte_carlo=True el costo se estima con la simulación en lugar de la
+    fórmula analítica. El DataFrame incluye el z-score, inventario de
+    seguridad, punto de reorden y costo diario del óptimo.
+    """
+    probabilidades = np.asarray(probabilidades, dtype=float)
+    argumentos = (demanda_promedio_diaria, desviacion_demanda, tiempo_reposicion,
+                  cantidad_pedido, costo_mantener, costo_faltante, probabilidades)
+    if monte_carlo:
+        costos = costos_nivel_servicio_monte_carlo(
+            *argumentos, n_trayectorias=n_trayectorias, dias=dias, semilla=semilla
+        )
+    else:
+        costos = costos_nivel_servicio(*argumentos)
+
+    demanda, desviacion, tiempo = (c[:, 0] for c in _columnas(
+        demanda_promedio_diaria, desviacion_demanda, tiempo_reposicion
+    ))
+    mejor = np.argmin(costos, axis=1)
+    prob_optima = probabilidades[mejor]
+    z_score = calcular_z_score_lote(probabilidades)[mejor]
+    inventario_seguridad = z_score * desviacion * np.sqrt(tiempo)
+
+    return pd.DataFrame({
+        "prob_falta_stock_optima": prob_optima,
+        "nivel_servicio_optimo": 100 - prob_optima,
+        "z_score": z_score,
+        "inventario_seguridad": inventario_seguridad,
+        "punto_reorden": demanda * tiempo + inventario_seguridad,
+        "costo_diario": costos[np.arange(costos.shape[0]), mejor],
+    })
@@ -0,0 +1,290 @@
+"""
+Almacén compacto de parámetros por SKU para catálogos de millones de filas.
+
+Guarda cada parámetro en una columna NumPy con tipo fijo (estructura de
+arreglos) dentro de un único bloque de memoria: probabilidad de falta de
+stock e inventario actual en float32, tiempo de reposición y ciclo de pedido
+en int16 y los últimos `ancho` consumos diarios en un búfer circular de
+ancho fijo. Un catálogo de 1M de SKUs con 7 días de consumo ocupa unos
+44 MB, frente a cientos de bytes por SKU con un diccionario u objeto por
+fila.
+
+argumentos_periodo_fijo entrega vistas de las columnas, pero las funciones
+de calculos trabajan en float64 y las convierten: cada llamada crea copias
+float64 de las filas que recibe. Por eso conviene calcular por bloques de
+filas (como hace inventario.ejecutor), para que esas copias ocupen lo que
+ocupa un bloque y no todo el catálogo.
+
+El bloque puede copiarse a memoria compartida: los procesos de un grupo se
+adjuntan a él por su nombre y leen sus filas directamente, sin recibir una
+copia serializada del catálogo.
+"""
+import numpy as np
+
+from inventario.calculos import estadisticas_demanda_lote
+from inventario.estadisticas import desviacion_muestral, posiciones_skus
+
+# Días de consumo del búfer circular por defecto (los 7 días que pide la app)
+ANCHO_POR_DEFECTO = 7
+DTYPE_FLOTANTE = np.float32
+DTYPE_DIAS = np.int16
+
+# Cada columna empieza en un múltiplo de 64 bytes (una línea de caché)
+ALINEACION = 64
+
+
+def _disposicion(n_skus, ancho, plazo_variable, dtype):
+    """
+    Nombre, tipo, forma y desplazamiento en bytes de cada columna, y tamaño total del bloque
+    """
+    columnas = [
+        ("prob_falta_stock", dtype, (n_skus,)),
+        ("tiempo_reposicion", DTYPE_DIAS, (n_skus,)),
+        ("ciclo_pedido", DTYPE_DIAS, (n_skus,)),
+        ("inventario_actual", dtype, (n_skus,)),
+    ]
+    if plazo_variable:
+        columnas.append(("desviacion_tiempo_reposicion", dtype, (n_skus,)))
+    if ancho:
+        columnas += [
+            ("consumos", dtype, (n_skus, ancho)),
+            ("posicion", DTYPE_DIAS, (n_skus,)),
+            ("n_consumos", DTYPE_DIAS, (n_skus,)),
+        ]
+    else:
+        # Sin búfer de consumo, la demanda se guarda ya calculada
+        columnas += [
+            ("demanda_promedio_diaria", dtype, (n_skus,)),
+            ("desviacion_demanda", dtype, (n_skus,)),
+        ]
+
+    disposicion = []
+    desplazamiento = 0
+    for nombre, tipo, forma in columnas:
+        tipo = np.dtype(tipo)
+        disposicion.append((nombre, tipo, forma, desplazamiento))
+        tamano = tipo.itemsize * int(np.prod(forma))
+        desplazamiento += -(-tamano // ALINEACION) * ALINEACION
+    return disposicion, desplazamiento
+
+
+def _dias(valores, nombre):
+    """
+    Convierte una columna de días a DTYPE_DIAS comprobando que sean enteros dentro del rango
+    """
+    valores = np.asarray(valores, dtype=float)
+    limites = np.iinfo(DTYPE_DIAS)
+    if np.any(valores != np.round(valores)) or np.any((valores < limites.min) | (valores > limites.max)):
+        raise ValueError(f"{nombre} debe contener días enteros entre {limites.min} y {limites.max}")
+    return valores.astype(DTYPE_DIAS)
+
+
+class ParametrosSKU:
+    """
+    Parámetros de n_skus SKUs en columnas con tipo fijo sobre un único bloque de memoria
+
+    Con ancho > 0 la demanda se calcula desde el búfer circular de consumos;
+    con ancho = 0 se guardan demanda_promedio_diaria y desviacion_demanda.
+    Las columnas se leen y escriben con parametros["nombre"].
+    """
+
+    def __init__(self, n_skus, ancho=ANCHO_POR_DEFECTO, plazo_variable=False, dtype=DTYPE_FLOTANTE,
+                 buffer=None):
+        if not 0 <= ancho <= np.iinfo(DTYPE_DIAS).max:
+            raise ValueError(f"El ancho del búfer de consumo debe estar entre 0 y {np.iinfo(DTYPE_DIAS).max}")
+        self.n_skus = int(n_skus)
+        self.ancho = int(ancho)
+        self.plazo_variable = bool(plazo_variable)
+        self.dtype = np.dtype(dtype)
+        disposicion, self.nbytes = _disposicion(self.n_skus, self.ancho, self.plazo_variable, self.dtype)
+        if buffer is None:
+            buffer = np.zeros(self.nbytes, dtype=np.uint8)
+        self._buffer = buffer
+        self._memoria = None
+        self._propietario = False
+        self.columnas = {
+            nombre: np.ndarray(forma, dtype=tipo, buffer=buffer, offset=desplazamiento)
+            for nombre, tipo, forma, desplazamiento in disposicion
+        }
+
+    def __getitem__(self, nombre):
+        return self.columnas[nombre]
+
+    def __len__(self):
+        return self.n_skus
+
+    @classmethod
+    def desde_catalogo(cls, catalogo, ancho=None, dtype=DTYPE_FLOTANTE):
+        """
+        Crea el almacén desde un catálogo con las columnas de inventario.ejecutor
+
+        Con columnas consumo_1 ... consumo_n el búfer se llena con los últimos
+        ancho días (por defecto, todos); si no, se usan las columnas
+        demanda_promedio_diaria y desviacion_demanda.
+        """
+        # Importación diferida: ejecutor importa este módulo al usar memoria compartida
+        from inventario.ejecutor import columnas_consumo_ordenadas
+
+        columnas_consumo = columnas_consumo_ordenadas(catalogo)
+        if ancho is None:
+            ancho = len(columnas_consumo)
+        if ancho and not columnas_consumo:
+            raise ValueError("El catálogo no tiene columnas consumo_1 ... consumo_n para el búfer de consumo")
+
+        parametros = cls(len(catalogo), ancho=ancho, dtype=dtype,
+                         plazo_variable="desviacion_tiempo_reposicion" in catalogo.columns)
+        parametros["prob_falta_stock"][:] = catalogo["prob_falta_stock"].to_numpy()
+        parametros["tiempo_reposicion"][:] = _dias(catalogo["tiempo_reposicion"], "tiempo_reposicion")
+        parametros["ciclo_pedido"][:] = _dias(catalogo["ciclo_pedido"], "ciclo_pedido")
+        parametros["inventario_actual"][:] = catalogo["inventario_actual"].to_numpy()
+        if parametros.plazo_variable:
+            parametros["desviacion_tiempo_reposicion"][:] = catalogo["desviacion_tiempo_reposicion"].to_numpy()
+
+        if ancho:
+            dias = columnas_consumo[-ancho:]
+            parametros["consumos"][:, :len(dias)] = catalogo[dias].to_numpy(dtype=float)
+            parametros["n_consumos"][:] = len(dias)
+            parametros["posicion"][:] = len(dias) % ancho
+        else:
+            parametros["demanda_promedio_diaria"][:] = catalogo["demanda_promedio_diaria"].to_numpy()
+            parametros["desviacion_demanda"][:] = catalogo["desviacion_demanda"].to_numpy()
+        return parametros
+
+    def registrar_consumo(self, consumos, indices=None):
+        """
+        Añade el consumo de un día al búfer de todos los SKUs o de los indicados en indices (sin repetir)
+        """
+        if not self.ancho:
+            raise ValueError("Este almacén no tiene búfer de consumo (ancho = 0)")
+        seleccion = posiciones_skus(indices, self.n_skus)
+        posicion = self["posicion"][seleccion]
+        self["consumos"][seleccion, posicion] = consumos
+        self["posicion"][seleccion] = (posicion + 1) % self.ancho
+        self["n_consumos"][seleccion] = np.minimum(self["n_consumos"][seleccion] + 1, self.ancho)
+
+    def demanda(self, filas=slice(None)):
+        """
+        Demanda promedio diaria y desviación estándar (ddof=1) de las filas indicadas
+
+        Las filas con el búfer lleno usan estadisticas_demanda_lote; las que
+        aún no lo llenan, solo los días registrados (el búfer se llena desde
+        la posición 0, así que son las primeras n_consumos posiciones).
+        """
+        if not self.ancho:
+            return (self["demanda_promedio_diaria"][filas].astype(float),
+                    self["desviacion_demanda"][filas].astype(float))
+
+        consumos = self["consumos"][filas]
+        n = self["n_consumos"][filas].astype(np.int64)
+        demanda = np.zeros(n.shape[0])
+        desviacion = np.zeros(n.shape[0])
+
+        llenas = n == self.ancho
+        if llenas.any():
+            demanda[llenas], desviacion[llenas] = estadisticas_demanda_lote(consumos[llenas])
+        parciales = ~llenas & (n > 0)
+        if parciales.any():
+            valores = consumos[parciales].astype(float)
+            validos = np.arange(self.ancho) < n[parciales, None]
+            media = (valores * validos).sum(axis=1) / n[parciales]
+            m2 = (((valores - media[:, None]) * validos) ** 2).sum(axis=1)
+            demanda[parciales] = media
+            desviacion[parciales] = desviacion_muestral(n[parciales], m2)
+        return demanda, desviacion
+
+    def argumentos_periodo_fijo(self, filas=slice(None)):
+        """
+        Argumentos de calcular_periodo_fijo_lote para las filas indicadas
+
+        Los parámetros son vistas del almacén; la demanda y la desviación se
+        calculan en float64 para esas filas. calcular_periodo_fijo_lote
+        convierte además cada vista a float64.
+        """
+        demanda, desviacion = self.demanda(filas)
+        argumentos = {
+            "prob_falta_stock": self["prob_falta_stock"][filas],
+            "tiempo_reposicion": self["tiempo_reposicion"][filas],
+            "ciclo_pedido": self["ciclo_pedido"][filas],
+            "inventario_actual": self["inventario_actual"][filas],
+            "demanda_promedio_diaria": demanda,
+            "desviacion_demanda": desviacion,
+        }
+        if self.plazo_variable:
+            argumentos["desviacion_tiempo_reposicion"] = self["desviacion_tiempo_reposicion"][filas]
+        return argumentos
+
+    # ------------------------------------------------------------------
+    # Memoria compartida
+    # ------------------------------------------------------------------
+
+    @property
+    def descriptor(self):
+        """
+        Datos (serializables) para adjuntarse desde otro proceso al almacén en memoria compartida
+        """
+        if self._memoria is None:
+            raise ValueError("El almacén no está en memoria compartida; use exportar_memoria_compartida")
+        return {"nombre": self._memoria.name, "n_skus": self.n_skus, "ancho": self.ancho,
+                "plazo_variable": self.plazo_variable, "dtype": self.dtype.str}
+
+    def exportar_memoria_compartida(self):
+        """
+        Copia el almacén a un bloque nuevo de memoria compartida y devuelve el almacén que vive en él
+
+        Quien lo exporta debe llamar a cerrar(liberar=True) (o usarlo con
+        with) cuando los procesos hayan terminado, para liberar el bloque.
+        """
+        # Importación diferida: solo la necesitan las ejecuciones con varios procesos
+        from multiprocessing import shared_memory
+
+        memoria = shared_memory.SharedMemory(create=True, size=max(self.nbytes, 1))
+        try:
+            compartido = type(self)(self.n_skus, self.ancho, self.plazo_variable, self.dtype,
+                                    buffer=memoria.buf)
+            for nombre, columna in self.columnas.items():
+                compartido[nombre][...] = columna
+        except BaseException:
+            memoria.close()
+            memoria.unlink()
+            raise
+        compartido._memoria = memoria
+        compartido._propietario = True
+        return compartido
+
+    @classmethod
+    def adjuntar(cls, descriptor):
+        """
+        Almacén cuyas columnas son vistas del bloque de memoria compartida del descriptor
+        """
+        from multiprocessing import shared_memory
+
+        memoria = shared_memory.SharedMemory(name=descriptor["nombre"])
+        parametros = cls(descriptor["n_skus"], descriptor["ancho"], descriptor["plazo_variable"],
+                         descriptor["dtype"], buffer=memoria.buf)
+        parametros._memoria = memoria
+        return parametros
+
+    def cerrar(self, liberar=None):
+        """
+        Suelta las vistas y cierra el bloque de memoria compartida; con liberar, además lo elimina
+
+        Por defecto lo elimina solo el proceso que lo exportó. Las vistas
+        obtenidas antes con parametros["nombre"] dejan de ser válidas.
+        """
+        if self._memoria is None:
+            return
+        memoria = self._memoria
+        if liberar is None:
+            liberar = self._propietario
+        self.columnas = {}
+        self._buffer = None
+        self._memoria = None
+        memoria.close()
+        if liberar:
+            memoria.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
@@ -0,0 +1,260 @@
+"""
+Inventario de seguridad con plazo de entrega variable.
+
+La demanda durante el plazo es una suma aleatoria: L días de demanda con L
+también aleatorio. Si del plazo solo se conocen promedio y desviación se usa
+la fórmula z × √(L × σ² + d² × σL²). Con muestras históricas de consumo
+diario y de plazos se obtiene además la distribución completa de la demanda
+durante el plazo: su transformada es G_L(φ_D), la función generatriz de
+probabilidades del plazo evaluada en la transformada de la demanda diaria,
+que se calcula con la FFT para muchos SKUs a la vez y por bloques.
+"""
+import numpy as np
+import pandas as pd
+from scipy import fft, special
+
+from inventario.calculos import (
+    _columna,
+    _indice,
+    calcular_inventario_seguridad_plazo_variable_lote,
+    calcular_z_score_lote,
+)
+
+# Con metodo="auto" se usa la convolución cuando la asimetría de la demanda
+# durante el plazo supera este valor (la fórmula supone una distribución normal)
+UMBRAL_ASIMETRIA = 0.5
+
+# Puntos máximos del soporte de la demanda durante el plazo de un SKU; por
+# encima la demanda se agrupa en pasos de varias unidades
+MAX_PUNTOS_SOPORTE = 2**16
+
+# Elementos (SKUs × puntos de la FFT) que se procesan a la vez
+ELEMENTOS_POR_BLOQUE = 2**22
+
+METODOS = ("auto", "analitico", "convolucion")
+
+# Muestras con que se discretiza un plazo normal del que solo se conocen promedio y desviación
+MUESTRAS_PLAZO_NORMAL = 101
+
+
+def matriz_muestras(muestras):
+    """
+    Convierte listas de muestras de distinta longitud en una matriz (SKUs × muestras) rellena con NaN
+    """
+    if isinstance(muestras, np.ndarray):
+        return np.atleast_2d(muestras.astype(float))
+    filas = [np.asarray(fila, dtype=float).ravel() for fila in muestras]
+    matriz = np.full((len(filas), max((len(f) for f in filas), default=0)), np.nan)
+    for i, fila in enumerate(filas):
+        matriz[i, :len(fila)] = fila
+    return matriz
+
+
+def muestras_plazo_normal(tiempo_reposicion, desviacion_tiempo_reposicion, n_muestras=MUESTRAS_PLAZO_NORMAL):
+    """
+    Muestras equiespaciadas en probabilidad de un plazo normal (SKUs × n_muestras), truncadas en cero
+
+    Permiten usar la convolución cuando del plazo solo se conocen promedio y desviación.
+    """
+    tiempo = np.atleast_1d(_columna(tiempo_reposicion))
+    desviacion = _columna(desviacion_tiempo_reposicion, tiempo.shape[0])
+    z = special.ndtri((np.arange(n_muestras) + 0.5) / n_muestras)
+    return np.clip(tiempo[:, None] + desviacion[:, None] * z, 0, None)
+
+
+def momentos_muestras(muestras):
+    """
+    Número de muestras, promedio y desviación estándar (ddof=1) por fila, ignorando NaN
+    """
+    muestras = matriz_muestras(muestras)
+    validas = ~np.isnan(muestras)
+    n = validas.sum(axis=1)
+    suma = np.where(validas, muestras, 0.0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = suma / n
+        cuadrados = np.where(validas, (muestras - media[:, None]) ** 2, 0.0).sum(axis=1)
+        desviacion = np.where(n >= 2, np.sqrt(cuadrados / (n - 1)), 0.0)
+    return n, media, desviacion
+
+
+def _cumulantes(muestras):
+    """
+    Promedio, varianza y tercer momento central (poblacionales) por fila, ignorando NaN
+    """
+    muestras = matriz_muestras(muestras)
+    validas = ~np.isnan(muestras)
+    n = validas.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = np.where(validas, muestras, 0.0).sum(axis=1) / n
+        desvio = np.where(validas, muestras - media[:, None], 0.0)
+        return media, (desvio ** 2).sum(axis=1) / n, (desvio ** 3).sum(axis=1) / n
+
+
+def asimetria_demanda_plazo(consumos_diarios, muestras_plazo):
+    """
+    Coeficiente de asimetría de la demanda durante el plazo, a partir de los cumulantes de una suma aleatoria
+
+    κ2 = E[L] Var(D) + Var(L) E[D]² y κ3 = E[L] κ3(D) + 3 Var(L) E[D] Var(D) + κ3(L) E[D]³.
+    """
+    media_d, varianza_d, tercero_d = _cumulantes(consumos_diarios)
+    media_l, varianza_l, tercero_l = _cumulantes(muestras_plazo)
+    segundo = media_l * varianza_d + varianza_l * media_d ** 2
+    tercero = media_l * tercero_d + 3 * varianza_l * media_d * varianza_d + tercero_l * media_d ** 3
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(segundo > 0, tercero / segundo ** 1.5, 0.0)
+
+
+def _pmf_enteros(valores, tamano):
+    """
+    Distribución de probabilidad por fila de una matriz de enteros (los negativos se ignoran)
+    """
+    filas = np.broadcast_to(np.arange(valores.shape[0])[:, None], valores.shape)
+    validos = valores >= 0
+    conteos = np.bincount(
+        (filas * tamano + valores)[validos], minlength=valores.shape[0] * tamano
+    ).reshape(valores.shape[0], tamano).astype(float)
+    with np.errstate(invalid="ignore"):
+        return conteos / conteos.sum(axis=1, keepdims=True)
+
+
+def _enteros(muestras, paso=1.0):
+    """
+    Redondea las muestras a múltiplos enteros de paso (no negativos); NaN pasa a -1
+    """
+    valores = np.rint(np.clip(muestras, 0, None) / np.asarray(paso)[..., None])
+    return np.where(np.isnan(muestras), -1, valores).astype(np.int64)
+
+
+def cuantil_demanda_plazo_lote(consumos_diarios, muestras_plazo, nivel_servicio):
+    """
+    Cuantil nivel_servicio de la demanda durante el plazo de cada SKU, por convolución con FFT
+
+    consumos_diarios y muestras_plazo son matrices (SKUs × muestras) con NaN
+    de relleno, o listas de listas. La demanda se redondea a unidades enteras
+    (o a pasos mayores si el soporte superaría MAX_PUNTOS_SOPORTE) y el plazo
+    a días enteros. Los SKUs sin muestras devuelven NaN.
+    """
+    consumos = matriz_muestras(consumos_diarios)
+    plazos_enteros = _enteros(matriz_muestras(muestras_plazo))
+    n_filas = consumos.shape[0]
+    nivel = _columna(nivel_servicio, n_filas)
+
+    plazo_maximo = plazos_enteros.max(axis=1, initial=-1)
+    with np.errstate(invalid="ignore"):
+        demanda_maxima = np.nan_to_num(np.nanmax(np.clip(consumos, 0, None), axis=1, initial=0.0))
+    paso = np.maximum(1.0, np.ceil(demanda_maxima * np.maximum(plazo_maximo, 0) / MAX_PUNTOS_SOPORTE))
+    demanda_enteros = _enteros(consumos, paso)
+
+    soporte_demanda = demanda_enteros.max(axis=1, initial=-1) + 1
+    soporte_suma = np.maximum(soporte_demanda - 1, 0) * np.maximum(plazo_maximo, 0) + 1
+    puntos_fft = np.array([fft.next_fast_len(int(s), real=True) for s in soporte_suma], dtype=np.int64)
+
+    cuantil = np.full(n_filas, np.nan)
+    calculables = np.flatnonzero((soporte_demanda > 0) & (plazo_maximo >= 0))
+
+    # SKUs ordenados por tamaño de FFT para que los bloques no se rellenen de más
+    orden = calculables[np.argsort(puntos_fft[calculables], kind="stable")]
+    inicio = 0
+    while inicio < orden.shape[0]:
+        costo = np.arange(1, orden.shape[0] - inicio + 1) * puntos_fft[orden[inicio:]]
+        fin = inicio + max(1, int(np.searchsorted(costo, ELEMENTOS_POR_BLOQUE, side="right")))
+        filas = orden[inicio:fin]
+        inicio = fin
+
+        n_fft = int(puntos_fft[filas].max())
+        pmf_demanda = _pmf_enteros(demanda_enteros[filas], int(soporte_demanda[filas].max()))
+        pmf_plazo = _pmf_enteros(plazos_enteros[filas], int(plazo_maximo[filas].max()) + 1)
+
+        # G_L(φ) = Σ P(L = l) φ^l por el método de Horner
+        transformada = fft.rfft(pmf_demanda, n_fft, axis=1)
+        generatriz = np.repeat(pmf_plazo[:, -1:].astype(complex), transformada.shape[1], axis=1)
+        for dias in range(pmf_plazo.shape[1] - 2, -1, -1):
+            generatriz *= transformada
+            generatriz += pmf_plazo[:, dias, None]
+
+        pmf_suma = np.clip(fft.irfft(generatriz, n_fft, axis=1), 0, None)
+        acumulada = np.cumsum(pmf_suma, axis=1)
+        acumulada /= acumulada[:, -1:]
+        # Pequeña tolerancia por el ruido de redondeo de la FFT
+        alcanzado = acumulada >= nivel[filas, None] - 1e-12
+        cuantil[filas] = alcanzado.argmax(axis=1) * paso[filas]
+    return cuantil
+
+
+def calcular_cantidad_fija_plazo_variable_lote(prob_falta_stock, consumos_diarios=None,
+                                               demanda_promedio_diaria=None, desviacion_demanda=None,
+                                               muestras_plazo=None, tiempo_reposicion=None,
+                                               desviacion_tiempo_reposicion=None, metodo="auto"):
+    """
+    Inventario de seguridad y punto de reorden del Sistema de Cantidad Fija con plazo de entrega variable
+
+    La demanda se indica con muestras (consumos_diarios) o con promedio y
+    desviación; el plazo con muestras (muestras_plazo) o con tiempo_reposicion
+    promedio y su desviación. Con metodo="analitico" se usa siempre la
+    fórmula; con "convolucion", la distribución completa (requiere muestras de
+    ambos); con "auto", la convolución solo en los SKUs con muestras cuya
+    demanda durante el plazo tiene asimetría mayor que UMBRAL_ASIMETRIA.
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"metodo debe ser uno de {METODOS}")
+    indice = _indice(prob_falta_stock, consumos_diarios, demanda_promedio_diaria, desviacion_demanda,
+                     muestras_plazo, tiempo_reposicion, desviacion_tiempo_reposicion)
+
+    if consumos_diarios is not None:
+        consumos_diarios = matriz_muestras(consumos_diarios)
+        _, demanda, desviacion = momentos_muestras(consumos_diarios)
+    elif demanda_promedio_diaria is not None and desviacion_demanda is not None:
+        demanda, desviacion = _columna(demanda_promedio_diaria), _columna(desviacion_demanda)
+    else:
+        raise ValueError("Se necesita consumos_diarios o bien demanda_promedio_diaria y desviacion_demanda")
+    n_filas = demanda.shape[0]
+
+    if muestras_plazo is not None:
+        muestras_plazo = matriz_muestras(muestras_plazo)
+        _, tiempo, desviacion_tiempo = momentos_muestras(muestras_plazo)
+    elif tiempo_reposicion is not None:
+        tiempo = _columna(tiempo_reposicion, n_filas)
+        desviacion_tiempo = _columna(0.0 if desviacion_tiempo_reposicion is None
+                                     else desviacion_tiempo_reposicion, n_filas)
+    else:
+        raise ValueError("Se necesita muestras_plazo o bien tiempo_reposicion")
+
+    prob = _columna(prob_falta_stock, n_filas)
+    z_score = calcular_z_score_lote(prob)
+    inventario_seguridad = calcular_inventario_seguridad_plazo_variable_lote(
+        z_score, desviacion, tiempo, demanda, desviacion_tiempo
+    )
+    punto_reorden = demanda * tiempo + inventario_seguridad
+
+    con_muestras = consumos_diarios is not None and muestras_plazo is not None
+    if metodo == "convolucion" and not con_muestras:
+        raise ValueError("metodo='convolucion' requiere consumos_diarios y muestras_plazo")
+
+    asimetria = np.full(n_filas, np.nan)
+    convolucion = np.zeros(n_filas, dtype=bool)
+    if con_muestras and metodo != "analitico":
+        asimetria = asimetria_demanda_plazo(consumos_diarios, muestras_plazo)
+        convolucion = (np.ones(n_filas, dtype=bool) if metodo == "convolucion"
+                       else np.abs(asimetria) > UMBRAL_ASIMETRIA)
+        if convolucion.any():
+            punto_reorden[convolucion] = cuantil_demanda_plazo_lote(
+                consumos_diarios[convolucion], muestras_plazo[convolucion],
+                (100 - prob[convolucion]) / 100,
+            )
+            inventario_seguridad[convolucion] = (punto_reorden[convolucion]
+                                                 - demanda[convolucion] * tiempo[convolucion])
+
+    valido = (prob > 0) & (tiempo > 0) & (demanda > 0)
+
+    return pd.DataFrame({
+        "demanda_promedio_diaria": demanda,
+        "desviacion_demanda": desviacion,
+        "tiempo_reposicion": tiempo,
+        "desviacion_tiempo_reposicion": desviacion_tiempo,
+        "z_score": z_score,
+        "asimetria_demanda_plazo": asimetria,
+        "metodo": np.where(convolucion, "convolucion", "analitico"),
+        "inventario_seguridad": inventario_seguridad,
+        "punto_reorden": punto_reorden,
+        "valido": valido,
+    }, index=indice)
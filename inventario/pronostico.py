@@ -0,0 +1,174 @@
+"""
+Pronóstico de la demanda diaria por SKU con suavizado exponencial.
+
+Sustituye la media plana del consumo por un pronóstico que sigue el nivel,
+la tendencia y, con Holt-Winters, la estacionalidad semanal de cada SKU. Los
+parámetros se eligen por SKU en una rejilla fija: todas las combinaciones se
+ajustan a la vez sobre una matriz (combinaciones × SKUs) y el bucle solo
+recorre los días, así que reajustar todo el catálogo cada noche cuesta unas
+pocas operaciones vectoriales por día y combinación.
+
+La desviación que se devuelve es la del error de pronóstico a un día (raíz
+del error cuadrático medio dentro de la muestra), que es la que corresponde
+usar en calcular_inventario_seguridad en lugar de la desviación del consumo:
+la parte de la variación que el pronóstico ya explica (día de la semana,
+tendencia) deja de inflar el inventario de seguridad.
+"""
+import itertools
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+METODOS = ("simple", "holt", "holt_winters")
+
+# Días de la estacionalidad de Holt-Winters (semana)
+PERIODO_ESTACIONAL = 7
+
+# Rejilla de parámetros de suavizado (nivel, tendencia y estacionalidad)
+ALFAS = (0.05, 0.1, 0.2, 0.3, 0.5)
+BETAS = (0.0, 0.05, 0.2)
+GAMMAS = (0.05, 0.15, 0.3)
+
+# SKUs que se ajustan a la vez; con 45 combinaciones el estado de un bloque cabe en la caché
+FILAS_POR_BLOQUE = 512
+
+
+@dataclass
+class ResultadoPronostico:
+    """
+    Demanda pronosticada, desviación del error y parámetros elegidos por SKU, más la trayectoria pronosticada
+    """
+    resumen: pd.DataFrame
+    pronostico: np.ndarray
+
+
+def rejilla_parametros(metodo):
+    """
+    Combinaciones (alfa, beta, gamma) que se evalúan para el método
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método de pronóstico desconocido: {metodo!r} (use uno de {METODOS})")
+    betas = (0.0,) if metodo == "simple" else BETAS
+    gammas = GAMMAS if metodo == "holt_winters" else (0.0,)
+    return np.array(list(itertools.product(ALFAS, betas, gammas)))
+
+
+def dias_minimos(metodo, periodo=PERIODO_ESTACIONAL):
+    """
+    Días de consumo que necesita el método: un período para iniciar el nivel (y la estacionalidad) y dos de ajuste
+    """
+    rejilla_parametros(metodo)
+    return (periodo if metodo == "holt_winters" else 1) + 2
+
+
+def pronosticar_demanda_lote(consumos, metodo="holt_winters", horizonte=PERIODO_ESTACIONAL, skus=None,
+                             periodo=PERIODO_ESTACIONAL, filas_por_bloque=FILAS_POR_BLOQUE):
+    """
+    Ajusta el suavizado exponencial a cada fila de consumos (SKUs × días) y pronostica la demanda
+
+    Usa la forma de corrección de error aditiva: el pronóstico a un día es
+    nivel + tendencia + estacional del día, y cada componente se corrige con
+    el error del día multiplicado por alfa, alfa × beta y gamma × (1 - alfa).
+    El nivel empieza en la media del primer período, la tendencia en cero y
+    los índices estacionales en la diferencia de cada día del primer período
+    con esa media. Para cada SKU se queda la combinación de la rejilla con
+    menor error cuadrático a un día.
+
+    horizonte es un escalar o un valor por SKU: demanda_promedio_diaria es
+    la media del pronóstico (sin valores negativos) de los próximos
+    horizonte días y pronostico guarda la trayectoria hasta el mayor.
+    """
+    consumos = np.atleast_2d(np.asarray(consumos, dtype=float))
+    n_skus, n_dias = consumos.shape
+    parametros = rejilla_parametros(metodo)
+    minimo = dias_minimos(metodo, periodo)
+    periodo = periodo if metodo == "holt_winters" else 1
+    if n_dias < minimo:
+        raise ValueError(f"Se necesitan al menos {minimo} días de consumo para el método {metodo}")
+
+    horizonte = np.broadcast_to(np.asarray(horizonte, dtype=np.int64), (n_skus,))
+    if n_skus and horizonte.min() < 1:
+        raise ValueError("El horizonte debe ser de al menos un día")
+    horizonte_maximo = int(horizonte.max()) if n_skus else 1
+
+    columnas = {
+        "demanda_promedio_diaria": np.empty(n_skus),
+        "desviacion_demanda": np.empty(n_skus),
+        "alfa": np.empty(n_skus),
+        "beta": np.empty(n_skus),
+        "gamma": np.empty(n_skus),
+    }
+    pronostico = np.empty((n_skus, horizonte_maximo))
+    dias_futuros = np.arange(horizonte_maximo)
+
+    # Coeficientes de corrección de cada componente por combinación (combinaciones × 1)
+    alfa = parametros[:, 0:1]
+    alfa_beta = alfa * parametros[:, 1:2]
+    gamma_complemento = parametros[:, 2:3] * (1 - alfa)
+    estacional = metodo == "holt_winters"
+    con_tendencia = metodo != "simple"
+
+    for inicio in range(0, n_skus, filas_por_bloque):
+        filas = slice(inicio, min(inicio + filas_por_bloque, n_skus))
+        # Días × SKUs contiguo: cada paso del bucle lee una fila seguida
+        diario = np.ascontiguousarray(consumos[filas].T)
+        n_bloque = diario.shape[1]
+        forma = (len(parametros), n_bloque)
+
+        nivel_inicial = diario[:periodo].mean(axis=0)
+        nivel = np.broadcast_to(nivel_inicial, forma).copy()
+        tendencia = np.zeros(forma)
+        indices = None
+        if estacional:
+            # Período × combinaciones × SKUs: el índice de un día es un bloque contiguo
+            indices = np.broadcast_to(
+                (diario[:periodo] - nivel_inicial)[:, None, :], (periodo,) + forma
+            ).copy()
+        suma_cuadrados = np.zeros(forma)
+        error = np.empty(forma)
+        correccion = np.empty(forma)
+
+        for dia in range(periodo, n_dias):
+            # error = consumo - (nivel + tendencia + estacional)
+            np.add(nivel, tendencia, out=error)
+            if estacional:
+                indice_dia = indices[dia % periodo]
+                error += indice_dia
+            np.subtract(diario[dia], error, out=error)
+            suma_cuadrados += np.square(error, out=correccion)
+
+            nivel += tendencia
+            nivel += np.multiply(alfa, error, out=correccion)
+            if con_tendencia:
+                tendencia += np.multiply(alfa_beta, error, out=correccion)
+            if estacional:
+                indice_dia += np.multiply(gamma_complemento, error, out=correccion)
+
+        # Combinación de menor error por SKU
+        mejor = np.argmin(suma_cuadrados, axis=0)[None, :]
+
+        def elegir(valores):
+            return np.take_along_axis(valores, mejor, axis=0)[0]
+
+        nivel_final, tendencia_final = elegir(nivel), elegir(tendencia)
+
+        trayectoria = nivel_final[:, None] + (dias_futuros + 1) * tendencia_final[:, None]
+        if estacional:
+            dias_estacion = (n_dias + dias_futuros) % periodo
+            indices_finales = np.take_along_axis(indices, mejor[None, :, :], axis=1)[:, 0, :]
+            trayectoria += indices_finales[dias_estacion].T
+        np.maximum(trayectoria, 0, out=trayectoria)
+        pronostico[filas] = trayectoria
+
+        # Media de cada fila solo hasta su propio horizonte
+        acumulado = np.cumsum(trayectoria, axis=1)
+        horizonte_bloque = horizonte[filas]
+        columnas["demanda_promedio_diaria"][filas] = (
+            acumulado[np.arange(n_bloque), horizonte_bloque - 1] / horizonte_bloque
+        )
+        columnas["desviacion_demanda"][filas] = np.sqrt(elegir(suma_cuadrados) / (n_dias - periodo))
+        for posicion, nombre in enumerate(("alfa", "beta", "gamma")):
+            columnas[nombre][filas] = parametros[mejor[0], posicion]
+
+    return ResultadoPronostico(resumen=pd.DataFrame(columnas, index=skus), pronostico=pronostico)
@@ -0,0 +1,122 @@
+"""
+Proyección del inventario del Sistema de Período Fijo.
+
+proyectar_periodo_fijo_lote calcula las trayectorias de muchos SKUs a la vez
+sin recorrer los días: el inventario del día t es el inicial menos la demanda
+acumulada más los pedidos llegados hasta t, y el número de llegadas se
+obtiene directamente de t, el tiempo de reposición y el ciclo.
+"""
+import numpy as np
+import pandas as pd
+
+# Días adicionales que se proyectan después de la segunda llegada
+DIAS_EXTRA_PROYECCION = 5
+
+# Tolerancia relativa para comparar el inventario proyectado con cero y con el inventario de seguridad
+TOLERANCIA_PROYECCION = 1e-9
+
+# Filas que se calculan a la vez en proyectar_periodo_fijo_lote
+FILAS_POR_BLOQUE = 4096
+
+
+def horizonte_periodo_fijo(tiempo_reposicion, ciclo_pedido):
+    """
+    Horizonte que muestra la app: hasta cinco días después de la segunda llegada
+    """
+    return np.asarray(ciclo_pedido) + np.asarray(tiempo_reposicion) + DIAS_EXTRA_PROYECCION
+
+
+def proyectar_periodo_fijo_lote(inventario_actual, demanda_promedio_diaria, cantidad_pedir,
+                                tiempo_reposicion, ciclo_pedido, horizonte=None,
+                                n_pedidos=None, dtype=np.float64):
+    """
+    Proyecta el inventario de muchos SKUs con consumo promedio y llegadas periódicas de pedido
+
+    Los pedidos de cantidad_pedir (solo si es positiva) llegan los días
+    tiempo_reposicion + 1 + k × ciclo_pedido, para k = 0 .. n_pedidos - 1
+    (todos los del horizonte si n_pedidos es None). Cada día se consume
+    primero y luego se recibe, como en la app. Sin horizonte se usa el mayor
+    ciclo + tiempo_reposicion + 5 de los SKUs.
+
+    Devuelve los días (horizonte,) y la matriz de inventario (SKUs × días),
+    truncada a cero desde el día 1.
+    """
+    inventario = np.atleast_1d(np.asarray(inventario_actual, dtype=dtype))
+    demanda = np.atleast_1d(np.asarray(demanda_promedio_diaria, dtype=dtype))
+    cantidad = np.atleast_1d(np.asarray(cantidad_pedir, dtype=dtype))
+    tiempo = np.atleast_1d(np.asarray(tiempo_reposicion, dtype=np.int64))
+    ciclo = np.atleast_1d(np.asarray(ciclo_pedido, dtype=np.int64))
+    inventario, demanda, cantidad, tiempo, ciclo = np.broadcast_arrays(
+        inventario, demanda, cantidad, tiempo, ciclo
+    )
+    if np.any(ciclo < 1):
+        raise ValueError("ciclo_pedido debe ser al menos 1")
+
+    if horizonte is None:
+        horizonte = int(horizonte_periodo_fijo(tiempo, ciclo).max(initial=0))
+    dias = np.arange(horizonte)
+
+    proyeccion = np.empty((inventario.shape[0], horizonte), dtype=dtype)
+    dias_reales = dias.astype(dtype)
+
+    # Por bloques de filas para que los temporales no dupliquen la memoria de la matriz
+    for inicio in range(0, inventario.shape[0], FILAS_POR_BLOQUE):
+        filas = slice(inicio, inicio + FILAS_POR_BLOQUE)
+        bloque = proyeccion[filas]
+
+        # Número de pedidos llegados hasta cada día (inclusive)
+        llegadas = dias - (tiempo[filas, None] + 1)
+        np.floor_divide(llegadas, ciclo[filas, None], out=llegadas)
+        llegadas += 1
+        np.clip(llegadas, 0, n_pedidos, out=llegadas)
+        llegadas[cantidad[filas] <= 0] = 0
+
+        np.multiply(llegadas, cantidad[filas, None], out=bloque)
+        bloque -= demanda[filas, None] * dias_reales
+        bloque += inventario[filas, None]
+
+    np.maximum(proyeccion[:, 1:], 0, out=proyeccion[:, 1:])
+    return dias, proyeccion
+
+
+def proyectar_periodo_fijo(inventario_actual, demanda_promedio_diaria, cantidad_pedir,
+                           tiempo_reposicion, ciclo_pedido):
+    """
+    Proyecta el inventario de un artículo con dos llegadas de pedido, como el gráfico de la app
+
+    El primer pedido llega el día tiempo_reposicion + 1 y el segundo el día
+    ciclo_pedido + tiempo_reposicion + 1. Devuelve los días y el inventario
+    proyectado (truncado a cero a partir del día 1).
+    """
+    dias_proyeccion, proyeccion = proyectar_periodo_fijo_lote(
+        inventario_actual, demanda_promedio_diaria, cantidad_pedir,
+        tiempo_reposicion, ciclo_pedido,
+        horizonte=int(horizonte_periodo_fijo(tiempo_reposicion, ciclo_pedido)),
+        n_pedidos=2,
+    )
+    return dias_proyeccion, proyeccion[0]
+
+
+def resumir_proyeccion_lote(proyeccion, inventario_seguridad, dias_validos=None):
+    """
+    Resume cada trayectoria: inventario mínimo, días bajo el inventario de seguridad y primer día sin stock (-1 si no hay)
+
+    dias_validos es una máscara opcional (SKUs × días) para ignorar los días
+    posteriores al horizonte propio de cada SKU.
+    """
+    proyeccion = np.atleast_2d(proyeccion)
+    seguridad = np.asarray(inventario_seguridad, dtype=float).reshape(-1, 1)
+    if dias_validos is None:
+        dias_validos = np.ones(proyeccion.shape, dtype=bool)
+
+    # Por construcción el inventario puede caer justo en el inventario de seguridad o en
+    # cero; la tolerancia evita que el redondeo decida esos empates
+    sin_stock = (proyeccion <= TOLERANCIA_PROYECCION) & dias_validos
+    bajo_seguridad = (proyeccion < seguridad - TOLERANCIA_PROYECCION * np.maximum(1, np.abs(seguridad)))
+    primer_dia = np.where(sin_stock.any(axis=1), sin_stock.argmax(axis=1), -1)
+    return pd.DataFrame({
+        "inventario_minimo_proyectado": np.where(dias_validos, proyeccion, np.inf).min(axis=1),
+        "dias_bajo_seguridad": (bajo_seguridad & dias_validos).sum(axis=1),
+        "primer_dia_sin_stock": primer_dia,
+    })
+
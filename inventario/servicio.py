@@ -0,0 +1,498 @@
+"""
+Servicio HTTP/JSON de los cálculos de inventario, sin Streamlit.
+
+Pensado para que el ERP llame a los mismos cálculos que la app. Usa solo
+asyncio de la biblioteca estándar (HTTP/1.1 con conexiones persistentes).
+Los lotes se calculan con las funciones vectorizadas de inventario.calculos
+y la respuesta se envía como líneas JSON (NDJSON) por bloques, a medida que
+se calculan. Las simulaciones Monte Carlo se reparten en un grupo de procesos
+para no bloquear el bucle de eventos.
+
+Uso:
+    python -m inventario.servicio [--host 127.0.0.1] [--puerto 8000] [--procesos 4]
+
+Rutas:
+    GET  /salud                     estado del servicio
+    GET  /metricas                  tiempos por etapa en formato de texto de Prometheus
+    POST /cantidad-fija             un artículo (objeto JSON) -> objeto JSON
+    POST /periodo-fijo              un artículo (objeto JSON) -> objeto JSON
+    POST /lote/cantidad-fija        lista JSON, {"articulos": [...]} o NDJSON -> NDJSON
+    POST /lote/periodo-fijo         lista JSON, {"articulos": [...]} o NDJSON -> NDJSON
+    POST /simulacion/cantidad-fija  lista de simulaciones -> NDJSON en el mismo orden
+
+Cada artículo lleva prob_falta_stock y tiempo_reposicion (más ciclo_pedido e
+inventario_actual en período fijo), y la demanda como consumos_diarios (lista)
+o como demanda_promedio_diaria y desviacion_demanda. Con
+desviacion_tiempo_reposicion el inventario de seguridad incluye la
+variabilidad del plazo. Si trae "id", se copia en su fila de resultado.
+
+Cada solicitud admite como máximo MAX_ARTICULOS_SOLICITUD artículos y
+MAX_SIMULACIONES_SOLICITUD simulaciones (413 si se superan). El cuerpo debe
+llegar con Content-Length: los cuerpos por partes se rechazan con 411.
+
+Las respuestas NDJSON ya empezadas no pueden cambiar su código HTTP: si un
+cálculo falla a mitad del flujo, la respuesta termina con una línea
+{"error": ...} y no se envían más resultados.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from functools import partial
+
+import numpy as np
+
+from inventario.calculos import calcular_cantidad_fija_lote, calcular_periodo_fijo_lote, estadisticas_demanda_lote
+from inventario.instrumentacion import instrumentar, texto_prometheus
+from inventario.simulacion import simular_cantidad_fija
+
+# Filas por bloque de la respuesta NDJSON de los lotes
+FILAS_POR_BLOQUE_RESPUESTA = 5_000
+
+# Tamaño máximo del cuerpo de una solicitud
+MAX_BYTES_CUERPO = 256 * 2**20
+
+# Artículos de un lote y simulaciones que se aceptan en una sola solicitud
+MAX_ARTICULOS_SOLICITUD = 1_000_000
+MAX_SIMULACIONES_SOLICITUD = 64
+
+# Límites por simulación solicitada, para que una sola llamada no acapare el grupo
+MAX_TRAYECTORIAS_SIMULACION = 1_000_000
+MAX_DIAS_SIMULACION = 3_650
+
+# Sistema -> (función vectorizada, campos obligatorios en el orden de sus argumentos)
+SISTEMAS = {
+    "cantidad-fija": (calcular_cantidad_fija_lote, ("prob_falta_stock", "tiempo_reposicion")),
+    "periodo-fijo": (calcular_periodo_fijo_lote,
+                     ("prob_falta_stock", "tiempo_reposicion", "ciclo_pedido", "inventario_actual")),
+}
+CAMPOS_SIMULACION = ("punto_reorden", "cantidad_pedido", "demanda_promedio_diaria",
+                     "desviacion_demanda", "tiempo_reposicion")
+
+ESTADOS_HTTP = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                411: "Length Required", 413: "Payload Too Large", 500: "Internal Server Error",
+                501: "Not Implemented"}
+
+
+class ErrorSolicitud(ValueError):
+    """
+    Error de la solicitud que se devuelve al cliente con su código HTTP
+    """
+    def __init__(self, mensaje, estado=400):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+# ---------------------------------------------------------------------------
+# Cálculos (sin dependencias de HTTP)
+# ---------------------------------------------------------------------------
+
+@instrumentar()
+def leer_articulos(cuerpo, tipo_contenido="", max_articulos=None):
+    """
+    Convierte el cuerpo de la solicitud en una lista de artículos (diccionarios)
+
+    Acepta una lista JSON, un objeto {"articulos": [...]} o NDJSON (un objeto
+    por línea). Con más de max_articulos (por defecto MAX_ARTICULOS_SOLICITUD)
+    artículos falla con 413.
+    """
+    texto = cuerpo.decode("utf-8")
+    try:
+        if "ndjson" in tipo_contenido or "jsonlines" in tipo_contenido:
+            articulos = [json.loads(linea) for linea in texto.splitlines() if linea.strip()]
+        else:
+            articulos = json.loads(texto) if texto.strip() else []
+    except json.JSONDecodeError as error:
+        raise ErrorSolicitud(f"JSON inválido: {error}") from None
+
+    if isinstance(articulos, dict):
+        articulos = articulos.get("articulos", [articulos])
+    if not isinstance(articulos, list) or not all(isinstance(a, dict) for a in articulos):
+        raise ErrorSolicitud("Se espera una lista de artículos (objetos JSON)")
+    if max_articulos is None:
+        max_articulos = MAX_ARTICULOS_SOLICITUD
+    if len(articulos) > max_articulos:
+        raise ErrorSolicitud(f"La solicitud admite como máximo {max_articulos} elementos", 413)
+    return articulos
+
+
+def _columna_articulos(articulos, campo):
+    """
+    Extrae un campo numérico obligatorio de todos los artículos
+    """
+    try:
+        return np.array([a[campo] for a in articulos], dtype=float)
+    except KeyError:
+        faltante = next(i for i, a in enumerate(articulos) if campo not in a)
+        raise ErrorSolicitud(f"Falta el campo '{campo}' en el artículo {faltante}") from None
+    except (TypeError, ValueError):
+        raise ErrorSolicitud(f"El campo '{campo}' debe ser numérico en todos los artículos") from None
+
+
+def _demanda_articulos(articulos):
+    """
+    Demanda promedio y desviación por artículo, desde consumos_diarios o desde los campos ya calculados
+
+    Los artículos con consumos_diarios se agrupan por número de días para
+    calcularlos con estadisticas_demanda_lote.
+    """
+    n = len(articulos)
+    demanda = np.empty(n)
+    desviacion = np.empty(n)
+
+    por_longitud = {}
+    directos = []
+    for i, articulo in enumerate(articulos):
+        consumos = articulo.get("consumos_diarios")
+        if consumos is None:
+            directos.append(i)
+        elif not isinstance(consumos, list) or not consumos:
+            raise ErrorSolicitud(f"consumos_diarios debe ser una lista no vacía en el artículo {i}")
+        else:
+            por_longitud.setdefault(len(consumos), []).append(i)
+
+    for indices in por_longitud.values():
+        try:
+            matriz = np.array([articulos[i]["consumos_diarios"] for i in indices], dtype=float)
+        except (TypeError, ValueError):
+            raise ErrorSolicitud("consumos_diarios debe contener solo números") from None
+        demanda[indices], desviacion[indices] = estadisticas_demanda_lote(matriz)
+
+    if directos:
+        seleccion = [articulos[i] for i in directos]
+        demanda[directos] = _columna_articulos(seleccion, "demanda_promedio_diaria")
+        desviacion[directos] = _columna_articulos(seleccion, "desviacion_demanda")
+    return demanda, desviacion
+
+
+@instrumentar()
+def columnas_lote(sistema, articulos):
+    """
+    Valida los artículos y los convierte en columnas NumPy para la función vectorizada del sistema
+
+    Devuelve un diccionario de columnas (incluida la demanda) y la lista de
+    ids, o None si ningún artículo trae id.
+    """
+    _, campos = SISTEMAS[sistema]
+    columnas = {campo: _columna_articulos(articulos, campo) for campo in campos}
+    columnas["demanda_promedio_diaria"], columnas["desviacion_demanda"] = _demanda_articulos(articulos)
+    if any("desviacion_tiempo_reposicion" in a for a in articulos):
+        con_plazo = [dict(a, desviacion_tiempo_reposicion=a.get("desviacion_tiempo_reposicion", 0.0))
+                     for a in articulos]
+        columnas["desviacion_tiempo_reposicion"] = _columna_articulos(con_plazo, "desviacion_tiempo_reposicion")
+    ids = [a.get("id") for a in articulos] if any("id" in a for a in articulos) else None
+    return columnas, ids
+
+
+@instrumentar()
+def calcular_bloque(sistema, columnas, ids, inicio=0, fin=None):
+    """
+    Calcula las filas inicio:fin de un lote ya convertido en columnas y devuelve un DataFrame
+    """
+    funcion, _ = SISTEMAS[sistema]
+    filas = slice(inicio, fin)
+    resultados = funcion(**{nombre: valores[filas] for nombre, valores in columnas.items()})
+    if ids is not None:
+        resultados.insert(0, "id", ids[filas])
+    return resultados
+
+
+def calcular_articulos(sistema, articulos):
+    """
+    Calcula el sistema ("cantidad-fija" o "periodo-fijo") para una lista de artículos
+    """
+    return calcular_bloque(sistema, *columnas_lote(sistema, articulos))
+
+
+@instrumentar()
+def lineas_json(resultados):
+    """
+    Serializa un DataFrame como NDJSON (NaN e infinitos como null)
+    """
+    if resultados.empty:
+        return b""
+    # Según la versión de pandas la última línea termina o no en salto de línea
+    texto = resultados.to_json(orient="records", lines=True, double_precision=15)
+    return (texto.rstrip("\n") + "\n").encode("utf-8")
+
+
+def parametros_simulacion(articulo, posicion=0):
+    """
+    Valida y completa los parámetros de una simulación solicitada
+
+    inventario_inicial es por defecto punto_reorden + cantidad_pedido.
+    """
+    faltantes = [c for c in CAMPOS_SIMULACION if c not in articulo]
+    if faltantes:
+        raise ErrorSolicitud(f"Faltan los campos {', '.join(faltantes)} en la simulación {posicion}")
+    try:
+        parametros = {c: float(articulo[c]) for c in CAMPOS_SIMULACION}
+        parametros["tiempo_reposicion"] = int(articulo["tiempo_reposicion"])
+        parametros["inventario_inicial"] = float(articulo.get(
+            "inventario_inicial", parametros["punto_reorden"] + parametros["cantidad_pedido"]
+        ))
+        parametros["dias"] = int(articulo.get("dias", 30))
+        parametros["n_trayectorias"] = int(articulo.get("n_trayectorias", 10_000))
+        semilla = articulo.get("semilla")
+        parametros["semilla"] = None if semilla is None else int(semilla)
+    except (TypeError, ValueError, OverflowError):
+        raise ErrorSolicitud(f"Parámetros no numéricos en la simulación {posicion}") from None
+
+    # Se valida todo antes de empezar a responder: un error en el grupo llegaría con el flujo ya abierto
+    if not all(np.isfinite(parametros[c]) for c in CAMPOS_SIMULACION + ("inventario_inicial",)):
+        raise ErrorSolicitud(f"Los parámetros deben ser finitos en la simulación {posicion}")
+    if parametros["cantidad_pedido"] <= 0:
+        raise ErrorSolicitud(f"cantidad_pedido debe ser positiva en la simulación {posicion}")
+    if parametros["desviacion_demanda"] < 0:
+        raise ErrorSolicitud(f"desviacion_demanda no puede ser negativa en la simulación {posicion}")
+    if not 1 <= parametros["n_trayectorias"] <= MAX_TRAYECTORIAS_SIMULACION:
+        raise ErrorSolicitud(f"n_trayectorias debe estar entre 1 y {MAX_TRAYECTORIAS_SIMULACION}")
+    if not 1 <= parametros["dias"] <= MAX_DIAS_SIMULACION:
+        raise ErrorSolicitud(f"dias debe estar entre 1 y {MAX_DIAS_SIMULACION}")
+    if parametros["tiempo_reposicion"] < 0:
+        raise ErrorSolicitud(f"tiempo_reposicion no puede ser negativo en la simulación {posicion}")
+    return parametros
+
+
+def leer_simulaciones(cuerpo, tipo_contenido=""):
+    """
+    Lee y valida todas las simulaciones de una solicitud
+    """
+    articulos = leer_articulos(cuerpo, tipo_contenido, MAX_SIMULACIONES_SOLICITUD)
+    return [parametros_simulacion(a, i) for i, a in enumerate(articulos)]
+
+
+def simular_articulo(parametros):
+    """
+    Ejecuta una simulación de cantidad fija y devuelve sus indicadores (en un proceso del grupo)
+    """
+    resultado = asdict(simular_cantidad_fija(**parametros))
+    resultado.pop("trayectorias")
+    resultado.pop("por_trayectoria")
+    # JSON no admite NaN (por ejemplo, prob_falta_ciclo sin ciclos completos)
+    return {clave: None if isinstance(valor, float) and not np.isfinite(valor) else valor
+            for clave, valor in resultado.items()}
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+def _cabeceras(estado, extra):
+    lineas = [f"HTTP/1.1 {estado} {ESTADOS_HTTP.get(estado, '')}"]
+    lineas += [f"{nombre}: {valor}" for nombre, valor in extra.items()]
+    return ("\r\n".join(lineas) + "\r\n\r\n").encode("latin-1")
+
+
+async def responder_json(escritor, estado, contenido):
+    """
+    Envía una respuesta JSON completa
+    """
+    cuerpo = json.dumps(contenido, ensure_ascii=False, allow_nan=False).encode("utf-8")
+    escritor.write(_cabeceras(estado, {
+        "Content-Type": "application/json; charset=utf-8",
+        "Content-Length": len(cuerpo),
+    }) + cuerpo)
+    await escritor.drain()
+
+
+def _parte(bloque):
+    return f"{len(bloque):X}\r\n".encode("latin-1") + bloque + b"\r\n"
+
+
+async def responder_flujo(escritor, bloques):
+    """
+    Envía una respuesta NDJSON por partes (Transfer-Encoding: chunked) a medida que llegan los bloques
+
+    Con las cabeceras ya enviadas, un error al producir los bloques se
+    informa con una última línea {"error": ...} y la respuesta se cierra bien.
+    """
+    escritor.write(_cabeceras(200, {
+        "Content-Type": "application/x-ndjson; charset=utf-8",
+        "Transfer-Encoding": "chunked",
+    }))
+    try:
+        async for bloque in bloques:
+            if bloque:
+                escritor.write(_parte(bloque))
+                await escritor.drain()
+    except ConnectionError:
+        raise
+    except Exception as error:  # noqa: BLE001 - ya no se puede responder con otro código HTTP
+        print(f"Error en una respuesta por partes: {error!r}", file=sys.stderr)
+        mensaje = str(error) if isinstance(error, ErrorSolicitud) else "Error interno"
+        escritor.write(_parte((json.dumps({"error": mensaje}, ensure_ascii=False) + "\n").encode("utf-8")))
+    escritor.write(b"0\r\n\r\n")
+    await escritor.drain()
+
+
+async def _bloques_lote(sistema, columnas, ids):
+    """
+    Calcula un lote por bloques en un hilo aparte y produce sus líneas JSON
+    """
+    bucle = asyncio.get_running_loop()
+    n_filas = len(columnas["demanda_promedio_diaria"])
+    for inicio in range(0, n_filas, FILAS_POR_BLOQUE_RESPUESTA):
+        resultados = await bucle.run_in_executor(
+            None, calcular_bloque, sistema, columnas, ids, inicio, inicio + FILAS_POR_BLOQUE_RESPUESTA
+        )
+        yield await bucle.run_in_executor(None, lineas_json, resultados)
+
+
+async def _bloques_simulacion(grupo, lista_parametros):
+    """
+    Reparte las simulaciones en el grupo de procesos y produce sus resultados en el orden pedido
+    """
+    bucle = asyncio.get_running_loop()
+    tareas = [bucle.run_in_executor(grupo, simular_articulo, p) for p in lista_parametros]
+    try:
+        for tarea in tareas:
+            resultado = await tarea
+            yield (json.dumps(resultado) + "\n").encode("utf-8")
+    finally:
+        for tarea in tareas:
+            tarea.cancel()
+
+
+async def atender(metodo, ruta, cuerpo, tipo_contenido, escritor, grupo):
+    """
+    Atiende una solicitud ya leída
+    """
+    ruta = ruta.split("?", 1)[0].rstrip("/") or "/"
+    bucle = asyncio.get_running_loop()
+
+    if ruta == "/salud":
+        await responder_json(escritor, 200, {"estado": "ok"})
+        return
+    if ruta == "/metricas":
+        cuerpo = texto_prometheus().encode("utf-8")
+        escritor.write(_cabeceras(200, {
+            "Content-Type": "text/plain; version=0.0.4; charset=utf-8",
+            "Content-Length": len(cuerpo),
+        }) + cuerpo)
+        await escritor.drain()
+        return
+    if metodo != "POST":
+        raise ErrorSolicitud("Use POST", 405)
+
+    # La lectura y la validación de los cuerpos se hacen en un hilo para no bloquear el bucle de eventos
+    if ruta.lstrip("/") in SISTEMAS:
+        articulos = await bucle.run_in_executor(None, leer_articulos, cuerpo, tipo_contenido)
+        if len(articulos) != 1:
+            raise ErrorSolicitud("Esta ruta recibe un solo artículo; use /lote" + ruta)
+        resultados = await bucle.run_in_executor(None, calcular_articulos, ruta.lstrip("/"), articulos)
+        await responder_json(escritor, 200, json.loads(lineas_json(resultados)))
+    elif ruta.startswith("/lote/") and ruta[len("/lote/"):] in SISTEMAS:
+        sistema = ruta[len("/lote/"):]
+        articulos = await bucle.run_in_executor(None, leer_articulos, cuerpo, tipo_contenido)
+        # Todo el lote se valida antes de empezar a responder
+        columnas, ids = await bucle.run_in_executor(None, columnas_lote, sistema, articulos)
+        await responder_flujo(escritor, _bloques_lote(sistema, columnas, ids))
+    elif ruta == "/simulacion/cantidad-fija":
+        lista_parametros = await bucle.run_in_executor(None, leer_simulaciones, cuerpo, tipo_contenido)
+        await responder_flujo(escritor, _bloques_simulacion(grupo, lista_parametros))
+    else:
+        raise ErrorSolicitud(f"Ruta desconocida: {ruta}", 404)
+
+
+async def manejar_conexion(lector, escritor, grupo):
+    """
+    Lee solicitudes HTTP/1.1 de una conexión hasta que el cliente la cierra
+    """
+    try:
+        while True:
+            linea = await lector.readline()
+            if not linea:
+                break
+            try:
+                metodo, ruta, version = linea.decode("latin-1").split()
+            except ValueError:
+                await responder_json(escritor, 400, {"error": "Línea de solicitud inválida"})
+                break
+
+            cabeceras = {}
+            while True:
+                linea = await lector.readline()
+                if linea in (b"\r\n", b"\n", b""):
+                    break
+                nombre, _, valor = linea.decode("latin-1").partition(":")
+                cabeceras[nombre.strip().lower()] = valor.strip()
+
+            # Sin leer el cuerpo no se sabe dónde empieza la siguiente solicitud: se cierra la conexión
+            codificacion = cabeceras.get("transfer-encoding", "").lower()
+            if codificacion:
+                if "chunked" in codificacion:
+                    await responder_json(escritor, 411, {"error": "Envíe el cuerpo con Content-Length"})
+                else:
+                    await responder_json(escritor, 501, {"error": f"Transfer-Encoding no admitido: {codificacion}"})
+                break
+
+            longitud = int(cabeceras.get("content-length", 0) or 0)
+            if longitud > MAX_BYTES_CUERPO:
+                await responder_json(escritor, 413, {"error": "Cuerpo demasiado grande"})
+                break
+            cuerpo = await lector.readexactly(longitud) if longitud else b""
+
+            try:
+                await atender(metodo.upper(), ruta, cuerpo, cabeceras.get("content-type", ""),
+                              escritor, grupo)
+            except ErrorSolicitud as error:
+                await responder_json(escritor, error.estado, {"error": str(error)})
+            except Exception as error:  # noqa: BLE001 - se informa al cliente y se sigue atendiendo
+                print(f"Error atendiendo {metodo} {ruta}: {error!r}", file=sys.stderr)
+                await responder_json(escritor, 500, {"error": "Error interno"})
+
+            cerrar = cabeceras.get("connection", "").lower()
+            if cerrar == "close" or (version == "HTTP/1.0" and cerrar != "keep-alive"):
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        escritor.close()
+
+
+async def servir(host="127.0.0.1", puerto=8000, procesos=None):
+    """
+    Arranca el servicio y atiende solicitudes hasta recibir SIGINT o SIGTERM
+
+    Al detenerse espera a que terminen los procesos del grupo.
+    """
+    bucle = asyncio.get_running_loop()
+    detener = asyncio.Event()
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            bucle.add_signal_handler(senal, detener.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C llega como KeyboardInterrupt
+
+    with ProcessPoolExecutor(max_workers=procesos or os.cpu_count() or 1) as grupo:
+        servidor = await asyncio.start_server(
+            partial(manejar_conexion, grupo=grupo), host, puerto, limit=2**20
+        )
+        direcciones = ", ".join(str(s.getsockname()) for s in servidor.sockets)
+        print(f"Servicio de inventario escuchando en {direcciones}", file=sys.stderr, flush=True)
+        async with servidor:
+            await detener.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON de cálculos de inventario")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="Procesos para las simulaciones (por defecto, todos los núcleos)")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(servir(args.host, args.puerto, args.procesos))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,210 @@
+"""
+Simulación Monte Carlo del Sistema de Cantidad Fija.
+
+Ejecuta muchas trayectorias a la vez: el bucle recorre los días y cada paso
+opera sobre todas las trayectorias del bloque como arreglos de NumPy. Los
+pedidos se deciden por la posición de inventario y sus llegadas se guardan en
+un búfer circular, así que puede haber varios pedidos en camino.
+
+La demanda de cada grupo de trayectorias sale de su propio flujo aleatorio
+(inventario.aleatorio), de modo que con la misma semilla el resultado es
+idéntico bit a bit con uno o varios procesos.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from inventario.aleatorio import (
+    flujos_trayectorias,
+    normales_estandar,
+    secuencia_semilla,
+    tamano_bloque_flujos,
+)
+
+# Elementos (ranuras × trayectorias) del búfer de llegadas de cada bloque
+ELEMENTOS_BUFER_LLEGADAS = 2**22
+
+
+@dataclass
+class ResultadoSimulacion:
+    """
+    Indicadores agregados de una simulación de cantidad fija
+    """
+    nivel_llenado: float
+    frecuencia_dias_sin_stock: float
+    inventario_promedio: float
+    prob_falta_ciclo: float
+    n_trayectorias: int
+    dias: int
+    trayectorias: np.ndarray
+    por_trayectoria: dict = None
+
+
+def _por_trayectoria(valor, n_trayectorias, dtype=float):
+    """
+    Expande un escalar o arreglo a un valor por trayectoria
+    """
+    arreglo = np.asarray(valor, dtype=dtype)
+    return np.broadcast_to(arreglo, (n_trayectorias,))
+
+
+def _simular_bloque(inicio, rop, cantidad, inventario, media, desviacion, plazo, ranuras,
+                    dias, secuencia, guardar):
+    """
+    Simula las trayectorias de un bloque y devuelve sus sumas parciales
+    """
+    n_bloque = inventario.shape[0]
+    flujos = flujos_trayectorias(secuencia, inicio, inicio + n_bloque)
+    inventario = np.array(inventario, dtype=float)
+    posicion = inventario.copy()
+    # Búfer circular: cantidad que llega el día d en la ranura d mod ranuras, y el día en que se pidió
+    llegadas = np.zeros((ranuras, n_bloque))
+    dia_pedido = np.zeros((ranuras, n_bloque), dtype=np.int32)
+    ultimo_dia_falta = np.full(n_bloque, -1, dtype=np.int32)
+    consumo = np.empty(n_bloque)
+
+    # Acumulados por trayectoria: sumarlos al final no depende de cómo se partieron los bloques
+    parcial = {
+        "demanda": np.zeros(n_bloque),
+        "demanda_atendida": np.zeros(n_bloque),
+        "dias_sin_stock": np.zeros(n_bloque, dtype=np.int64),
+        "inventario_promedio": np.zeros(n_bloque),
+        "ciclos": 0,
+        "ciclos_con_falta": 0,
+        "trayectorias": np.empty((guardar, dias)),
+    }
+
+    for dia in range(dias):
+        # Recibir los pedidos que llegan hoy
+        ranura = dia % ranuras
+        llega = llegadas[ranura]
+        recibido = llega > 0
+        inventario += llega
+        parcial["ciclos"] += np.count_nonzero(recibido)
+        parcial["ciclos_con_falta"] += np.count_nonzero(recibido & (ultimo_dia_falta > dia_pedido[ranura]))
+        llega.fill(0)
+
+        # Consumo diario con variación aleatoria
+        normales_estandar(flujos, consumo)
+        consumo *= desviacion
+        consumo += media
+        np.maximum(consumo, 0, out=consumo)
+        atendido = np.clip(inventario, 0, consumo)
+        faltante = atendido < consumo
+        parcial["demanda"] += consumo
+        parcial["demanda_atendida"] += atendido
+        parcial["dias_sin_stock"] += faltante
+        ultimo_dia_falta[faltante] = dia
+        inventario -= consumo
+        posicion -= consumo
+
+        # Hacer pedido cuando la posición de inventario alcanza el punto de reorden
+        pedir = np.flatnonzero(posicion <= rop)
+        if pedir.size:
+            multiplos = np.floor((rop[pedir] - posicion[pedir]) / cantidad[pedir]) + 1
+            pedido = multiplos * cantidad[pedir]
+            # Llega al inicio del día dia + plazo + 1: cubre la demanda de plazo días, como el punto de reorden
+            ranura_llegada = (dia + plazo[pedir] + 1) % ranuras
+            llegadas[ranura_llegada, pedir] += pedido
+            dia_pedido[ranura_llegada, pedir] = dia
+            posicion[pedir] += pedido
+
+        existencias = np.maximum(inventario, 0)
+        parcial["inventario_promedio"] += existencias
+        if guardar:
+            parcial["trayectorias"][:, dia] = existencias[:guardar]
+
+    parcial["inventario_promedio"] /= dias
+    return parcial
+
+
+def simular_cantidad_fija(punto_reorden, cantidad_pedido, inventario_inicial,
+                          demanda_promedio_diaria, desviacion_demanda, tiempo_reposicion,
+                          dias=30, n_trayectorias=10_000, semilla=None,
+                          trayectorias_guardadas=0, tamano_bloque=100_000,
+                          por_trayectoria=False, procesos=1):
+    """
+    Simula el Sistema de Cantidad Fija para n_trayectorias a la vez
+
+    Cada día llegan primero los pedidos programados para ese día, se consume
+    una demanda normal (lo que falta queda pendiente) y, si la posición de
+    inventario (existencias + pedidos en camino) cae al punto de reorden, se
+    pide cantidad_pedido, o el múltiplo necesario para superarlo. El pedido
+    se hace al final del día y llega al inicio del día
+    dia + tiempo_reposicion + 1, así que las existencias deben cubrir la
+    demanda de tiempo_reposicion días, igual que en la fórmula del punto de
+    reorden. Puede haber cualquier número de pedidos en camino: las
+    llegadas se guardan en un búfer circular de tiempo_reposicion + 2 días
+    por trayectoria. Los parámetros pueden ser
+    escalares o arreglos con un valor por trayectoria. El consumo negativo
+    que produce la normal se trunca a cero.
+
+    semilla es un entero, None o una SeedSequence. Con procesos > 1 los
+    bloques se reparten en un grupo de procesos; con la misma semilla el
+    resultado es idéntico con cualquier número de procesos y tamaño de bloque.
+
+    Devuelve el nivel de llenado (demanda atendida desde existencias), la
+    frecuencia de días con falta de stock, el inventario promedio, la
+    probabilidad de falta por ciclo de reposición (pedidos recibidos con
+    alguna falta de stock entre su emisión y su llegada, comparable con
+    prob_falta_stock / 100) y las primeras trayectorias_guardadas trayectorias.
+    Con por_trayectoria=True añade, para cada trayectoria, la demanda total,
+    la demanda atendida, los días sin stock y el inventario promedio, para
+    poder agregar por grupos de trayectorias (por ejemplo, por SKU).
+    """
+    if n_trayectorias < 1 or dias < 1:
+        raise ValueError("n_trayectorias y dias deben ser positivos")
+
+    secuencia = secuencia_semilla(semilla)
+
+    punto_reorden = _por_trayectoria(punto_reorden, n_trayectorias)
+    cantidad_pedido = _por_trayectoria(cantidad_pedido, n_trayectorias)
+    inventario_inicial = _por_trayectoria(inventario_inicial, n_trayectorias)
+    demanda_promedio_diaria = _por_trayectoria(demanda_promedio_diaria, n_trayectorias)
+    desviacion_demanda = _por_trayectoria(desviacion_demanda, n_trayectorias)
+    tiempo_reposicion = np.maximum(_por_trayectoria(tiempo_reposicion, n_trayectorias, dtype=np.int64), 1)
+    if np.any(cantidad_pedido <= 0):
+        raise ValueError("cantidad_pedido debe ser positiva")
+
+    # El búfer de llegadas ocupa (plazo máximo + 2) × trayectorias del bloque; los
+    # bloques contienen grupos completos de trayectorias de un mismo flujo aleatorio
+    ranuras = int(tiempo_reposicion.max()) + 2
+    tamano_bloque = tamano_bloque_flujos(min(tamano_bloque, ELEMENTOS_BUFER_LLEGADAS // ranuras))
+
+    trayectorias_guardadas = min(trayectorias_guardadas, n_trayectorias)
+    tareas = []
+    for inicio in range(0, n_trayectorias, tamano_bloque):
+        bloque = slice(inicio, min(inicio + tamano_bloque, n_trayectorias))
+        guardar = max(0, min(trayectorias_guardadas - inicio, bloque.stop - inicio))
+        tareas.append((
+            inicio, punto_reorden[bloque], cantidad_pedido[bloque], inventario_inicial[bloque],
+            demanda_promedio_diaria[bloque], desviacion_demanda[bloque], tiempo_reposicion[bloque],
+            ranuras, dias, secuencia, guardar,
+        ))
+
+    if procesos > 1 and len(tareas) > 1:
+        with ProcessPoolExecutor(max_workers=procesos) as grupo:
+            parciales = list(grupo.map(_simular_bloque, *zip(*tareas)))
+    else:
+        parciales = [_simular_bloque(*tarea) for tarea in tareas]
+
+    detalle = {
+        clave: np.concatenate([parcial[clave] for parcial in parciales])
+        for clave in ("demanda", "demanda_atendida", "dias_sin_stock", "inventario_promedio")
+    }
+    trayectorias = np.concatenate([parcial["trayectorias"] for parcial in parciales])
+    ciclos = sum(parcial["ciclos"] for parcial in parciales)
+    ciclos_con_falta = sum(parcial["ciclos_con_falta"] for parcial in parciales)
+
+    demanda_total = detalle["demanda"].sum()
+    return ResultadoSimulacion(
+        nivel_llenado=float(detalle["demanda_atendida"].sum() / demanda_total) if demanda_total > 0 else 1.0,
+        frecuencia_dias_sin_stock=float(detalle["dias_sin_stock"].sum() / (n_trayectorias * dias)),
+        inventario_promedio=float(detalle["inventario_promedio"].mean()),
+        prob_falta_ciclo=float(ciclos_con_falta / ciclos) if ciclos else float("nan"),
+        n_trayectorias=n_trayectorias,
+        dias=dias,
+        trayectorias=trayectorias,
+        por_trayectoria=detalle if por_trayectoria else None,
+    )
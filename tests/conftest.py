@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los tests importan el paquete inventario y app.py desde la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from inventario.almacen import Ejecucion, guardar_ejecucion
+
+
+@pytest.fixture
+def ejecucion(tmp_path):
+    resultados = pd.DataFrame({
+        "sku": ["a", "b", "c", "d", "e"],
+        "sin_signo": np.array([3, 0, 7, 0, 2], dtype=np.uint32),
+        "con_signo": np.array([np.iinfo(np.int64).min, 5, 5, -1, 0], dtype=np.int64),
+        "real": [1.5, np.nan, 1.5, 4.0, -2.0],
+    })
+    return Ejecucion(guardar_ejecucion(resultados, raiz=str(tmp_path)))
+
+
+@pytest.mark.parametrize("columna, esperado", [
+    ("sin_signo", [2, 0, 4, 1, 3]),
+    ("con_signo", [1, 2, 4, 3, 0]),
+    ("real", [3, 0, 2, 4, 1]),
+    ("sku", [4, 3, 2, 1, 0]),
+])
+def test_ordenar_descendente_estable(ejecucion, columna, esperado):
+    assert ejecucion.ordenar(columna, descendente=True).tolist() == esperado
+
+
+def test_ordenar_descendente_con_indices(ejecucion):
+    assert ejecucion.ordenar("sin_signo", descendente=True, indices=[1, 3, 4]).tolist() == [4, 1, 3]
+
+
+def test_reemplazar_ejecucion(tmp_path):
+    raiz = str(tmp_path)
+    guardar_ejecucion(pd.DataFrame({"sku": ["a", "b"]}), raiz=raiz, fecha="2026-10-16")
+    with pytest.raises(FileExistsError):
+        guardar_ejecucion(pd.DataFrame({"sku": ["c"]}), raiz=raiz, fecha="2026-10-16")
+    destino = guardar_ejecucion(pd.DataFrame({"sku": ["c"]}), raiz=raiz, fecha="2026-10-16", reemplazar=True)
+    assert Ejecucion(destino).columna("sku").tolist() == ["c"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["2026-10-16"]
+
+
+def test_reemplazo_fallido_conserva_la_anterior(tmp_path, monkeypatch):
+    raiz = str(tmp_path)
+    guardar_ejecucion(pd.DataFrame({"sku": ["a", "b"]}), raiz=raiz, fecha="2026-10-16")
+
+    def fallar(*args):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr("inventario.almacen.os.replace", fallar)
+    with pytest.raises(OSError):
+        guardar_ejecucion(pd.DataFrame({"sku": ["c"]}), raiz=raiz, fecha="2026-10-16", reemplazar=True)
+    assert Ejecucion(str(tmp_path / "2026-10-16")).columna("sku").tolist() == ["a", "b"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["2026-10-16"]
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+RUTA_APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+CONSUMOS_FIJO = ("fijo_7dias", "fijo_6dias", "fijo_5dias", "fijo_4dias", "fijo_3dias", "fijo_2dias", "fijo_ayer")
+
+
+@pytest.fixture
+def app():
+    at = AppTest.from_file(RUTA_APP, default_timeout=120)
+    at.secrets["PASSWORD"] = "prueba"
+    at.session_state["authenticated"] = True
+    return at.run()
+
+
+def test_pantalla_de_acceso():
+    at = AppTest.from_file(RUTA_APP, default_timeout=120)
+    at.secrets["PASSWORD"] = "prueba"
+    at.run()
+    assert not at.exception
+    assert len(at.text_input) == 1
+    assert not at.metric
+
+
+def test_cantidad_fija(app):
+    assert not app.exception
+    valores = {metrica.label: metrica.value for metrica in app.metric}
+    assert valores["🛡️ Inventario de Seguridad"] == "9 unidades"
+    assert valores["📍 Punto de Reorden"] == "39 unidades"
+
+
+def test_periodo_fijo(app):
+    app.sidebar.selectbox[0].select("Sistema de Período Fijo").run()
+    assert not app.exception
+    assert [metrica.value for metrica in app.metric][:2] == ["20 unidades", "140 unidades"]
+
+
+def _entrada(at, inicio_etiqueta):
+    return next(n for n in at.number_input if n.label.startswith(inicio_etiqueta))
+
+
+def test_poisson_con_punto_de_reorden_cero(app):
+    app.selectbox(key="modelo_demanda_fijo").set_value("Poisson")
+    _entrada(app, "Probabilidad").set_value(50)
+    for clave, consumo in zip(CONSUMOS_FIJO, (0, 0, 0, 0, 0, 0, 1)):
+        app.number_input(key=clave).set_value(consumo)
+    app.run()
+    assert not app.exception
+    assert app.metric[1].value == "0 unidades"
+
+
+def test_plazo_variable_por_convolucion(app):
+    app.number_input(key="desviacion_plazo_fijo").set_value(2.0).run()
+    punto_reorden_formula = app.metric[1].value
+    app.selectbox(key="metodo_plazo_fijo").set_value("convolucion").run()
+    assert not app.exception
+    assert app.metric[1].value != punto_reorden_formula
+    assert any("plazo variable" in texto.value for texto in app.markdown)
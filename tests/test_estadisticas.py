@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from inventario.estadisticas import AcumuladorWelford, VentanaMovil
+
+
+@pytest.fixture
+def consumos():
+    rng = np.random.default_rng(3)
+    # Media alta y varianza pequeña para que la cancelación numérica se note si la hubiera
+    return 1e6 + rng.gamma(2.0, 3.0, (50, 400))
+
+
+def test_welford_dia_a_dia(consumos):
+    acumulador = AcumuladorWelford(consumos.shape[0])
+    for dia in consumos.T:
+        acumulador.actualizar(dia)
+    np.testing.assert_allclose(acumulador.media, consumos.mean(axis=1), rtol=1e-12)
+    np.testing.assert_allclose(acumulador.desviacion, consumos.std(axis=1, ddof=1), rtol=1e-6)
+
+
+def test_welford_por_bloques_y_combinado(consumos):
+    primero = AcumuladorWelford(consumos.shape[0])
+    primero.actualizar_bloque(consumos[:, :150])
+    segundo = AcumuladorWelford(consumos.shape[0])
+    segundo.actualizar_bloque(consumos[:, 150:])
+    primero.combinar(segundo)
+    np.testing.assert_allclose(primero.desviacion, consumos.std(axis=1, ddof=1), rtol=1e-6)
+
+
+def test_welford_con_indices(consumos):
+    acumulador = AcumuladorWelford(3)
+    for valor in consumos[0, :10]:
+        acumulador.actualizar([valor], indices=[1])
+    assert acumulador.n.tolist() == [0, 10, 0]
+    assert np.isclose(acumulador.desviacion[1], consumos[0, :10].std(ddof=1))
+
+
+@pytest.mark.parametrize("recalcular_cada", [0, 1000, 7])
+def test_ventana_movil(consumos, recalcular_cada):
+    ancho = 30
+    ventana = VentanaMovil(consumos.shape[0], ancho, recalcular_cada=recalcular_cada)
+    for dia in range(consumos.shape[1]):
+        ventana.actualizar(consumos[:, dia])
+        if dia in (0, 5, ancho - 1, ancho, consumos.shape[1] - 1):
+            datos = consumos[:, max(0, dia + 1 - ancho):dia + 1]
+            np.testing.assert_allclose(ventana.media, datos.mean(axis=1), rtol=1e-12)
+            esperado = datos.std(axis=1, ddof=1) if datos.shape[1] > 1 else np.zeros(consumos.shape[0])
+            np.testing.assert_allclose(ventana.desviacion, esperado, rtol=1e-5, atol=1e-9)
+    np.testing.assert_array_equal(ventana.ventana_ordenada(), consumos[:, -ancho:])
@@ -0,0 +1,36 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from inventario.ingesta import agregar_historial
+
+
+def historial_csv(filas):
+    texto = "sku,fecha,cantidad\n" + "".join(f"{s},{f},{c}\n" for s, f, c in filas)
+    return io.StringIO(texto)
+
+
+@pytest.mark.parametrize("tamano_bloque", [1, 2, 100])
+def test_dia_repartido_entre_bloques(tamano_bloque):
+    filas = [("A", "2026-01-01", 3), ("A", "2026-01-02", 5), ("A", "2026-01-01", 4), ("A", "2026-01-03", 1)]
+    resultado = agregar_historial(historial_csv(filas), tamano_bloque=tamano_bloque).loc["A"]
+    assert resultado["n_dias"] == 3
+    assert np.isclose(resultado["demanda_promedio_diaria"], 13 / 3)
+    assert np.isclose(resultado["desviacion_demanda"], np.std([7, 5, 1], ddof=1))
+
+
+def test_relleno_con_el_rango_de_cada_sku():
+    filas = [("A", "2026-01-01", 2), ("A", "2026-01-03", 4),
+             ("B", "2026-01-10", 6), ("B", "2026-01-11", 6)]
+    resultado = agregar_historial(historial_csv(filas), tamano_bloque=2, rellenar_dias_sin_consumo=True)
+    assert resultado["n_dias"].tolist() == [3, 2]
+    assert np.isclose(resultado.loc["A", "desviacion_demanda"], np.std([2, 0, 4], ddof=1))
+    assert resultado.loc["B", "desviacion_demanda"] == 0
+
+
+def test_historial_vacio():
+    resultado = agregar_historial(historial_csv([]))
+    assert resultado.empty
+    assert isinstance(resultado.index, pd.Index)
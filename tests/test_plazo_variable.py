@@ -0,0 +1,17 @@
+import numpy as np
+
+from inventario.plazo_variable import cuantil_demanda_plazo_lote, muestras_plazo_normal
+
+
+def test_muestras_plazo_normal():
+    muestras = muestras_plazo_normal([7, 2], [2, 3])
+    assert muestras.shape == (2, 101)
+    assert np.isclose(muestras[0].mean(), 7)
+    assert abs(muestras[0].std(ddof=1) - 2) < 0.05
+    assert muestras.min() == 0
+
+
+def test_cuantil_con_plazo_fijo():
+    # Con demanda de 0 o 1 unidades equiprobables y plazo fijo de 4 días, la demanda es binomial(4, 1/2)
+    cuantil = cuantil_demanda_plazo_lote([[0, 1]] * 3, [[4]] * 3, [0.5, 0.9, 0.99])
+    assert cuantil.tolist() == [2, 3, 4]
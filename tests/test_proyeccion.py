@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from inventario.proyeccion import horizonte_periodo_fijo, proyectar_periodo_fijo, proyectar_periodo_fijo_lote
+
+
+def proyeccion_bucle(inventario_actual, demanda_promedio_diaria, cantidad_pedir, tiempo_reposicion, ciclo_pedido):
+    """
+    Bucle día a día con el que la app proyectaba el inventario del Sistema de Período Fijo
+    """
+    dias_proyeccion = np.arange(0, ciclo_pedido + tiempo_reposicion + 5)
+    inventario_proyectado = []
+    inventario_temp = inventario_actual
+    for dia in dias_proyeccion:
+        if dia == 0:
+            inventario_proyectado.append(inventario_temp)
+            continue
+        inventario_temp -= demanda_promedio_diaria
+        if dia == tiempo_reposicion + 1 and cantidad_pedir > 0:
+            inventario_temp += cantidad_pedir
+        elif dia == ciclo_pedido + tiempo_reposicion + 1 and cantidad_pedir > 0:
+            inventario_temp += cantidad_pedir
+        inventario_proyectado.append(max(0, inventario_temp))
+    return dias_proyeccion, np.array(inventario_proyectado, dtype=float)
+
+
+CASOS = [
+    (100.0, 12.0, 80.0, 3, 7),
+    (0.0, 5.5, 0.0, 1, 1),
+    (40.0, 10.0, -5.0, 10, 2),
+    (1e6, 0.0, 300.0, 30, 90),
+]
+
+
+@pytest.mark.parametrize("caso", CASOS)
+def test_proyeccion_igual_al_bucle(caso):
+    dias_bucle, esperado = proyeccion_bucle(*caso)
+    dias, proyeccion = proyectar_periodo_fijo(*caso)
+    np.testing.assert_array_equal(dias, dias_bucle)
+    np.testing.assert_allclose(proyeccion, esperado, rtol=1e-12, atol=1e-9)
+
+
+def test_lote_igual_al_bucle():
+    rng = np.random.default_rng(7)
+    n = 200
+    inventario = rng.uniform(0, 500, n)
+    demanda = rng.gamma(2.0, 5.0, n)
+    cantidad = rng.uniform(-50, 400, n)
+    tiempo = rng.integers(1, 30, n)
+    ciclo = rng.integers(1, 60, n)
+
+    dias, proyeccion = proyectar_periodo_fijo_lote(inventario, demanda, cantidad, tiempo, ciclo, n_pedidos=2)
+    assert len(dias) == horizonte_periodo_fijo(tiempo, ciclo).max()
+    for i in range(n):
+        _, esperado = proyeccion_bucle(inventario[i], demanda[i], cantidad[i], tiempo[i], ciclo[i])
+        np.testing.assert_allclose(proyeccion[i, :len(esperado)], esperado, rtol=1e-12, atol=1e-9)
@@ -0,0 +1,73 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pytest
+
+from inventario import servicio
+
+
+def solicitar(*solicitudes):
+    """
+    Envía solicitudes HTTP crudas a un servicio en proceso y devuelve el código y el cuerpo de cada una
+    """
+    async def enviar():
+        with ThreadPoolExecutor(1) as grupo:
+            servidor = await asyncio.start_server(
+                partial(servicio.manejar_conexion, grupo=grupo), "127.0.0.1", 0
+            )
+            puerto = servidor.sockets[0].getsockname()[1]
+            respuestas = []
+            async with servidor:
+                for solicitud in solicitudes:
+                    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+                    escritor.write(solicitud)
+                    await escritor.drain()
+                    respuesta = await lector.read()
+                    escritor.close()
+                    cabecera, _, cuerpo = respuesta.partition(b"\r\n\r\n")
+                    respuestas.append((int(cabecera.split()[1]), cuerpo))
+            return respuestas
+    return asyncio.run(enviar())
+
+
+def post(ruta, contenido):
+    cuerpo = json.dumps(contenido).encode()
+    return (f"POST {ruta} HTTP/1.1\r\nContent-Length: {len(cuerpo)}\r\nConnection: close\r\n\r\n"
+            .encode() + cuerpo)
+
+
+SIMULACION = dict(punto_reorden=10, cantidad_pedido=5, demanda_promedio_diaria=2,
+                  desviacion_demanda=1, tiempo_reposicion=3, n_trayectorias=10)
+
+
+def test_un_articulo():
+    [(estado, cuerpo)] = solicitar(post("/cantidad-fija", {
+        "prob_falta_stock": 10, "tiempo_reposicion": 3, "consumos_diarios": [10, 6, 17, 14, 10, 6, 7]
+    }))
+    assert estado == 200
+    assert json.loads(cuerpo)["valido"]
+
+
+def test_limite_de_articulos_y_simulaciones(monkeypatch):
+    monkeypatch.setattr(servicio, "MAX_ARTICULOS_SOLICITUD", 2)
+    monkeypatch.setattr(servicio, "MAX_SIMULACIONES_SOLICITUD", 2)
+    articulo = {"prob_falta_stock": 10, "tiempo_reposicion": 3,
+                "demanda_promedio_diaria": 5, "desviacion_demanda": 1}
+    respuestas = solicitar(
+        post("/lote/cantidad-fija", [articulo] * 3),
+        post("/simulacion/cantidad-fija", [SIMULACION] * 3),
+        post("/simulacion/cantidad-fija", [SIMULACION] * 2),
+    )
+    assert [estado for estado, _ in respuestas] == [413, 413, 200]
+    assert len(respuestas[2][1].split(b"\r\n")) > 2
+
+
+@pytest.mark.parametrize("codificacion, esperado", [("chunked", 411), ("gzip", 501)])
+def test_cuerpo_sin_content_length(codificacion, esperado):
+    [(estado, _)] = solicitar(
+        f"POST /lote/cantidad-fija HTTP/1.1\r\nTransfer-Encoding: {codificacion}\r\n\r\n"
+        "2\r\n[]\r\n0\r\n\r\n".encode()
+    )
+    assert estado == esperado
@@ -0,0 +1,54 @@
+import math
+
+import pytest
+
+from inventario.calculos import calcular_inventario_seguridad, calcular_z_score
+from inventario.simulacion import simular_cantidad_fija
+
+
+def _simular_objetivo(prob_falta_stock, demanda=10.0, desviacion=4.0, plazo=200, cantidad=2200.0):
+    # Demanda diaria pequeña frente a σ√plazo: el exceso bajo el punto de reorden al pedir es despreciable
+    punto_reorden = demanda * plazo + calcular_inventario_seguridad(
+        calcular_z_score(prob_falta_stock), desviacion, plazo
+    )
+    return simular_cantidad_fija(
+        punto_reorden, cantidad, punto_reorden + cantidad, demanda, desviacion, plazo,
+        dias=2500, n_trayectorias=1000, semilla=1,
+    )
+
+
+@pytest.mark.parametrize("prob_falta_stock, tolerancia", [(50, 0.06), (10, 0.04)])
+def test_falta_por_ciclo_cerca_del_objetivo(prob_falta_stock, tolerancia):
+    resultado = _simular_objetivo(prob_falta_stock)
+    assert resultado.prob_falta_ciclo == pytest.approx(prob_falta_stock / 100, abs=tolerancia)
+
+
+def test_plazo_de_un_dia_expone_un_dia_de_demanda():
+    # Con plazo 1 el pedido debe cubrir un día de consumo: al 50% hay faltas
+    punto_reorden = 20.0
+    resultado = simular_cantidad_fija(punto_reorden, 200.0, 220.0, 20.0, 6.0, 1,
+                                      dias=500, n_trayectorias=500, semilla=3)
+    assert resultado.prob_falta_ciclo > 0.3
+
+
+def test_mismo_resultado_con_cualquier_tamano_de_bloque():
+    argumentos = dict(punto_reorden=60.0, cantidad_pedido=120.0, inventario_inicial=180.0,
+                      demanda_promedio_diaria=10.0, desviacion_demanda=3.0, tiempo_reposicion=5,
+                      dias=90, n_trayectorias=10_000, semilla=7)
+    a = simular_cantidad_fija(**argumentos)
+    b = simular_cantidad_fija(**argumentos, tamano_bloque=4096)
+    assert (a.nivel_llenado, a.prob_falta_ciclo, a.inventario_promedio) == (
+        b.nivel_llenado, b.prob_falta_ciclo, b.inventario_promedio
+    )
+
+
+def test_cantidad_pedido_no_positiva():
+    with pytest.raises(ValueError):
+        simular_cantidad_fija(10.0, 0.0, 30.0, 5.0, 1.0, 2)
+
+
+def test_sin_variacion_no_hay_faltas():
+    resultado = simular_cantidad_fija(50.0, 100.0, 150.0, 10.0, 0.0, 5, dias=200, n_trayectorias=10)
+    assert resultado.prob_falta_ciclo == 0.0
+    assert resultado.nivel_llenado == 1.0
+    assert math.isclose(resultado.frecuencia_dias_sin_stock, 0.0)